@@ -18,9 +18,18 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from functools import partial
+from os import environ
+
 from fastapi import FastAPI
+from viking.infrastructure.metrics import registry
+
+from api.dependencies import provider
+from api.profiler import SlowRequestProfiler
+from api.routers import metrics, tasks
+from api.timing import TimingMiddleware
 
-from api.routers import tasks
+slow_requests = SlowRequestProfiler()
 
 api = FastAPI(
     title="Hungry Tasks",
@@ -28,3 +37,10 @@ api = FastAPI(
     version="0.1.0",
 )
 api.include_router(tasks.router)
+api.include_router(metrics.router)
+api.add_event_handler('startup', provider.startup)
+api.add_event_handler('shutdown', provider.shutdown)
+api.add_middleware(TimingMiddleware, sink=registry, profiler=slow_requests)
+if environ.get('HUNGRY_TASK_PROFILE_SLOW_MS'):
+    api.add_event_handler('startup', partial(slow_requests.enable, float(environ['HUNGRY_TASK_PROFILE_SLOW_MS'])))
+api.add_event_handler('shutdown', slow_requests.disable)
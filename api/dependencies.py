@@ -18,10 +18,99 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from concurrent.futures import ThreadPoolExecutor
+from os import environ
+from typing import Callable, Optional
+
 from viking.domain.seedwork.abstract_repository import AbstractRepository
+from viking.domain.seedwork.async_abstract_repository import \
+    AsyncAbstractRepository
 from viking.domain.task import Task
-from viking.infrastructure.csv_repository import CsvRepository
+from viking.infrastructure.async_repository import AsyncRepository
+from viking.infrastructure.metrics import registry
+from viking.infrastructure.repository_factory import (RepositoryFactory,
+                                                      default_config)
+
+from api.timing import TimedAsyncRepository
+
+API_REPOSITORY = 'api'
+# Served unless hungry_task.ini configures a [repository:api] section.
+DEFAULT_API_SETTINGS = {'backend': 'csv', 'filename': 'api.csv', 'cached': 'true'}
+
+
+class RepositoryProvider:
+    """
+    Owns the repository shared by every request for the lifetime of the
+    application.
+    """
+    def __init__(self, build: Callable[[], AbstractRepository]):
+        """
+        Constructor for the RepositoryProvider
+
+        Args:
+            build (Callable[[], AbstractRepository]): Builds the repository
+                on startup
+        """
+        self.build = build
+        self._repository: Optional[AsyncRepository] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def startup(self) -> None:
+        """
+        Build the shared repository if it does not exist yet.
+
+        Backends are not thread-safe, so every call is serialized through a
+        single worker thread. Requests still run concurrently on the loop.
+        Calls are timed as the repository phase of the request.
+        """
+        if self._repository is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='repository')
+            self._repository = TimedAsyncRepository(self.build(), self._executor)
+
+    def shutdown(self) -> None:
+        """
+        Wait for pending calls and release the shared repository.
+        """
+        if self._repository is None:
+            return
+        self._executor.shutdown(wait=True)
+        close = getattr(self._repository.repository, 'close', None)
+        if close is not None:
+            close()
+        self._repository, self._executor = None, None
+
+    def get(self) -> AsyncAbstractRepository:
+        """
+        Get the shared repository, building it on first use.
+
+        Returns:
+            AsyncAbstractRepository: The shared repository.
+        """
+        if self._repository is None:
+            self.startup()
+        return self._repository
+
+
+factory = RepositoryFactory(Task, metrics=registry, config={API_REPOSITORY: DEFAULT_API_SETTINGS, **default_config()})
+
+
+def build_repository() -> AbstractRepository:
+    """
+    Build the repository named by HUNGRY_TASK_API_REPOSITORY, the api
+    repository by default, instrumented with the metrics registry.
+
+    It is built outside the pool of the factory, as the provider closes it
+    on shutdown.
+
+    Returns:
+        AbstractRepository: The repository.
+    """
+    backend, settings = factory.resolve(environ.get('HUNGRY_TASK_API_REPOSITORY', API_REPOSITORY))
+    return factory.instrument(backend.name, backend.create(Task, settings))
+
+
+provider = RepositoryProvider(build_repository)
 
 
-async def repository() -> AbstractRepository:
-    return CsvRepository('api.csv', Task)
+async def repository() -> AsyncAbstractRepository:
+    return provider.get()
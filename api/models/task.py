@@ -18,6 +18,7 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from typing import Optional
 from uuid import UUID
 
 from pydantic import BaseModel
@@ -27,3 +28,15 @@ class Model(BaseModel):
     id: UUID
     name: str
     completed: bool
+
+
+class BatchResult(BaseModel):
+    id: Optional[UUID] = None
+    name: Optional[str] = None
+    status: int
+    detail: Optional[str] = None
+    task: Optional[Model] = None
+
+
+class ImportResult(BaseModel):
+    imported: int
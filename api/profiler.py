@@ -0,0 +1,197 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import logging
+import sys
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from os.path import basename
+from threading import Event, Lock, Thread, get_ident
+from time import perf_counter
+from types import FrameType
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SlowRequest:
+    """
+    A request slower than the threshold, with the stacks sampled during it.
+
+    Stacks are collapsed into one line per distinct stack, root first, the
+    format flame graph tools read.
+    """
+    method: str
+    path: str
+    seconds: float
+    stacks: Dict[str, int] = field(default_factory=dict)
+
+    def hottest(self, count: int = 5) -> List[Tuple[str, int]]:
+        """
+        Get the stacks sampled most often
+
+        Args:
+            count (int): The number of stacks
+
+        Returns:
+            List[Tuple[str, int]]: The stacks and their number of samples
+        """
+        return Counter(self.stacks).most_common(count)
+
+
+def log_slow_request(request: SlowRequest) -> None:
+    """
+    Log a slow request with its hottest stacks
+
+    Args:
+        request (SlowRequest): The slow request
+    """
+    hottest = ''.join(f'\n  {samples} {stack}' for stack, samples in request.hottest())
+    logger.warning('%s %s took %.1fms%s', request.method, request.path, request.seconds * 1000, hottest)
+
+
+def collapse(frame: Optional[FrameType]) -> str:
+    """
+    Render a stack as one line, from the outermost frame to the innermost
+
+    Args:
+        frame (Optional[FrameType]): The innermost frame
+
+    Returns:
+        str: The frames separated by semicolons
+    """
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f'{code.co_name} ({basename(code.co_filename)}:{frame.f_lineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(frames))
+
+
+class SlowRequestProfiler:
+    """
+    A sampling profiler for slow requests.
+
+    While switched on, a background thread samples the stack of every other
+    thread at a fixed interval into a history bounded by a number of ticks,
+    so it covers the same time however many threads there are. When a request ends
+    slower than the threshold, the samples taken while it ran are handed to
+    the report hook. Switched off, it costs nothing.
+    """
+    def __init__(
+        self,
+        interval: float = 5.0,
+        history: float = 30.0,
+        report: Callable[[SlowRequest], None] = log_slow_request,
+    ):
+        """
+        Constructor for the SlowRequestProfiler
+
+        Args:
+            interval (float): Milliseconds between samples
+            history (float): Seconds of samples to keep
+            report (Callable[[SlowRequest], None]): Called with every slow
+                request
+        """
+        self.interval = interval
+        self.report = report
+        self.threshold: Optional[float] = None
+        self._samples: Deque[Tuple[float, Tuple[str, ...]]] = deque(maxlen=max(1, int(history * 1000 / interval)))
+        self._lock = Lock()
+        self._stopped = Event()
+        self._sampler: Optional[Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Check if the profiler is sampling
+
+        Returns:
+            bool: True while switched on
+        """
+        return self.threshold is not None
+
+    def enable(self, threshold: float) -> None:
+        """
+        Switch the profiler on
+
+        Args:
+            threshold (float): Report requests slower than this many
+                milliseconds
+        """
+        self.threshold = threshold
+        if self._sampler is None:
+            self._stopped.clear()
+            self._sampler = Thread(target=self._sample, name='slow-request-profiler', daemon=True)
+            self._sampler.start()
+
+    def disable(self) -> None:
+        """
+        Switch the profiler off and forget its samples
+        """
+        self.threshold = None
+        if self._sampler is not None:
+            self._stopped.set()
+            self._sampler.join()
+            self._sampler = None
+        with self._lock:
+            self._samples.clear()
+
+    def _sample(self) -> None:
+        """
+        Sample the stacks of every other thread until switched off
+        """
+        me = get_ident()
+        while not self._stopped.wait(self.interval / 1000):
+            now = perf_counter()
+            stacks = tuple(collapse(frame) for ident, frame in sys._current_frames().items() if ident != me)
+            with self._lock:
+                self._samples.append((now, stacks))
+
+    def stacks(self, start: float, end: float) -> Dict[str, int]:
+        """
+        Count the stacks sampled between two moments
+
+        Args:
+            start (float): The perf_counter value of the first moment
+            end (float): The perf_counter value of the second moment
+
+        Returns:
+            Dict[str, int]: The number of samples of each stack
+        """
+        with self._lock:
+            samples = list(self._samples)
+        return dict(Counter(stack for taken, stacks in samples if start <= taken <= end for stack in stacks))
+
+    def finished(self, method: str, path: str, start: float, end: float) -> None:
+        """
+        Report a finished request if it was slow
+
+        Args:
+            method (str): The method of the request
+            path (str): The path of the request
+            start (float): The perf_counter value when it started
+            end (float): The perf_counter value when it ended
+        """
+        threshold = self.threshold
+        if threshold is None or (end - start) * 1000 < threshold:
+            return
+        self.report(SlowRequest(method, path, end - start, self.stacks(start, end)))
@@ -0,0 +1,37 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from viking.infrastructure.metrics import prometheus_text, registry
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+router = APIRouter()
+
+@router.get('/metrics', response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Get the metrics of the process in the Prometheus text format.
+
+    Returns:
+        PlainTextResponse: The metrics.
+    """
+    return PlainTextResponse(prometheus_text(registry), media_type=CONTENT_TYPE)
@@ -18,109 +18,354 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from dataclasses import asdict
-from typing import List
+from io import TextIOWrapper
+from itertools import islice
+from tempfile import TemporaryFile
+from typing import AsyncIterable, AsyncIterator, List, Optional
+from uuid import UUID
 
 from api.dependencies import repository
 from api.models import task
-from fastapi import APIRouter, Depends
-from viking.domain.seedwork.abstract_repository import AbstractRepository
+from api.timing import TimedRoute
+from fastapi import (APIRouter, Body, Depends, HTTPException, Query, Request,
+                     Response)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from viking.domain.seedwork.async_abstract_repository import \
+    AsyncAbstractRepository
+from viking.domain.seedwork.unit_of_work import AsyncUnitOfWork
 from viking.domain.task import Task
+from viking.infrastructure import transfer
+from viking.infrastructure.codec import codec_for
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+FORMAT_PATTERN = '^({})$'.format('|'.join(transfer.FORMATS))
 
 router = APIRouter(
     prefix="/tasks",
+    route_class=TimedRoute,
     responses={404: {"description": "Task not found"}},
 )
 
+def _encode_cursor(offset: int) -> str:
+    """
+    Encode a position in the listing as an opaque cursor.
+
+    Args:
+        offset (int): The number of tasks before the next page.
+
+    Returns:
+        str: The cursor.
+    """
+    return urlsafe_b64encode(f'offset:{offset}'.encode()).decode()
+
+def _decode_cursor(cursor: Optional[str]) -> int:
+    """
+    Decode a cursor back into a position in the listing.
+
+    Args:
+        cursor (Optional[str]): The cursor, or None for the first page.
+
+    Raises:
+        HTTPException: The cursor is malformed.
+
+    Returns:
+        int: The number of tasks before the page.
+    """
+    if cursor is None:
+        return 0
+    try:
+        kind, offset = urlsafe_b64decode(cursor.encode()).decode().split(':')
+        if kind == 'offset' and int(offset) >= 0:
+            return int(offset)
+    except ValueError:
+        pass
+    raise HTTPException(status_code=400, detail='Invalid cursor')
+
+async def _ndjson(tasks: AsyncIterable[Task]) -> AsyncIterator[str]:
+    """
+    Encode tasks as newline delimited JSON, one task at a time.
+
+    Args:
+        tasks (AsyncIterable[Task]): The tasks to encode.
+
+    Returns:
+        AsyncIterator[str]: A line of JSON per task.
+    """
+    async for item in tasks:
+        yield json.dumps({'id': str(item.id), 'name': item.name, 'completed': item.completed}) + '\n'
+
+async def _export(tasks: AsyncIterable[Task], format_name: str, chunk_size: int) -> AsyncIterator[str]:
+    """
+    Encode tasks in an interchange format a chunk at a time, off the event
+    loop.
+
+    Args:
+        tasks (AsyncIterable[Task]): The tasks to encode.
+        format_name (str): One of transfer.FORMATS.
+        chunk_size (int): The tasks encoded together.
+
+    Returns:
+        AsyncIterator[str]: The header, then the text of each chunk.
+    """
+    encoder, codec = transfer.FORMATS[format_name], codec_for(Task)
+    yield encoder.header(codec)
+    rows = []
+    async for item in tasks:
+        rows.append(codec.public_row(item))
+        if len(rows) == chunk_size:
+            yield await run_in_threadpool(encoder.encode, codec.public, rows)
+            rows = []
+    if rows:
+        yield await run_in_threadpool(encoder.encode, codec.public, rows)
+
 @router.get('', response_model=List[task.Model])
-async def get_all_tasks(repository: AbstractRepository = Depends(repository)):
+async def get_all_tasks(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    repository: AsyncAbstractRepository = Depends(repository),
+):
     """
     Get all tasks.
 
     Args:
-        repository (AbstractRepository): The repository to use.
+        response (Response): The response, used to set the next cursor.
+        limit (Optional[int]): The page size, or None for every task.
+        cursor (Optional[str]): The X-Next-Cursor of the previous page.
+        stream (bool): Stream every task as newline delimited JSON.
+        repository (AsyncAbstractRepository): The repository to use.
 
     Returns:
         List[Task]: A list of all tasks.
     """
-    return [asdict(task) for task in repository.list()]
+    if stream:
+        return StreamingResponse(_ndjson(repository.iter()), media_type='application/x-ndjson')
+
+    if limit is None and cursor is None:
+        return [asdict(task) for task in await repository.list()]
+
+    limit = limit or DEFAULT_PAGE_SIZE
+    offset = _decode_cursor(cursor)
+    page = await repository.slice(offset, limit + 1)
+    if len(page) > limit:
+        response.headers['X-Next-Cursor'] = _encode_cursor(offset + limit)
+    return [asdict(task) for task in page[:limit]]
 
 @router.post('', response_model=task.Model, status_code=201)
-async def create_task(name: str, repository: AbstractRepository = Depends(repository)):
+async def create_task(name: str, repository: AsyncAbstractRepository = Depends(repository)):
     """
     Create a task.
 
     Args:
         task (Task): The task to create.
-        repository (AbstractRepository): The repository to use.
+        repository (AsyncAbstractRepository): The repository to use.
 
     Returns:
         Task: The created task
     """
     new_task = Task(name=name)
-    repository.add(new_task)
+    await repository.add(new_task)
     return asdict(new_task)
 
 @router.delete('', status_code=204)
-async def delete_task(name: str, repository: AbstractRepository = Depends(repository)):
+async def delete_task(name: str, repository: AsyncAbstractRepository = Depends(repository)):
     """
     Delete a task.
 
     Args:
         name (str): The name of the task to delete.
-        repository (AbstractRepository): The repository to use.
+        repository (AsyncAbstractRepository): The repository to use.
     """    
-    for task in repository.list():
-        if task.name == name:
-            repository.remove(task)
+    await repository.remove_many(await repository.find_by(name=name))
+
+@router.post('/batch', response_model=List[task.BatchResult], status_code=201)
+async def create_tasks(names: List[str] = Body(...), repository: AsyncAbstractRepository = Depends(repository)):
+    """
+    Create many tasks in one write.
+
+    Args:
+        names (List[str]): The names of the tasks to create.
+        repository (AsyncAbstractRepository): The repository to use.
+
+    Returns:
+        List[BatchResult]: The created task for each name.
+    """
+    new_tasks = [Task(name=name) for name in names]
+    await repository.add_many(new_tasks)
+    return [
+        {'id': item.id, 'name': item.name, 'status': 201, 'task': asdict(item)}
+        for item in new_tasks
+    ]
+
+@router.post('/batch/complete', response_model=List[task.BatchResult])
+async def complete_tasks(ids: List[UUID] = Body(...), repository: AsyncAbstractRepository = Depends(repository)):
+    """
+    Complete many tasks in one write.
+
+    Args:
+        ids (List[UUID]): The ids of the tasks to complete.
+        repository (AsyncAbstractRepository): The repository to use.
+
+    Returns:
+        List[BatchResult]: The outcome for each id.
+    """
+    results = []
+    unit_of_work = AsyncUnitOfWork(repository)
+    for item_id, item in zip(ids, await unit_of_work.get_many(ids)):
+        if item is None:
+            results.append({'id': item_id, 'status': 404, 'detail': 'Task not found'})
+            continue
+        try:
+            item.complete()
+        except Task.AlreadyCompletedError:
+            results.append({'id': item_id, 'name': item.name, 'status': 409, 'detail': 'Task already completed'})
+            continue
+        results.append({'id': item_id, 'name': item.name, 'status': 200, 'task': asdict(item)})
+
+    await unit_of_work.commit()
+    return results
+
+@router.delete('/batch', response_model=List[task.BatchResult])
+async def delete_tasks(ids: List[UUID] = Body(...), repository: AsyncAbstractRepository = Depends(repository)):
+    """
+    Delete many tasks in one write.
+
+    Args:
+        ids (List[UUID]): The ids of the tasks to delete.
+        repository (AsyncAbstractRepository): The repository to use.
+
+    Returns:
+        List[BatchResult]: The outcome for each id.
+    """
+    results, removed = [], []
+    for item_id, item in zip(ids, await repository.get_many(ids)):
+        if item is None:
+            results.append({'id': item_id, 'status': 404, 'detail': 'Task not found'})
+            continue
+        removed.append(item)
+        results.append({'id': item_id, 'name': item.name, 'status': 204})
+
+    await repository.remove_many(removed)
+    return results
+
+@router.get('/export')
+async def export_tasks(
+    format_name: str = Query('ndjson', alias='format', regex=FORMAT_PATTERN),
+    chunk_size: int = Query(transfer.CHUNK_SIZE, ge=1),
+    repository: AsyncAbstractRepository = Depends(repository),
+):
+    """
+    Stream every task out in an interchange format.
+
+    Args:
+        format_name (str): ndjson, csv or columnar.
+        chunk_size (int): The tasks encoded together.
+        repository (AsyncAbstractRepository): The repository to use.
+
+    Returns:
+        StreamingResponse: The encoded tasks.
+    """
+    media_type = transfer.FORMATS[format_name].media_type
+    return StreamingResponse(_export(repository.iter(), format_name, chunk_size), media_type=media_type)
+
+@router.post('/import', response_model=task.ImportResult, status_code=201)
+async def import_tasks(
+    request: Request,
+    format_name: str = Query('ndjson', alias='format', regex=FORMAT_PATTERN),
+    chunk_size: int = Query(transfer.CHUNK_SIZE, ge=1),
+    repository: AsyncAbstractRepository = Depends(repository),
+):
+    """
+    Stream tasks in from the request body, keeping their ids, with one
+    batch write per chunk. Tasks with the id of a stored task replace it.
+
+    The body is spooled to a temporary file rather than held in memory.
+    Chunks written before an invalid line are kept.
+
+    Args:
+        request (Request): The request, its body in the format.
+        format_name (str): ndjson, csv or columnar.
+        chunk_size (int): The tasks written together.
+        repository (AsyncAbstractRepository): The repository to use.
+
+    Raises:
+        HTTPException: The body is not in the format.
+
+    Returns:
+        ImportResult: The number of tasks added or replaced, not counting
+            tasks the same as the stored ones.
+    """
+    with TemporaryFile('w+b') as body:
+        async for piece in request.stream():
+            body.write(piece)
+        body.seek(0)
+        entities = transfer.decode(TextIOWrapper(body, encoding='UTF8', newline=''), codec_for(Task), format_name)
+        imported = 0
+        try:
+            while True:
+                chunk = await run_in_threadpool(lambda: list(islice(entities, chunk_size)))
+                if not chunk:
+                    break
+                chunk = transfer.unique(chunk)
+                stored = await repository.get_many([item.id for item in chunk])
+                added, changed = transfer.split(chunk, stored)
+                await repository.apply_changes(added, changed, [])
+                imported += len(added) + len(changed)
+        except (ValueError, KeyError, IndexError) as error:
+            raise HTTPException(status_code=400, detail=f'Invalid {format_name} body: {error}')
+    return {'imported': imported}
 
 @router.get('/{item_id}', response_model=task.Model)
-async def get_task(item_id: str, repository: AbstractRepository = Depends(repository)):
+async def get_task(item_id: str, repository: AsyncAbstractRepository = Depends(repository)):
     """
     Get a task.
 
     Args:
         item_id (int): The id of the task to get.
-        repository (AbstractRepository): The repository to use.
+        repository (AsyncAbstractRepository): The repository to use.
 
     Returns:
         Task: The task.
     """
-    return asdict(repository.get(item_id))
+    return asdict(await repository.get(item_id))
 
 @router.put('/{item_id}', response_model=task.Model)
-async def update_task(item_id: str, name: str, repository: AbstractRepository = Depends(repository)):
+async def update_task(item_id: str, name: str, repository: AsyncAbstractRepository = Depends(repository)):
     """
     Update a task.
 
     Args:
         item_id (int): The id of the task to update.
         task (Task): The task to update.
-        repository (AbstractRepository): The repository to use.
+        repository (AsyncAbstractRepository): The repository to use.
 
     Returns:
         Task: The updated task.
     """
-    item = repository.get(item_id)
-    repository.remove(item)
-    item.name = name
-    repository.add(item)
+    async with AsyncUnitOfWork(repository) as unit_of_work:
+        item = await unit_of_work.get(item_id)
+        item.name = name
     return asdict(item)
 
 @router.post('/{item_id}/complete', response_model=task.Model)
-async def complete_task(item_id: str, repository: AbstractRepository = Depends(repository)):
+async def complete_task(item_id: str, repository: AsyncAbstractRepository = Depends(repository)):
     """
     Complete a task.
 
     Args:
         item_id (int): The id of the task to complete.
-        repository (AbstractRepository): The repository to use.
+        repository (AsyncAbstractRepository): The repository to use.
 
     Returns:
         Task: The completed task.
     """
-    item = repository.get(item_id)
-    repository.remove(item)
-    item.complete()
-    repository.add(item)
-    return asdict(item)
\ No newline at end of file
+    async with AsyncUnitOfWork(repository) as unit_of_work:
+        item = await unit_of_work.get(item_id)
+        item.complete()
+    return asdict(item)
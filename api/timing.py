@@ -0,0 +1,251 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from asyncio import iscoroutinefunction
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+from typing import Callable, Dict, Iterator, Optional
+
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from viking.infrastructure.async_repository import AsyncRepository
+from viking.infrastructure.metrics import MetricsSink, labels, registry
+
+from api.profiler import SlowRequestProfiler
+
+REQUESTS = 'hungry_task_http_requests_total'
+REQUEST_SECONDS = 'hungry_task_http_request_seconds'
+PHASE_SECONDS = 'hungry_task_http_phase_seconds'
+DESCRIPTIONS = {
+    REQUESTS: 'HTTP requests by method, route and status.',
+    REQUEST_SECONDS: 'Time from receiving a request to sending its last byte.',
+    PHASE_SECONDS: 'Time spent in each phase of handling a request.',
+}
+UNMATCHED = 'unmatched'
+
+
+class RequestTiming:
+    """
+    The phases of the request being handled, in seconds.
+    """
+    def __init__(self):
+        """
+        Constructor for the RequestTiming
+        """
+        self.start = perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.handler_start = self.start
+        self.endpoint_end: Optional[float] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        """
+        Add time to a phase
+
+        Args:
+            name (str): The name of the phase
+            seconds (float): The time spent in it
+        """
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        """
+        Render the phases and the time so far as a Server-Timing header
+
+        Returns:
+            str: The header value, in milliseconds
+        """
+        metrics = [f'{name};dur={seconds * 1000:.3f}' for name, seconds in self.phases.items()]
+        metrics.append(f'total;dur={(perf_counter() - self.start) * 1000:.3f}')
+        return ', '.join(metrics)
+
+
+_timing: ContextVar[Optional[RequestTiming]] = ContextVar('request_timing', default=None)
+
+
+def current_timing() -> Optional[RequestTiming]:
+    """
+    Get the timing of the request being handled
+
+    Returns:
+        Optional[RequestTiming]: The timing, or None outside a request
+    """
+    return _timing.get()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Add the time spent in the block to a phase of the current request
+
+    Args:
+        name (str): The name of the phase
+
+    Returns:
+        Iterator[None]: The block to time
+    """
+    timing = _timing.get()
+    if timing is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, perf_counter() - start)
+
+
+class TimedAsyncRepository(AsyncRepository):
+    """
+    An AsyncRepository that adds the time of its calls to the repository
+    phase of the current request.
+    """
+    async def _run(self, function, *args):
+        with phase('repository'):
+            return await super()._run(function, *args)
+
+
+class TimedRoute(APIRoute):
+    """
+    A route that splits its handler into phases: resolving dependencies and
+    parameters, running the endpoint outside of repository calls, and
+    validating and serializing the response.
+    """
+    def get_route_handler(self) -> Callable[[Request], Response]:
+        call = self.dependant.call
+        if not iscoroutinefunction(call):
+            return super().get_route_handler()
+
+        @wraps(call)
+        async def endpoint(**values):
+            timing = _timing.get()
+            if timing is None:
+                return await call(**values)
+            start = perf_counter()
+            timing.add('dependencies', start - timing.handler_start)
+            before = timing.phases.get('repository', 0.0)
+            try:
+                return await call(**values)
+            finally:
+                timing.endpoint_end = perf_counter()
+                spent = timing.endpoint_end - start - (timing.phases.get('repository', 0.0) - before)
+                timing.add('endpoint', spent)
+
+        self.dependant.call = endpoint
+        handler = super().get_route_handler()
+
+        async def timed(request: Request) -> Response:
+            timing = _timing.get()
+            if timing is None:
+                return await handler(request)
+            timing.handler_start = perf_counter()
+            timing.endpoint_end = None
+            response = await handler(request)
+            if timing.endpoint_end is not None:
+                timing.add('serialize', perf_counter() - timing.endpoint_end)
+            return response
+
+        return timed
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware recording the latency and phases of every HTTP request
+    in a metrics sink and a Server-Timing response header, and handing slow
+    requests to a sampling profiler.
+    """
+    def __init__(
+        self,
+        app: ASGIApp,
+        sink: Optional[MetricsSink] = None,
+        profiler: Optional[SlowRequestProfiler] = None,
+    ):
+        """
+        Constructor for the TimingMiddleware
+
+        Args:
+            app (ASGIApp): The application to time
+            sink (Optional[MetricsSink]): Where measurements go, the
+                process-wide registry by default
+            profiler (Optional[SlowRequestProfiler]): The profiler told
+                about every finished request
+        """
+        self.app = app
+        self.sink = registry if sink is None else sink
+        self.profiler = profiler
+        self._routes: Optional[Dict[object, str]] = None
+        describe = getattr(self.sink, 'describe', None)
+        if describe is not None:
+            for name, description in DESCRIPTIONS.items():
+                describe(name, description)
+
+    def _route(self, scope: Scope) -> str:
+        """
+        Get the path template of the route that handled a request, so every
+        task shares one series
+
+        Args:
+            scope (Scope): The scope of the handled request
+
+        Returns:
+            str: The template, or 'unmatched' if no route matched
+        """
+        if self._routes is None and 'app' in scope:
+            self._routes = {
+                route.endpoint: route.path
+                for route in getattr(scope['app'], 'routes', [])
+                if hasattr(route, 'endpoint')
+            }
+        return (self._routes or {}).get(scope.get('endpoint'), UNMATCHED)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _timing.set(timing)
+        status = 500
+
+        async def send_timed(message: Message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                headers = list(message.get('headers', []))
+                headers.append((b'server-timing', timing.server_timing().encode('latin-1')))
+                message = {**message, 'headers': headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            _timing.reset(token)
+            end = perf_counter()
+            route = self._route(scope)
+            method = scope['method']
+            self.sink.increment(REQUESTS, labels(method=method, route=route, status=status))
+            self.sink.observe(REQUEST_SECONDS, labels(method=method, route=route), end - timing.start)
+            for name, seconds in timing.phases.items():
+                self.sink.observe(PHASE_SECONDS, labels(method=method, route=route, phase=name), seconds)
+            if self.profiler is not None:
+                self.profiler.finished(method, scope['path'], timing.start, end)
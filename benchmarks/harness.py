@@ -0,0 +1,149 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+import platform
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Callable, Dict, List
+
+Results = Dict[str, Dict[str, float]]
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(latencies: List[float], rank: int) -> float:
+    """
+    Get a percentile of sorted latencies by the nearest-rank method
+
+    Args:
+        latencies (List[float]): The sorted latencies
+        rank (int): The percentile, from 1 to 100
+
+    Returns:
+        float: The latency at the percentile
+    """
+    index = max(0, -(-len(latencies) * rank // 100) - 1)
+    return latencies[index]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """
+    Summarize the latencies of an operation
+
+    Args:
+        latencies (List[float]): The seconds each call took
+
+    Returns:
+        Dict[str, float]: The calls per second and the latency percentiles
+            in microseconds
+    """
+    latencies = sorted(latencies)
+    summary = {'operations': len(latencies), 'ops_per_second': len(latencies) / (sum(latencies) or 1e-9)}
+    for rank in PERCENTILES:
+        summary[f'p{rank}_us'] = percentile(latencies, rank) * 1e6
+    return summary
+
+
+def measure(operation: Callable[[int], object], count: int) -> Dict[str, float]:
+    """
+    Time each call of an operation
+
+    Args:
+        operation (Callable[[int], object]): The operation, called with the
+            number of the call
+        count (int): The number of calls
+
+    Returns:
+        Dict[str, float]: The summary of the calls
+    """
+    latencies = []
+    for number in range(count):
+        start = perf_counter()
+        operation(number)
+        latencies.append(perf_counter() - start)
+    return summarize(latencies)
+
+
+def report(results: Results) -> dict:
+    """
+    Wrap results with the details of the machine that produced them
+
+    Args:
+        results (Results): The summary of each benchmark
+
+    Returns:
+        dict: The report
+    """
+    return {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def save(path: str, results: Results) -> None:
+    """
+    Write results as a JSON baseline
+
+    Args:
+        path (str): The baseline file
+        results (Results): The summary of each benchmark
+    """
+    with open(path, 'w', encoding='UTF8') as f:
+        json.dump(report(results), f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def load(path: str) -> Results:
+    """
+    Read the results of a JSON baseline
+
+    Args:
+        path (str): The baseline file
+
+    Returns:
+        Results: The summary of each benchmark
+    """
+    with open(path, encoding='UTF8') as f:
+        return json.load(f)['results']
+
+
+def compare(baseline: Results, current: Results, tolerance: float) -> List[str]:
+    """
+    Find the benchmarks whose throughput fell below the baseline by more
+    than the tolerance
+
+    Args:
+        baseline (Results): The results to compare against
+        current (Results): The new results
+        tolerance (float): The accepted drop, as a fraction of the baseline
+
+    Returns:
+        List[str]: A description of each regression
+    """
+    regressions = []
+    for name, summary in sorted(current.items()):
+        if name not in baseline:
+            continue
+        before, after = baseline[name]['ops_per_second'], summary['ops_per_second']
+        if after < before * (1 - tolerance):
+            regressions.append(f'{name}: {after:,.0f} ops/s, baseline {before:,.0f} ops/s ({after / before - 1:+.0%})')
+    return regressions
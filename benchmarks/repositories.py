@@ -0,0 +1,127 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from os.path import join
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable, Dict, Iterable
+
+from benchmarks.harness import Results, measure, summarize
+from viking.domain.seedwork import AbstractRepository
+from viking.domain.task import Task
+from viking.fakes import FakeRepository
+from viking.infrastructure.alchemy_repository import (AlchemyRepository,
+                                                     session_factory)
+from viking.infrastructure.binary_repository import BinaryRepository
+from viking.infrastructure.csv_repository import CsvRepository
+from viking.infrastructure.log_repository import LogRepository
+
+Builder = Callable[[str], AbstractRepository]
+
+BACKENDS: Dict[str, Builder] = {
+    'fake': lambda directory: FakeRepository(),
+    'csv': lambda directory: CsvRepository(join(directory, 'tasks.csv'), Task),
+    'csv-cached': lambda directory: CsvRepository(join(directory, 'tasks.csv'), Task, cached=True),
+    'log': lambda directory: LogRepository(join(directory, 'tasks.log'), Task),
+    'binary': lambda directory: BinaryRepository(join(directory, 'tasks.bin'), Task),
+    'alchemy': lambda directory: AlchemyRepository(
+        session_factory(f'sqlite:///{join(directory, "tasks.db")}')(), Task, autocommit=True
+    ),
+}
+
+# Full scans are timed fewer times than point operations.
+LIST_RUNS = 5
+
+
+def _load(repository: AbstractRepository, size: int) -> Dict[str, float]:
+    """
+    Fill a repository with tasks in one batch
+
+    Args:
+        repository (AbstractRepository): The empty repository
+        size (int): The number of tasks
+
+    Returns:
+        Dict[str, float]: The summary of the batch
+    """
+    tasks = [Task(f'Task {number}') for number in range(size)]
+    start = perf_counter()
+    repository.add_many(tasks)
+    elapsed = perf_counter() - start
+    summary = summarize([elapsed])
+    summary['ops_per_second'] = size / max(elapsed, 1e-9)
+    return summary
+
+
+def bench_repository(repository: AbstractRepository, size: int, samples: int, seed: int = 0) -> Results:
+    """
+    Measure the operations of a repository holding a number of tasks
+
+    Args:
+        repository (AbstractRepository): The empty repository
+        size (int): The number of tasks to store first
+        samples (int): The number of calls timed per point operation
+        seed (int): The seed picking which tasks are read
+
+    Returns:
+        Results: The summary of each operation
+    """
+    results = {'load': _load(repository, size)}
+    ids = [task.id for task in repository.list()]
+    picks = Random(seed).sample(ids, min(samples, len(ids)))
+    added = [Task(f'Added {number}') for number in range(samples)]
+
+    results['get'] = measure(lambda n: repository.get(picks[n % len(picks)]), samples)
+    results['find_by_name'] = measure(lambda n: repository.find_by_name(f'Task {n % size}'), samples)
+    results['add'] = measure(lambda n: repository.add(added[n]), samples)
+    results['complete'] = measure(lambda n: repository.update_fields(added[n].id, completed=True), samples)
+    results['list'] = measure(lambda n: repository.list(), LIST_RUNS)
+    results['remove'] = measure(lambda n: repository.remove(added[n]), samples)
+    return results
+
+
+def run(backends: Iterable[str], sizes: Iterable[int], samples: int) -> Results:
+    """
+    Measure every backend at every size, each in a fresh directory
+
+    Args:
+        backends (Iterable[str]): The names of the backends
+        sizes (Iterable[int]): The numbers of stored tasks
+        samples (int): The number of calls timed per point operation
+
+    Returns:
+        Results: The summary of each operation, keyed by
+            repository/<backend>/<size>/<operation>
+    """
+    results = {}
+    for backend in backends:
+        for size in sizes:
+            with TemporaryDirectory() as directory:
+                repository = BACKENDS[backend](directory)
+                try:
+                    measured = bench_repository(repository, size, samples)
+                finally:
+                    close = getattr(repository, 'close', None)
+                    if close is not None:
+                        close()
+            for operation, summary in measured.items():
+                results[f'repository/{backend}/{size}/{operation}'] = summary
+    return results
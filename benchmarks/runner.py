@@ -0,0 +1,89 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from os.path import abspath, dirname, exists, join
+from typing import List
+
+import click
+
+from benchmarks import repositories, startup, web
+from benchmarks.harness import Results, compare, load, save
+
+BASELINES = join(dirname(abspath(__file__)), 'baselines')
+
+
+def _numbers(value: str) -> List[int]:
+    return [int(number) for number in value.split(',') if number]
+
+
+def _names(value: str) -> List[str]:
+    names = [name for name in value.split(',') if name]
+    unknown = sorted(set(names) - set(repositories.BACKENDS))
+    if unknown:
+        raise click.BadParameter(f"unknown backends {', '.join(unknown)}")
+    return names
+
+
+def _print(results: Results) -> None:
+    width = max(map(len, results), default=0)
+    click.echo(f"{'benchmark':<{width}}  {'ops/s':>12}  {'p50 us':>10}  {'p95 us':>10}  {'p99 us':>10}")
+    for name, summary in results.items():
+        click.echo(
+            f"{name:<{width}}  {summary['ops_per_second']:>12,.0f}  {summary['p50_us']:>10,.1f}"
+            f"  {summary['p95_us']:>10,.1f}  {summary['p99_us']:>10,.1f}"
+        )
+
+
+@click.command()
+@click.option('--sizes', default='1000,10000', show_default=True, help='Numbers of stored tasks, comma separated.')
+@click.option('--backends', default=','.join(repositories.BACKENDS), show_default=True, help='Backends to measure, comma separated.')
+@click.option('--samples', default=200, show_default=True, help='Calls timed per operation.')
+@click.option('--cli-runs', default=10, show_default=True, help='CLI launches timed, 0 to skip.')
+@click.option('--api-requests', default=200, show_default=True, help='Requests timed per API route, 0 to skip.')
+@click.option('--baselines', default=BASELINES, show_default=True, help='Directory holding the JSON baselines.')
+@click.option('--save', 'save_as', help='Save the results as this baseline.')
+@click.option('--compare', 'compare_to', help='Compare the results with this baseline.')
+@click.option('--tolerance', default=0.25, show_default=True, help='Accepted drop in throughput, as a fraction.')
+def main(sizes: str, backends: str, samples: int, cli_runs: int, api_requests: int,
+         baselines: str, save_as: str, compare_to: str, tolerance: float):
+    """
+    Measure the repositories, the CLI and the API, optionally saving the
+    results as a baseline or failing when they regress against one.
+    """
+    sizes, backends = _numbers(sizes), _names(backends)
+    baseline = join(baselines, f'{compare_to}.json') if compare_to else None
+    if baseline and not exists(baseline):
+        raise click.BadParameter(f'no baseline at {baseline}', param_hint='--compare')
+
+    results = repositories.run(backends, sizes, samples)
+    if cli_runs:
+        results.update(startup.run(cli_runs))
+    if api_requests:
+        results.update(web.run(max(sizes, default=0), api_requests))
+    _print(results)
+
+    if save_as:
+        save(join(baselines, f'{save_as}.json'), results)
+    if baseline:
+        regressions = compare(load(baseline), results, tolerance)
+        for regression in regressions:
+            click.echo(f'REGRESSION {regression}', err=True)
+        if regressions:
+            raise SystemExit(1)
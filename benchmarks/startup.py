@@ -0,0 +1,47 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import subprocess
+import sys
+from os.path import abspath, dirname, join
+from time import perf_counter
+
+from benchmarks.harness import Results, summarize
+
+ROOT = dirname(dirname(abspath(__file__)))
+COMMAND = [sys.executable, join(ROOT, 'cli.py'), 'fake', 'list']
+
+
+def run(runs: int) -> Results:
+    """
+    Time fresh interpreters running the CLI, from launch to exit
+
+    Args:
+        runs (int): The number of interpreters to launch
+
+    Returns:
+        Results: The summary of the launches, keyed by cli/cold_start
+    """
+    latencies = []
+    for _ in range(runs):
+        start = perf_counter()
+        subprocess.run(COMMAND, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        latencies.append(perf_counter() - start)
+    return {'cli/cold_start': summarize(latencies)}
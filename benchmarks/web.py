@@ -0,0 +1,86 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from os.path import join
+from tempfile import TemporaryDirectory
+from typing import List
+
+from api import api
+from api.dependencies import repository
+from fastapi.testclient import TestClient
+
+from benchmarks.harness import Results, measure
+from viking.domain.task import Task
+from viking.infrastructure.async_repository import AsyncRepository
+from viking.infrastructure.csv_repository import CsvRepository
+
+
+def run(size: int, samples: int) -> Results:
+    """
+    Measure the requests per second the API serves through the test client,
+    backed by a cached CSV repository like the one the API builds on startup
+
+    Args:
+        size (int): The number of tasks stored before the requests
+        samples (int): The number of requests timed per route
+
+    Returns:
+        Results: The summary of each route, keyed by api/<size>/<route>
+    """
+    with TemporaryDirectory() as directory:
+        backend = CsvRepository(join(directory, 'api.csv'), Task, cached=True)
+        backend.add_many(Task(f'Task {number}') for number in range(size))
+        return _requests(AsyncRepository(backend), [str(task.id) for task in backend.list()], size, samples)
+
+
+def _requests(shared: AsyncRepository, ids: List[str], size: int, samples: int) -> Results:
+    """
+    Time requests to each route against a shared repository
+
+    Args:
+        shared (AsyncRepository): The repository every request uses
+        ids (List[str]): The ids of the stored tasks
+        size (int): The number of stored tasks, used in the keys
+        samples (int): The number of requests timed per route
+
+    Returns:
+        Results: The summary of each route
+    """
+    async def override() -> AsyncRepository:
+        return shared
+
+    api.dependency_overrides[repository] = override
+    try:
+        client = TestClient(api)
+
+        def request(method: str, url: str, **kwargs):
+            def send(number: int):
+                response = client.request(method, url.format(id=ids[number % len(ids)], number=number), **kwargs)
+                response.raise_for_status()
+            return send
+
+        return {
+            f'api/{size}/list': measure(request('GET', '/tasks?limit=100'), samples),
+            f'api/{size}/get': measure(request('GET', '/tasks/{id}'), samples),
+            f'api/{size}/create': measure(request('POST', '/tasks?name=Added%20{number}'), samples),
+            f'api/{size}/complete': measure(request('POST', '/tasks/{id}/complete'), samples),
+        }
+    finally:
+        api.dependency_overrides.pop(repository, None)
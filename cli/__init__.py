@@ -18,24 +18,92 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import shlex
+import signal
+import sys
+
 import click
+from cli.daemon import Daemon, ForwardingGroup, capture, socket_path
 from viking.domain.seedwork import AbstractRepository
 from viking.domain.task import Task
+from viking.infrastructure import transfer
+from viking.infrastructure.codec import codec_for
 from viking.infrastructure.repository_factory import RepositoryFactory
+from viking.infrastructure.staging_repository import StagingRepository
 
 repository: AbstractRepository = None
 
-@click.group()
+SHELL_SYNTAX = frozenset('\'"\\#')
+
+@click.group(cls=ForwardingGroup)
 @click.argument('repo', required=True)
 def cli(repo: str):
    """
    This is the main entry point for the hungry task CLI.
 
+   add, get, remove, list and complete are served by the daemon of the
+   repository when one is running. The repository is only opened by the
+   commands that use it.
+
    Args:
        repo (str): The name of the repository to use.
    """
    global repository
-   repository = RepositoryFactory(Task).create(repo)
+   repository = None
+
+def close_repository(opened: AbstractRepository):
+   """
+   Close a repository, when its backend holds something open.
+
+   Args:
+      opened (AbstractRepository): The repository.
+   """
+   close = getattr(opened, 'close', None)
+   if close is not None:
+      close()
+
+def open_repository() -> AbstractRepository:
+   """
+   Get the repository of the command, opening it on first use and closing
+   it when the command finishes.
+
+   Raises:
+      ClickException: The repository is not configured correctly.
+
+   Returns:
+      AbstractRepository: The repository.
+   """
+   global repository
+   if repository is None:
+      ctx = click.get_current_context().find_root()
+      try:
+         repository = RepositoryFactory(Task).create(ctx.params['repo'])
+      except ValueError as error:
+         raise click.ClickException(str(error))
+      ctx.call_on_close(lambda opened=repository: close_repository(opened))
+   return repository
+
+def open_cached(repo: str) -> AbstractRepository:
+   """
+   Open a repository that keeps its file parsed and indexed in memory
+   between calls, when its backend can.
+
+   Args:
+      repo (str): The name of the repository.
+
+   Raises:
+      ClickException: The repository is not configured correctly.
+
+   Returns:
+      AbstractRepository: The repository.
+   """
+   try:
+      backend, settings = RepositoryFactory(Task).resolve(repo)
+      if any(option.name == 'cached' for option in backend.options):
+         settings.setdefault('cached', True)
+      return backend.create(Task, settings)
+   except ValueError as error:
+      raise click.ClickException(str(error))
 
 @click.argument('name')
 @cli.command()
@@ -46,6 +114,7 @@ def add(name: str):
    Args:
        name (str): The name of the task to add.
    """
+   repository = open_repository()
    click.echo(f"Task added '{name}'")
    repository.add(Task(name))
 
@@ -58,12 +127,13 @@ def get(name: str):
    Args:
        name (str): The name of the task to get.
    """   
-   for task in repository.list():
-      if task.name == name:
-         completed: str = 'x' if str(task.completed) == str(True) else ' '
-         click.echo(f"[{completed}] - {task.name}")
-         return
-   click.echo(f"Task '{name}' not found")
+   repository = open_repository()
+   task = repository.find_by_name(name)
+   if task is None:
+      click.echo(f"Task '{name}' not found")
+      return
+   completed: str = 'x' if str(task.completed) == str(True) else ' '
+   click.echo(f"[{completed}] - {task.name}")
 
 @click.argument('name')
 @cli.command()
@@ -74,19 +144,20 @@ def remove(name: str):
    Args:
        name (str): The name of the task to remove.
    """   
+   repository = open_repository()
    click.echo(f"Task removed '{name}'")
-   for task in repository.list():
-      if task.name == name:
-         repository.remove(task)
-         return
-   click.echo(f"Task '{name}' not found")
+   task = repository.find_by_name(name)
+   if task is None:
+      click.echo(f"Task '{name}' not found")
+      return
+   repository.remove(task)
 
 @cli.command()
 def list():
    """
    List all tasks.
    """
-   for task in repository.list():
+   for task in open_repository().list():
       completed: str = 'x' if str(task.completed) == str(True) else ' '
       click.echo(f"[{completed}] - {task.name}")
 
@@ -99,14 +170,143 @@ def complete(name: str):
    Args:
       name (str): The name of the task to mark as complete.
    """   
-   for task in repository.list():
-      if task.name == name:
+   repository = open_repository()
+   task = repository.find_by_name(name)
+   if task is None:
+      click.echo(f"Task '{name}' not found")
+      return
+   try:
+      task = task.complete()
+   except Task.AlreadyCompletedError:
+      click.echo(f"Task '{name}' already completed")
+      return
+   repository.update(task)
+   click.echo(f"Task '{name}' completed")
+
+@click.option('--file', '-f', 'source', type=click.File('r'), default='-', help='Read commands from a file instead of stdin.')
+@cli.command()
+@click.pass_context
+def batch(ctx: click.Context, source):
+   """
+   Run commands, one per line, against a single repository.
+
+   Changes are held in memory and written in one pass once every command
+   succeeded; nothing is written if one fails. Blank lines and lines
+   starting with # are skipped.
+
+   Args:
+      source (File): The commands, stdin by default.
+   """
+   global repository
+   stored, cached = repository, open_cached(ctx.parent.params['repo'])
+   # Lines look tasks up by name, so reads come from one parsed copy of the file.
+   repository = StagingRepository(cached)
+   try:
+      for number, line in enumerate(source, 1):
+         args = line.split() if SHELL_SYNTAX.isdisjoint(line) else shlex.split(line, comments=True)
+         if not args:
+            continue
+         name, *rest = args
+         command = cli.get_command(ctx.parent, name)
+         if command is None or command is batch:
+            raise click.UsageError(f"line {number}: unknown command '{name}'")
          try:
-            task = task.complete()
-         except Task.AlreadyCompletedError:
-            click.echo(f"Task '{name}' already completed")
-            return
-         repository.add(task)
-         click.echo(f"Task '{name}' completed")
-         return
-   click.echo(f"Task '{name}' not found")
+            # Lines have no --help, and building it per line costs more than the command.
+            with command.make_context(name, rest, parent=ctx.parent, help_option_names=[]) as sub:
+               command.invoke(sub)
+         except click.ClickException as error:
+            raise click.UsageError(f'line {number}: {error.format_message()}')
+      repository.flush()
+   finally:
+      repository = stored
+      close_repository(cached)
+
+@click.option('--workers', default=1, show_default=True, help='Processes encoding chunks in parallel.')
+@click.option('--chunk-size', default=transfer.CHUNK_SIZE, show_default=True, help='Tasks encoded together.')
+@click.option('--format', 'format_name', type=click.Choice(sorted(transfer.FORMATS)), default='ndjson', show_default=True)
+@click.option('--output', '-o', 'target', type=click.File('w', encoding='UTF8'), default='-', help='Write to a file instead of stdout.')
+@cli.command('export')
+def export_tasks(target, format_name: str, chunk_size: int, workers: int):
+   """
+   Stream every task out, a chunk at a time.
+
+   Args:
+      target (File): Where to write, stdout by default.
+      format_name (str): ndjson, csv or columnar.
+      chunk_size (int): The tasks encoded together.
+      workers (int): The processes encoding chunks in parallel.
+   """
+   for text in transfer.encode(open_repository().iter(), codec_for(Task), format_name, chunk_size, workers):
+      target.write(text)
+
+@click.option('--chunk-size', default=transfer.CHUNK_SIZE, show_default=True, help='Tasks written together.')
+@click.option('--format', 'format_name', type=click.Choice(sorted(transfer.FORMATS)), default='ndjson', show_default=True)
+@click.option('--file', '-f', 'source', type=click.File('r', encoding='UTF8'), default='-', help='Read from a file instead of stdin.')
+@cli.command('import')
+@click.pass_context
+def import_tasks(ctx: click.Context, source, format_name: str, chunk_size: int):
+   """
+   Stream tasks in, keeping their ids, with one batch write per chunk.
+
+   Tasks with the id of a stored task replace it, so an import can be
+   repeated, and only the tasks added or replaced are counted. The stored
+   ids are looked up in a cached copy of the file when the backend has one.
+   Pipe export into import to move tasks between repositories.
+
+   Args:
+      source (File): The tasks, stdin by default.
+      format_name (str): ndjson, csv or columnar.
+      chunk_size (int): The tasks written together.
+   """
+   target = open_cached(ctx.parent.params['repo'])
+   try:
+      count = transfer.load(target, transfer.decode(source, codec_for(Task), format_name), chunk_size)
+   except (ValueError, KeyError, IndexError) as error:
+      raise click.ClickException(f'Invalid {format_name} input: {error}')
+   finally:
+      close_repository(target)
+   click.echo(f'Imported {count} tasks')
+
+@click.option('--socket', 'path', default=None, help='Listen on this socket instead of the default one.')
+@cli.command()
+@click.pass_context
+def daemon(ctx: click.Context, path: str):
+   """
+   Serve add, get, remove, list and complete over a Unix domain socket.
+
+   The daemon keeps the repository open, with its file parsed and indexed
+   when the backend can cache it, so the commands skip interpreter start
+   up, imports and parsing. It runs in the foreground until interrupted
+   or sent SIGTERM.
+
+   Args:
+      path (str): The socket, HUNGRY_TASK_SOCKET or a file named after the
+         repository in the working directory by default.
+   """
+   global repository
+   repo = ctx.parent.params['repo']
+   repository = open_cached(repo)
+   repository.list()
+
+   def run(argv):
+      name, *rest = argv
+      command = cli.get_command(ctx.parent, name)
+      def invoke():
+         with command.make_context(name, rest, parent=ctx.parent, help_option_names=[]) as sub:
+            command.invoke(sub)
+      return capture(invoke)
+
+   path = path or socket_path(repo)
+   try:
+      server = Daemon(path, repo, run)
+   except RuntimeError as error:
+      raise click.ClickException(str(error))
+   signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+   click.echo(f"Serving '{repo}' on {path}")
+   try:
+      server.serve_forever()
+   except KeyboardInterrupt:
+      pass
+   finally:
+      server.server_close()
+      close_repository(repository)
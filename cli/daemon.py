@@ -0,0 +1,194 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+import os
+import socket
+from contextlib import redirect_stdout
+from io import StringIO
+from socketserver import StreamRequestHandler, UnixStreamServer
+from typing import Callable, List, Optional, Tuple
+
+import click
+
+SERVED_COMMANDS = frozenset(('add', 'get', 'remove', 'list', 'complete'))
+TIMEOUT = 30.0
+
+Runner = Callable[[List[str]], Tuple[str, int]]
+
+
+def socket_path(repo: str) -> str:
+   """
+   Get the socket the daemon of a repository listens on.
+
+   Args:
+      repo (str): The name of the repository.
+
+   Returns:
+      str: HUNGRY_TASK_SOCKET if set, otherwise a socket in the working
+         directory, next to the files of the repository.
+   """
+   return os.environ.get('HUNGRY_TASK_SOCKET', f'.hungry-task-{repo}.sock')
+
+def _exchange(path: str, request: dict) -> Optional[dict]:
+   """
+   Send a request to a daemon and wait for its response.
+
+   Args:
+      path (str): The socket of the daemon.
+      request (dict): The request.
+
+   Returns:
+      Optional[dict]: The response, or None if no daemon answered.
+   """
+   if not hasattr(socket, 'AF_UNIX') or not os.path.exists(path):
+      return None
+   try:
+      with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+         connection.settimeout(TIMEOUT)
+         connection.connect(path)
+         connection.sendall(json.dumps(request).encode() + b'\n')
+         with connection.makefile('rb') as responses:
+            line = responses.readline()
+   except OSError:
+      return None
+   return json.loads(line) if line else None
+
+def forward(repo: str, argv: List[str]) -> Optional[Tuple[str, int]]:
+   """
+   Run a command in the daemon of a repository, if one is running.
+
+   Args:
+      repo (str): The name of the repository.
+      argv (List[str]): The command and its arguments.
+
+   Returns:
+      Optional[Tuple[str, int]]: The output and exit code of the command,
+         or None if it has to run in this process.
+   """
+   if not argv or argv[0] not in SERVED_COMMANDS:
+      return None
+   response = _exchange(socket_path(repo), {'repo': repo, 'argv': argv})
+   if response is None or not response.get('served'):
+      return None
+   return response['output'], response['exit_code']
+
+def running(path: str) -> bool:
+   """
+   Check if a daemon answers on a socket.
+
+   Args:
+      path (str): The socket.
+
+   Returns:
+      bool: True if a daemon answered.
+   """
+   return _exchange(path, {'repo': None, 'argv': []}) is not None
+
+
+class _Handler(StreamRequestHandler):
+   def handle(self):
+      for line in self.rfile:
+         try:
+            request = json.loads(line)
+         except ValueError:
+            return
+         argv = request.get('argv') or ['']
+         response = {'served': False}
+         if request.get('repo') == self.server.repo and argv[0] in SERVED_COMMANDS:
+            output, exit_code = self.server.run(argv)
+            response = {'served': True, 'output': output, 'exit_code': exit_code}
+         self.wfile.write(json.dumps(response).encode() + b'\n')
+
+
+class Daemon(UnixStreamServer):
+   """
+   Serves commands for one repository over a Unix domain socket, one
+   connection at a time, so the repository is never used concurrently.
+
+   Requests and responses are single lines of JSON.
+   """
+   def __init__(self, path: str, repo: str, run: Runner):
+      """
+      Constructor for the Daemon
+
+      Args:
+         path (str): The socket to listen on.
+         repo (str): The name of the repository served.
+         run (Runner): Runs a command, returning its output and exit code.
+
+      Raises:
+         RuntimeError: Another daemon is serving the socket.
+      """
+      if running(path):
+         raise RuntimeError(f'A daemon is already listening on {path}')
+      if os.path.exists(path):
+         os.remove(path)
+      self.repo = repo
+      self.run = run
+      super().__init__(path, _Handler)
+      os.chmod(path, 0o600)
+
+   def server_close(self):
+      super().server_close()
+      try:
+         os.remove(self.server_address)
+      except FileNotFoundError:
+         pass
+
+def capture(command: Callable[[], None]) -> Tuple[str, int]:
+   """
+   Run a command, capturing what it echoes.
+
+   Args:
+      command (Callable[[], None]): The command.
+
+   Returns:
+      Tuple[str, int]: The output and exit code.
+   """
+   output = StringIO()
+   exit_code = 0
+   with redirect_stdout(output):
+      try:
+         command()
+      except click.ClickException as error:
+         output.write(f'Error: {error.format_message()}\n')
+         exit_code = error.exit_code
+      except click.exceptions.Exit as error:
+         exit_code = error.exit_code
+      except Exception as error:
+         output.write(f'Error: {error}\n')
+         exit_code = 1
+   return output.getvalue(), exit_code
+
+
+class ForwardingGroup(click.Group):
+   """
+   A group that hands the commands a daemon serves to the daemon of the
+   repository when one is running, before the repository is even opened,
+   and runs them in this process otherwise.
+   """
+   def invoke(self, ctx: click.Context):
+      result = forward(ctx.params['repo'], [*ctx.protected_args, *ctx.args])
+      if result is None:
+         return super().invoke(ctx)
+      output, exit_code = result
+      click.echo(output, nl=False)
+      ctx.exit(exit_code)
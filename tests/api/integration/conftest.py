@@ -27,10 +27,11 @@ from api.models import task
 from fastapi.testclient import TestClient
 from pytest import fixture
 from viking.domain.task import Task
+from viking.infrastructure.async_repository import AsyncRepository
 from viking.infrastructure.csv_repository import CsvRepository
 
-async def get_repository() -> CsvRepository:
-    return CsvRepository('api.csv', Task)
+async def get_repository() -> AsyncRepository:
+    return AsyncRepository(CsvRepository('api.csv', Task))
 
 @fixture
 def client() -> TestClient:
@@ -0,0 +1,79 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from asyncio import run
+
+from api import api
+from api.dependencies import (RepositoryProvider, build_repository, factory,
+                              provider, repository)
+from viking.fakes import FakeRepository
+from viking.infrastructure.csv_repository import CsvRepository
+from viking.infrastructure.log_repository import LogRepository
+
+
+def test_provider_builds_once():
+    built = []
+    shared = RepositoryProvider(lambda: built.append(1) or FakeRepository())
+
+    assert shared.get() is shared.get()
+    assert len(built) == 1
+
+def test_provider_shutdown_closes_repository():
+    class ClosingRepository(FakeRepository):
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    shared = RepositoryProvider(ClosingRepository)
+    inner = shared.get().repository
+    shared.shutdown()
+
+    assert inner.closed
+    assert shared.get().repository is not inner
+
+def test_dependency_returns_shared_repository():
+    assert run(repository()) is run(repository())
+
+def test_application_lifespan_owns_repository():
+    provider.shutdown()
+
+    run(api.router.startup())
+    assert provider._repository is not None
+
+    run(api.router.shutdown())
+    assert provider._repository is None
+
+def test_build_repository_defaults_to_cached_csv(monkeypatch):
+    monkeypatch.delenv('HUNGRY_TASK_API_REPOSITORY', raising=False)
+
+    built = build_repository()
+
+    assert isinstance(built.repository, CsvRepository)
+    assert built.repository.filename == 'api.csv' and built.repository.cached
+
+def test_build_repository_from_config(tmp_path, monkeypatch):
+    monkeypatch.setenv('HUNGRY_TASK_API_REPOSITORY', 'work')
+    monkeypatch.setitem(factory.config, 'work', {'backend': 'log', 'filename': str(tmp_path / 'work.log')})
+
+    built = build_repository()
+
+    assert isinstance(built.repository, LogRepository)
+    assert built.backend == 'log'
@@ -0,0 +1,49 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from api import api
+from api.dependencies import factory, repository
+from fastapi.testclient import TestClient
+from viking.domain.task import Task
+from viking.infrastructure.async_repository import AsyncRepository
+from viking.infrastructure.csv_repository import CsvRepository
+from viking.infrastructure.metrics import registry
+
+
+def test_metrics_exposes_repository_calls(tmp_path):
+    instrumented = AsyncRepository(factory.instrument('csv', CsvRepository(str(tmp_path / 'api.csv'), Task)))
+
+    async def get_repository() -> AsyncRepository:
+        return instrumented
+
+    api.dependency_overrides[repository] = get_repository
+    client = TestClient(api)
+    before = registry.counter('hungry_task_repository_calls_total', backend='csv', operation='add')
+    try:
+        client.post('/tasks', params={'name': 'Measured'})
+        response = client.get('/metrics')
+    finally:
+        api.dependency_overrides.pop(repository)
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    assert registry.counter('hungry_task_repository_calls_total', backend='csv', operation='add') == before + 1
+    assert '# TYPE hungry_task_repository_seconds histogram' in response.text
+    assert 'hungry_task_repository_bytes_written_total{backend="csv",operation="add"}' in response.text
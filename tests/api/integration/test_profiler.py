@@ -0,0 +1,90 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from threading import Event, Thread
+from time import perf_counter, sleep
+
+from api.profiler import SlowRequest, SlowRequestProfiler, collapse
+
+
+def busy_waiting(done: Event):
+    while not done.is_set():
+        sleep(0.001)
+
+def test_collapse_renders_outermost_frame_first():
+    def inner():
+        import sys
+        return collapse(sys._getframe())
+
+    stack = inner().split(';')
+
+    assert stack[-1].startswith('inner (test_profiler.py:')
+    assert stack[-2].startswith('test_collapse_renders_outermost_frame_first (')
+
+def test_samples_stacks_of_other_threads():
+    profiler = SlowRequestProfiler(interval=1)
+    done = Event()
+    worker = Thread(target=busy_waiting, args=(done,))
+    profiler.enable(0)
+    start = perf_counter()
+    worker.start()
+    sleep(0.05)
+    done.set()
+    worker.join()
+
+    stacks = profiler.stacks(start, perf_counter())
+    profiler.disable()
+
+    assert any('busy_waiting (test_profiler.py' in stack for stack in stacks)
+    assert profiler.stacks(start, perf_counter()) == {}
+
+def test_history_is_kept_in_ticks_not_samples():
+    profiler = SlowRequestProfiler(interval=1, history=0.01)
+    done = Event()
+    workers = [Thread(target=busy_waiting, args=(done,)) for _ in range(20)]
+    for worker in workers:
+        worker.start()
+    start = perf_counter()
+    profiler.enable(0)
+    sleep(0.05)
+    stacks = profiler.stacks(start, perf_counter())
+    profiler.disable()
+    done.set()
+    for worker in workers:
+        worker.join()
+
+    assert sum(stacks.values()) > 10
+
+def test_reports_only_requests_over_the_threshold():
+    reports = []
+    profiler = SlowRequestProfiler(report=reports.append)
+
+    profiler.finished('GET', '/tasks', 0.0, 1.0)
+    profiler.enable(500)
+    profiler.finished('GET', '/fast', 0.0, 0.1)
+    profiler.finished('GET', '/slow', 0.0, 0.6)
+    profiler.disable()
+
+    assert [r.path for r in reports] == ['/slow']
+
+def test_hottest_stacks():
+    request = SlowRequest('GET', '/tasks', 1.0, {'a': 1, 'b': 3, 'c': 2})
+
+    assert request.hottest(2) == [('b', 3), ('c', 2)]
@@ -18,7 +18,9 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
 from typing import List
+from uuid import uuid4
 
 from fastapi.testclient import TestClient
 
@@ -81,4 +83,77 @@ def test_complete_task(client: TestClient):
     assert response.status_code == 200
     assert response.json()["completed"] == True
 
-    client.delete("/tasks", params={"name": "test"})
\ No newline at end of file
+    client.delete("/tasks", params={"name": "test"})
+
+def test_create_tasks_in_batch(client: TestClient):
+    response = client.post("/tasks/batch", json=["first", "second"])
+    assert response.status_code == 201
+    assert [r["name"] for r in response.json()] == ["first", "second"]
+    assert [r["status"] for r in response.json()] == [201, 201]
+
+    response = client.get("/tasks")
+    assert [t["name"] for t in response.json()] == ["first", "second"]
+
+    client.delete("/tasks", params={"name": "first"})
+    client.delete("/tasks", params={"name": "second"})
+
+def test_complete_tasks_in_batch(client: TestClient):
+    id = client.post("/tasks", params={"name": "test"}).json()["id"]
+    missing = str(uuid4())
+
+    response = client.post("/tasks/batch/complete", json=[id, missing])
+    assert response.status_code == 200
+    assert [r["status"] for r in response.json()] == [200, 404]
+    assert response.json()[0]["task"]["completed"] == True
+
+    response = client.post("/tasks/batch/complete", json=[id])
+    assert [r["status"] for r in response.json()] == [409]
+
+    client.delete("/tasks", params={"name": "test"})
+
+def test_delete_tasks_in_batch(client: TestClient):
+    results = client.post("/tasks/batch", json=["first", "second"]).json()
+    ids = [r["id"] for r in results]
+
+    response = client.delete("/tasks/batch", json=ids + [str(uuid4())])
+    assert response.status_code == 200
+    assert [r["status"] for r in response.json()][-1] == 404
+
+    response = client.get("/tasks")
+    assert response.json() == []
+
+def test_paginate_tasks(client: TestClient):
+    names = [f"task {i}" for i in range(5)]
+    client.post("/tasks/batch", json=names)
+
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 2} if cursor is None else {"limit": 2, "cursor": cursor}
+        response = client.get("/tasks", params=params)
+        assert response.status_code == 200
+        pages.append([t["name"] for t in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert pages == [names[0:2], names[2:4], names[4:5]]
+
+    for name in names:
+        client.delete("/tasks", params={"name": name})
+
+def test_paginate_with_invalid_cursor(client: TestClient):
+    response = client.get("/tasks", params={"cursor": "not a cursor"})
+    assert response.status_code == 400
+
+def test_stream_tasks(client: TestClient):
+    client.post("/tasks/batch", json=["first", "second"])
+
+    response = client.get("/tasks", params={"stream": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.content.decode("utf-8").splitlines()]
+    assert [line["name"] for line in lines] == ["first", "second"]
+    assert lines[0]["completed"] == False
+
+    client.delete("/tasks", params={"name": "first"})
+    client.delete("/tasks", params={"name": "second"})
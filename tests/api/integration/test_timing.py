@@ -0,0 +1,100 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from api import api, slow_requests
+from api.dependencies import repository
+from api.timing import TimedAsyncRepository, current_timing, phase
+from fastapi.testclient import TestClient
+from viking.domain.task import Task
+from viking.infrastructure.csv_repository import CsvRepository
+from viking.infrastructure.metrics import registry
+
+
+def server_timing(response) -> dict:
+    metrics = {}
+    for metric in response.headers['server-timing'].split(', '):
+        name, duration = metric.split(';dur=')
+        metrics[name] = float(duration)
+    return metrics
+
+def test_server_timing_breaks_requests_into_phases(client: TestClient):
+    response = client.post('/tasks', params={'name': 'Timed'})
+    client.delete('/tasks', params={'name': 'Timed'})
+
+    metrics = server_timing(response)
+    assert list(metrics) == ['dependencies', 'endpoint', 'serialize', 'total']
+    assert sum(metrics.values()) - metrics['total'] <= metrics['total']
+
+def test_server_timing_includes_repository_calls(tmp_path):
+    timed = TimedAsyncRepository(CsvRepository(str(tmp_path / 'api.csv'), Task))
+
+    async def get_repository():
+        return timed
+
+    api.dependency_overrides[repository] = get_repository
+    try:
+        created = TestClient(api).post('/tasks', params={'name': 'Timed'})
+        completed = TestClient(api).post(f"/tasks/{created.json()['id']}/complete")
+    finally:
+        api.dependency_overrides.pop(repository)
+
+    assert 'repository' in server_timing(created)
+    assert set(server_timing(completed)) == {'dependencies', 'repository', 'endpoint', 'serialize', 'total'}
+
+def test_requests_are_counted_by_route_template(client: TestClient):
+    def count(route: str, status: str) -> float:
+        return registry.counter('hungry_task_http_requests_total', method='GET', route=route, status=status)
+    found, missing = count('/tasks/{item_id}', '200'), count('unmatched', '404')
+
+    task = client.post('/tasks', params={'name': 'Counted'}).json()
+    client.get(f"/tasks/{task['id']}")
+    client.get('/nowhere')
+    client.delete('/tasks', params={'name': 'Counted'})
+
+    assert count('/tasks/{item_id}', '200') == found + 1
+    assert count('unmatched', '404') == missing + 1
+    assert registry.histogram('hungry_task_http_phase_seconds', method='GET', route='/tasks/{item_id}', phase='serialize').count
+
+def test_metrics_route_includes_request_metrics(client: TestClient):
+    client.get('/tasks')
+
+    text = client.get('/metrics').text
+
+    assert '# TYPE hungry_task_http_request_seconds histogram' in text
+    assert 'hungry_task_http_requests_total{method="GET",route="/tasks",status="200"}' in text
+
+def test_phase_outside_a_request_is_ignored():
+    with phase('repository'):
+        pass
+
+    assert current_timing() is None
+
+def test_slow_requests_are_profiled(client: TestClient):
+    reports = []
+    report, slow_requests.report = slow_requests.report, reports.append
+    slow_requests.enable(0)
+    try:
+        client.get('/tasks')
+    finally:
+        slow_requests.disable()
+        slow_requests.report = report
+
+    assert [(r.method, r.path) for r in reports] == [('GET', '/tasks')]
+    assert reports[0].seconds > 0
@@ -0,0 +1,110 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import pytest
+from api import api
+from api.dependencies import repository
+from fastapi.testclient import TestClient
+from viking.domain.task import Task
+from viking.infrastructure.async_repository import AsyncRepository
+from viking.infrastructure.csv_repository import CsvRepository
+
+
+@pytest.fixture
+def stores(tmp_path):
+    stores = {name: CsvRepository(str(tmp_path / f'{name}.csv'), Task) for name in ('source', 'target')}
+    selected = {'name': 'source'}
+
+    async def get_repository() -> AsyncRepository:
+        return AsyncRepository(stores[selected['name']])
+
+    api.dependency_overrides[repository] = get_repository
+    yield stores, selected
+    api.dependency_overrides.pop(repository)
+
+@pytest.mark.parametrize('format_name', ['ndjson', 'csv', 'columnar'])
+def test_export_then_import(stores, format_name: str):
+    repositories, selected = stores
+    source, target = repositories['source'], repositories['target']
+    tasks = [Task(f'Task {number}') for number in range(5)]
+    tasks[2].complete()
+    source.add_many(tasks)
+    client = TestClient(api)
+
+    exported = client.get('/tasks/export', params={'format': format_name, 'chunk_size': 2})
+    selected['name'] = 'target'
+    imported = client.post('/tasks/import', params={'format': format_name}, data=exported.content)
+
+    assert exported.status_code == 200
+    assert imported.status_code == 201
+    assert imported.json() == {'imported': 5}
+    assert [(t.id, t.completed) for t in target.list()] == [(t.id, t.completed) for t in tasks]
+
+def test_export_media_type(stores):
+    response = TestClient(api).get('/tasks/export', params={'format': 'csv'})
+
+    assert response.headers['content-type'].startswith('text/csv')
+    assert response.text == 'id,name,completed\r\n'
+
+def test_import_rejects_invalid_body(stores):
+    response = TestClient(api).post('/tasks/import', data=b'{"name": ')
+
+    assert response.status_code == 400
+
+def test_unknown_format(stores):
+    assert TestClient(api).get('/tasks/export', params={'format': 'xml'}).status_code == 422
+
+def test_reimport_keeps_one_copy(stores):
+    repositories, _ = stores
+    repositories['source'].add_many([Task('Task One'), Task('Task Two')])
+    client = TestClient(api)
+
+    exported = client.get('/tasks/export').content
+    imported = client.post('/tasks/import', data=exported)
+
+    assert imported.json() == {'imported': 0}
+    assert [t.name for t in repositories['source'].list()] == ['Task One', 'Task Two']
+
+def test_import_reads_string_booleans(stores):
+    repositories, _ = stores
+    body = b'{"name": "Open", "completed": "false"}\n{"name": "Done", "completed": "true"}\n'
+
+    response = TestClient(api).post('/tasks/import', data=body)
+
+    assert response.status_code == 201
+    assert [(t.name, t.completed) for t in repositories['source'].list()] == [('Open', False), ('Done', True)]
+
+@pytest.mark.parametrize(('format_name', 'body'), [
+    ('ndjson', b'[1, 2]\n'),
+    ('ndjson', b'{"id": "not-an-id", "name": "Task"}\n'),
+    ('ndjson', b'{"id": "+fffffffffffffffffffffffffffffffffff", "name": "Task"}\n'),
+    ('columnar', b'{"columns": 5}\n'),
+    ('columnar', b'{"schema": [{"name": "id"}, {"name": "name"}]}\n{"columns": 5}\n'),
+    ('columnar', b'{"schema": [{"name": "id"}, {"name": "name"}]}\n{"columns": [["a"], []]}\n'),
+    ('columnar', b'{"schema": [{"name": 5}]}\n'),
+    ('ndjson', b'{"name": "Task", "unexpected": true}\n'),
+    ('csv', b'name,name\nTask,Task\n'),
+    ('ndjson', b'{"name": "Task", "completed": "maybe"}\n'),
+    ('columnar', b'{"schema": [{"name": "name"}, {"name": "completed"}]}\n{"columns": [["Task"], [2]]}\n'),
+])
+def test_import_rejects_malformed_shapes(stores, format_name: str, body: bytes):
+    response = TestClient(api).post('/tasks/import', params={'format': format_name}, data=body)
+
+    assert response.status_code == 400
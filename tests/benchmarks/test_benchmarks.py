@@ -0,0 +1,100 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from benchmarks import repositories, startup, web
+from benchmarks.harness import compare, load, percentile, save, summarize
+from benchmarks.runner import main
+from click.testing import CliRunner
+
+SUMMARY_KEYS = {'operations', 'ops_per_second', 'p50_us', 'p95_us', 'p99_us'}
+
+
+def test_percentile_uses_nearest_rank():
+    latencies = [float(n) for n in range(1, 101)]
+
+    assert percentile(latencies, 50) == 50
+    assert percentile(latencies, 99) == 99
+    assert percentile([1.0], 95) == 1
+
+def test_summarize():
+    summary = summarize([0.002, 0.001, 0.001, 0.004])
+
+    assert set(summary) == SUMMARY_KEYS
+    assert summary['operations'] == 4
+    assert summary['ops_per_second'] == 4 / 0.008
+    assert summary['p50_us'] == 1000
+    assert summary['p99_us'] == 4000
+
+def test_every_backend_reports_every_operation():
+    results = repositories.run(repositories.BACKENDS, [10], samples=3)
+
+    operations = ['load', 'get', 'find_by_name', 'add', 'complete', 'list', 'remove']
+    assert list(results) == [
+        f'repository/{backend}/10/{operation}'
+        for backend in repositories.BACKENDS for operation in operations
+    ]
+    assert all(set(summary) == SUMMARY_KEYS for summary in results.values())
+
+def test_startup_and_web():
+    results = {**startup.run(1), **web.run(5, 2)}
+
+    assert list(results) == ['cli/cold_start', 'api/5/list', 'api/5/get', 'api/5/create', 'api/5/complete']
+
+def test_save_and_load_round_trip(tmp_path):
+    results = {'repository/fake/10/get': summarize([0.001])}
+    save(tmp_path / 'baseline.json', results)
+
+    assert load(tmp_path / 'baseline.json') == results
+
+def test_compare_reports_drops_beyond_tolerance():
+    baseline = {'fast': {'ops_per_second': 100.0}, 'slow': {'ops_per_second': 100.0}, 'gone': {'ops_per_second': 1.0}}
+    current = {'fast': {'ops_per_second': 80.0}, 'slow': {'ops_per_second': 70.0}, 'new': {'ops_per_second': 1.0}}
+
+    regressions = compare(baseline, current, tolerance=0.25)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith('slow:')
+
+def test_runner_saves_and_compares(tmp_path):
+    options = ['--sizes', '10', '--backends', 'fake', '--samples', '3',
+               '--cli-runs', '0', '--api-requests', '0', '--baselines', str(tmp_path)]
+    runner = CliRunner()
+
+    saved = runner.invoke(main, options + ['--save', 'local'])
+    compared = runner.invoke(main, options + ['--compare', 'local', '--tolerance', '1'])
+
+    assert saved.exit_code == 0
+    assert 'repository/fake/10/get' in saved.output
+    assert set(load(tmp_path / 'local.json')) == {f'repository/fake/10/{op}' for op in
+                                                  ['load', 'get', 'find_by_name', 'add', 'complete', 'list', 'remove']}
+    assert compared.exit_code == 0
+
+def test_runner_fails_on_regression(tmp_path):
+    save(tmp_path / 'fast.json', {'repository/fake/10/get': {'ops_per_second': float('inf')}})
+
+    result = CliRunner().invoke(main, ['--sizes', '10', '--backends', 'fake', '--samples', '3', '--cli-runs', '0',
+                                       '--api-requests', '0', '--baselines', str(tmp_path), '--compare', 'fast'])
+
+    assert result.exit_code == 1
+
+def test_runner_rejects_unknown_backend():
+    result = CliRunner().invoke(main, ['--backends', 'nope'])
+
+    assert result.exit_code == 2
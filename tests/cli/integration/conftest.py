@@ -24,4 +24,6 @@ from pytest import fixture
 
 @fixture
 def runner():
-    return CliRunner()
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        yield runner
@@ -18,10 +18,12 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
 from typing import List, Tuple
 
 import pytest
 from cli import cli
+from viking.infrastructure.staging_repository import StagingRepository
 
 task_names: List[str] = ['Read a book', 'Eat Popcorn', 'Go to sleep']
 repo_names: List[str] = ['csv']
@@ -92,3 +94,136 @@ def test_complete_task(repo: str, name: str, runner):
     assert f"Task '{name}' completed" in result.output
     assert name in result.output
     runner.invoke(cli, [repo, 'remove', name])
+
+@pytest.mark.parametrize(('repo', 'name'), repo_tasks_tuples)
+def test_complete_task_updates_in_place(repo: str, name: str, runner):
+    runner.invoke(cli, [repo, 'add', name])
+    runner.invoke(cli, [repo, 'complete', name])
+
+    result = runner.invoke(cli, [repo, 'list'])
+
+    assert result.output.count(name) == 1
+    assert f'[x] - {name}' in result.output
+    runner.invoke(cli, [repo, 'remove', name])
+
+def test_configured_repository(runner, monkeypatch):
+    monkeypatch.delenv('HUNGRY_TASK_CONFIG', raising=False)
+    with open('hungry_task.ini', 'w') as f:
+        f.write('[repository:work]\nbackend = csv\nfilename = work.csv\ncached = yes\n')
+
+    runner.invoke(cli, ['work', 'add', 'Configured'])
+    result = runner.invoke(cli, ['csv', 'list'])
+
+    assert os.path.exists('work.csv')
+    assert 'Configured' not in result.output
+
+@pytest.mark.parametrize(('section', 'error'), [
+    ('backend = csv\ncached = maybe\n', "cached must be a boolean, not 'maybe'"),
+    ('backend = alchemy\nurl = nope://\n', 'Backend alchemy'),
+    ('backend = nope\n', 'RepositoryFactory: Unknown repository type: nope'),
+])
+def test_invalid_configuration(runner, monkeypatch, section: str, error: str):
+    monkeypatch.delenv('HUNGRY_TASK_CONFIG', raising=False)
+    with open('hungry_task.ini', 'w') as f:
+        f.write(f'[repository:work]\n{section}')
+
+    result = runner.invoke(cli, ['work', 'list'])
+
+    assert result.exit_code == 1
+    assert f'Error: {error}' in result.output
+
+@pytest.mark.parametrize('args', [['batch'], ['import'], ['export']])
+def test_repository_opened_once(runner, monkeypatch, args):
+    from viking.infrastructure.log_repository import LogRepository
+    opened, closed = [], []
+    init, close = LogRepository.__init__, LogRepository.close
+    monkeypatch.setattr(LogRepository, '__init__', lambda self, *a, **k: opened.append(self) or init(self, *a, **k))
+    monkeypatch.setattr(LogRepository, 'close', lambda self: closed.append(self) or close(self))
+
+    result = runner.invoke(cli, ['log', *args], input='')
+
+    assert result.exit_code == 0
+    assert len(opened) == 1
+    assert closed == opened
+
+def test_batch_runs_commands_from_stdin(runner):
+    script = 'add "Read a book"\nadd Sleep\n\n# Done for today\ncomplete Sleep\nlist\n'
+
+    result = runner.invoke(cli, ['csv', 'batch'], input=script)
+
+    assert result.exit_code == 0
+    assert "Task added 'Read a book'" in result.output
+    assert '[x] - Sleep' in result.output
+    assert runner.invoke(cli, ['csv', 'list']).output == '[ ] - Read a book\n[x] - Sleep\n'
+
+def test_batch_writes_once(runner, monkeypatch):
+    from viking.infrastructure.csv_repository import CsvRepository
+    writes = []
+    apply_changes = CsvRepository.apply_changes
+    monkeypatch.setattr(CsvRepository, 'apply_changes', lambda self, *changes: writes.append(1) or apply_changes(self, *changes))
+    with open('commands.txt', 'w') as f:
+        f.writelines(f'add Task{number}\n' for number in range(100))
+
+    result = runner.invoke(cli, ['csv', 'batch', '--file', 'commands.txt'])
+
+    assert result.exit_code == 0
+    assert writes == [1]
+    assert len(runner.invoke(cli, ['csv', 'list']).output.splitlines()) == 100
+
+def test_batch_parses_the_file_once(runner, monkeypatch):
+    import cli as package
+    staged = []
+    monkeypatch.setattr(package, 'StagingRepository', lambda stored: staged.append(stored) or StagingRepository(stored))
+    runner.invoke(cli, ['csv', 'batch'], input=''.join(f'add Task{number}\n' for number in range(50)))
+    script = ''.join(f'complete Task{number}\nget Task{number}\n' for number in range(50)) + 'remove Task0\n'
+
+    result = runner.invoke(cli, ['csv', 'batch'], input=script)
+
+    assert result.exit_code == 0
+    assert staged[-1].io.rows_scanned == 50
+    assert len(runner.invoke(cli, ['csv', 'list']).output.splitlines()) == 49
+
+@pytest.mark.parametrize(('script', 'error'), [
+    ('add First\nbogus\n', "line 2: unknown command 'bogus'"),
+    ('add First\ncomplete\n', "line 2: Missing argument 'NAME'"),
+    ('batch\n', "line 1: unknown command 'batch'"),
+])
+def test_batch_writes_nothing_on_error(runner, script: str, error: str):
+    result = runner.invoke(cli, ['csv', 'batch'], input=script)
+
+    assert result.exit_code == 2
+    assert error in result.output
+    assert runner.invoke(cli, ['csv', 'list']).output == ''
+
+@pytest.mark.parametrize('format_name', ['ndjson', 'csv', 'columnar'])
+def test_export_then_import(runner, format_name: str):
+    runner.invoke(cli, ['csv', 'batch'], input='add First\nadd Second\ncomplete Second\n')
+
+    exported = runner.invoke(cli, ['csv', 'export', '--format', format_name, '--chunk-size', '1'])
+    imported = runner.invoke(cli, ['log', 'import', '--format', format_name], input=exported.output)
+
+    assert imported.output == 'Imported 2 tasks\n'
+    assert runner.invoke(cli, ['log', 'list']).output == '[ ] - First\n[x] - Second\n'
+
+def test_reimport_keeps_one_copy(runner):
+    runner.invoke(cli, ['csv', 'add', 'First'])
+    exported = runner.invoke(cli, ['csv', 'export']).output
+
+    imported = runner.invoke(cli, ['csv', 'import'], input=exported)
+
+    assert imported.output == 'Imported 0 tasks\n'
+    assert runner.invoke(cli, ['csv', 'list']).output == '[ ] - First\n'
+
+def test_export_to_file(runner):
+    runner.invoke(cli, ['csv', 'add', 'First'])
+
+    runner.invoke(cli, ['csv', 'export', '--output', 'tasks.ndjson'])
+    result = runner.invoke(cli, ['log', 'import', '--file', 'tasks.ndjson'])
+
+    assert result.output == 'Imported 1 tasks\n'
+
+def test_import_invalid_input(runner):
+    result = runner.invoke(cli, ['log', 'import'], input='{"name": \n')
+
+    assert result.exit_code == 1
+    assert 'Invalid ndjson input' in result.output
@@ -0,0 +1,102 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+import stat
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+from cli import cli
+from cli.daemon import Daemon, forward, running, socket_path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+@pytest.fixture
+def served(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = []
+    server = Daemon(socket_path('csv'), 'csv', lambda argv: calls.append(argv) or (f'ran {argv[0]}\n', 3))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield calls
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+def wait_for(path: str, process: subprocess.Popen):
+    deadline = time.monotonic() + 10
+    # The socket file exists from bind, a moment before the daemon listens.
+    while not running(path):
+        assert process.poll() is None and time.monotonic() < deadline
+        time.sleep(0.01)
+
+def test_forward_without_daemon(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert forward('csv', ['list']) is None
+
+def test_forward_to_daemon(served):
+    assert forward('csv', ['add', 'Task One']) == ('ran add\n', 3)
+    assert served == [['add', 'Task One']]
+
+def test_daemon_only_serves_its_repository_and_commands(served):
+    assert forward('log', ['list']) is None
+    assert forward('csv', ['batch']) is None
+    assert served == []
+
+def test_socket_is_private(served):
+    assert stat.S_IMODE(os.stat(socket_path('csv')).st_mode) == 0o600
+
+def test_second_daemon_refused(served):
+    with pytest.raises(RuntimeError):
+        Daemon(socket_path('csv'), 'csv', None)
+
+def test_stale_socket_replaced(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    open(socket_path('csv'), 'w').close()
+
+    server = Daemon(socket_path('csv'), 'csv', None)
+    server.server_close()
+
+    assert not os.path.exists(socket_path('csv'))
+
+def test_cli_uses_running_daemon(monkeypatch, runner):
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'cli.py'), 'csv', 'daemon'],
+        env={**os.environ, 'PYTHONPATH': ROOT}, stdout=subprocess.DEVNULL,
+    )
+    try:
+        wait_for(socket_path('csv'), process)
+        monkeypatch.setattr('cli.RepositoryFactory.create', None)
+
+        assert runner.invoke(cli, ['csv', 'add', 'Task One']).output == "Task added 'Task One'\n"
+        assert runner.invoke(cli, ['csv', 'complete', 'Task One']).output == "Task 'Task One' completed\n"
+        assert runner.invoke(cli, ['csv', 'list']).output == '[x] - Task One\n'
+        assert runner.invoke(cli, ['csv', 'add']).exit_code == 2
+    finally:
+        process.terminate()
+        process.wait(10)
+
+    assert not os.path.exists(socket_path('csv'))
+    with open('storage.csv') as f:
+        assert 'Task One' in f.read()
@@ -0,0 +1,79 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Generous enough for a slow machine, far below the cost of importing SQLAlchemy.
+CLI_IMPORT_BUDGET_MS = 80
+
+WEB_STACK = ('fastapi', 'starlette', 'pydantic', 'api')
+BACKENDS = {
+    'alchemy': ('sqlalchemy', 'viking.infrastructure.alchemy_repository'),
+    'binary': ('mmap', 'viking.infrastructure.binary_repository'),
+    'csv': ('viking.infrastructure.csv_repository',),
+    'log': ('viking.infrastructure.log_repository',),
+}
+
+SCRIPT = '''
+import json, sys
+sys.argv = ['cli.py'] + sys.argv[1:]
+from cli import cli
+try:
+    cli()
+except SystemExit:
+    pass
+print(json.dumps(sorted(sys.modules)))
+'''
+
+
+def run_cli(tmp_path, *args: str):
+    env = {**os.environ, 'PYTHONPATH': ROOT}
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', SCRIPT, *args],
+        cwd=tmp_path, env=env, capture_output=True, text=True, check=True,
+    )
+    modules = json.loads(result.stdout.splitlines()[-1])
+    cumulative = next(
+        int(line.split('|')[1]) for line in result.stderr.splitlines() if line.split('|')[-1].strip() == 'cli'
+    )
+    return modules, cumulative / 1000
+
+def loaded(modules, names) -> list:
+    return [m for m in modules if any(m == name or m.startswith(f'{name}.') for name in names)]
+
+@pytest.mark.parametrize('backend', ['csv', 'log', 'binary', 'fake'])
+def test_command_only_loads_its_backend(tmp_path, backend: str):
+    modules, _ = run_cli(tmp_path, backend, 'list')
+
+    others = [name for other, names in BACKENDS.items() if other != backend for name in names]
+    assert loaded(modules, others) == []
+    assert loaded(modules, WEB_STACK) == []
+
+def test_cli_import_budget(tmp_path):
+    _, milliseconds = run_cli(tmp_path, 'csv', 'add', 'Budgeted')
+
+    assert milliseconds < CLI_IMPORT_BUDGET_MS
@@ -19,10 +19,10 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 from pytest import fixture
-from sqlalchemy import create_engine
 from sqlalchemy.orm import scoped_session, sessionmaker
 from viking.domain.task import Task
 from viking.infrastructure import AlchemyRepository
+from viking.infrastructure.alchemy_repository import engine_from_url
 
 
 @fixture
@@ -31,12 +31,12 @@ def task():
 
 @fixture
 def repo(db_session):
-    return AlchemyRepository(db_session)
+    return AlchemyRepository(db_session, Task)
 
 
 @fixture(scope='session')
 def db_engine():
-    engine_ = create_engine("sqlite:///integration.db", echo=True)
+    engine_ = engine_from_url("sqlite://")
 
     yield engine_
 
@@ -0,0 +1,167 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from uuid import uuid4
+
+from viking.domain.task import Task
+from viking.infrastructure import AlchemyRepository
+from viking.infrastructure.alchemy_repository import (MAX_PARAMETERS,
+                                                     engine_from_url,
+                                                     session_factory)
+
+
+def make_tasks(count: int) -> list:
+    tasks = [Task(f'Task {i}') for i in range(count)]
+    for task in tasks:
+        task.id = uuid4()
+    return tasks
+
+def test_alchemy_repository_save(task: Task, repo: AlchemyRepository):
+    repo.add(task)
+    assert repo.get(task.id).name == task.name
+
+def test_alchemy_repository_save_multiple(task: Task, repo: AlchemyRepository):
+    repo.add(task)
+    task.name = 'Renamed'
+    repo.add(task)
+
+    assert len(repo.list()) == 1
+    assert repo.get(task.id).name == 'Renamed'
+
+def test_get_restores_types(task: Task, repo: AlchemyRepository):
+    repo.add(task.complete())
+    stored = repo.get(str(task.id))
+
+    assert stored.id == task.id
+    assert stored.completed is True
+
+def test_get_missing(repo: AlchemyRepository):
+    assert repo.get(uuid4()) is None
+    assert repo.get('not-an-id') is None
+
+def test_remove(task: Task, repo: AlchemyRepository):
+    repo.add(task)
+    assert repo.remove(task) is task
+    assert repo.get(task.id) is None
+
+def test_remove_nonexistent(task: Task, repo: AlchemyRepository):
+    assert repo.remove(task) is None
+
+def test_add_many(repo: AlchemyRepository):
+    tasks = make_tasks(MAX_PARAMETERS)
+    repo.add_many(tasks)
+
+    assert {t.id for t in repo.list()} == {t.id for t in tasks}
+
+def test_add_many_replaces_existing(repo: AlchemyRepository):
+    tasks = make_tasks(3)
+    repo.add_many(tasks)
+    tasks[0].complete()
+    repo.add_many(tasks[:1])
+
+    assert len(repo.list()) == 3
+    assert repo.get(tasks[0].id).completed
+
+def test_remove_many(repo: AlchemyRepository):
+    tasks = make_tasks(MAX_PARAMETERS + 1)
+    repo.add_many(tasks)
+
+    repo.remove_many(tasks[1:])
+
+    assert [t.id for t in repo.list()] == [tasks[0].id]
+
+def test_autocommit_persists_across_sessions(tmp_path):
+    factory = session_factory(f'sqlite:///{tmp_path / "tasks.db"}')
+    task = make_tasks(1)[0]
+
+    writer = AlchemyRepository(factory(), Task, autocommit=True)
+    writer.add(task)
+    writer.close()
+
+    reader = AlchemyRepository(factory(), Task)
+    assert reader.get(task.id).name == task.name
+    reader.close()
+
+def test_engines_are_shared_per_url_and_options(tmp_path):
+    url = f'sqlite:///{tmp_path / "tasks.db"}'
+
+    assert engine_from_url(url) is engine_from_url(url)
+    assert engine_from_url(url, pool_recycle=60) is not engine_from_url(url)
+    assert engine_from_url(url, pool_recycle=60).pool._recycle == 60
+
+def test_get_many(repo: AlchemyRepository):
+    tasks = make_tasks(MAX_PARAMETERS + 1)
+    repo.add_many(tasks)
+
+    found = repo.get_many([tasks[-1].id, uuid4(), 'not-an-id', tasks[0].id])
+
+    assert [t and t.id for t in found] == [tasks[-1].id, None, None, tasks[0].id]
+
+def test_iter_and_slice_share_order(repo: AlchemyRepository):
+    repo.add_many(make_tasks(5))
+    ordered = [t.id for t in repo.iter()]
+
+    assert ordered == sorted(ordered)
+    assert [t.id for t in repo.slice(1, 2)] == ordered[1:3]
+
+def test_find_by_name(repo: AlchemyRepository):
+    tasks = make_tasks(3)
+    tasks[2].complete()
+    repo.add_many(tasks)
+
+    assert repo.find_by_name('Task 1').id == tasks[1].id
+    assert repo.find_by_name('Task 9') is None
+    assert [t.id for t in repo.find_by(completed=True)] == [tasks[2].id]
+
+def test_name_is_indexed(repo: AlchemyRepository):
+    assert any(index.columns.keys() == ['name'] for index in repo.table.indexes)
+
+def test_apply_changes_commits_once(tmp_path):
+    factory = session_factory(f'sqlite:///{tmp_path / "tasks.db"}')
+    kept, changed, dropped, added = make_tasks(4)
+    writer = AlchemyRepository(factory(), Task, autocommit=True)
+    writer.add_many([kept, changed, dropped])
+    commits = []
+    commit = writer.session.commit
+    writer.session.commit = lambda: commits.append(True) or commit()
+
+    changed.complete()
+    writer.apply_changes([added], [changed], [dropped])
+    writer.close()
+
+    assert len(commits) == 1
+    reader = AlchemyRepository(factory(), Task)
+    assert sorted(t.name for t in reader.list()) == ['Task 0', 'Task 1', 'Task 3']
+    assert reader.get(changed.id).completed
+    reader.close()
+
+def test_update_fields_issues_one_update(repo: AlchemyRepository):
+    tasks = make_tasks(2)
+    repo.add_many(tasks)
+    statements = []
+    execute = repo._execute
+    repo._execute = lambda statement, parameters=None: statements.append(statement) or execute(statement, parameters)
+
+    updated = repo.update_fields(tasks[0].id, name='Renamed', completed=True)
+
+    assert [s.__visit_name__ for s in statements] == ['update', 'select']
+    assert updated.name == 'Renamed' and updated.completed
+    assert repo.get(tasks[1].id).name == 'Task 1'
+    assert repo.update_fields(uuid4(), name='Missing') is None
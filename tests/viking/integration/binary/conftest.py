@@ -0,0 +1,48 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from os import remove
+from random import randint
+
+from pytest import fixture
+from viking.domain.task import Task
+from viking.infrastructure import BinaryRepository
+
+
+@fixture
+def task():
+    return Task(name="Task Name")
+
+@fixture
+def filename():
+    file = f'test-{randint(1337, 7331)}.bin'
+    yield file
+
+    for leftover in (file, f'{file}.lock'):
+        try:
+            remove(leftover)
+        except FileNotFoundError:
+            pass
+
+@fixture
+def repo(filename: str):
+    repo = BinaryRepository(filename, Task)
+    yield repo
+    repo.close()
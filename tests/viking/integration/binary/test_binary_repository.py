@@ -0,0 +1,263 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+import threading
+from uuid import uuid4
+
+import pytest
+from viking.domain.task import Task
+from viking.infrastructure.binary_repository import BinaryRepository
+
+
+def make_tasks(count: int) -> list:
+    tasks = [Task(f'Task {i}') for i in range(count)]
+    for task in tasks:
+        task.id = uuid4()
+    return tasks
+
+def test_binary_repository_save(task: Task, repo: BinaryRepository):
+    repo.add(task)
+    assert repo.get(task.id).name == task.name
+
+def test_binary_repository_save_multiple(task: Task, repo: BinaryRepository):
+    repo.add(task)
+    repo.add(task)
+    assert repo.count == 1
+
+def test_get_restores_types(task: Task, repo: BinaryRepository):
+    repo.add(task.complete())
+    stored = repo.get(str(task.id))
+
+    assert stored.id == task.id
+    assert stored.completed is True
+
+def test_get_missing(repo: BinaryRepository):
+    repo.add(make_tasks(1)[0])
+    assert repo.get(uuid4()) is None
+
+def test_list_keeps_order(repo: BinaryRepository):
+    tasks = make_tasks(10)
+    for task in tasks:
+        repo.add(task)
+
+    assert [(t.id, t.name) for t in repo.list()] == [(t.id, t.name) for t in tasks]
+
+def test_unicode_names(repo: BinaryRepository):
+    task = make_tasks(1)[0]
+    task.name = 'Café ☕'
+    repo.add(task)
+
+    assert repo.get(task.id).name == 'Café ☕'
+
+def test_remove(repo: BinaryRepository):
+    tasks = make_tasks(3)
+    for task in tasks:
+        repo.add(task)
+
+    repo.remove(tasks[1])
+
+    assert [t.id for t in repo.list()] == [tasks[0].id, tasks[2].id]
+    assert repo.get(tasks[1].id) is None
+
+def test_remove_nonexistent(task: Task, repo: BinaryRepository):
+    assert repo.remove(task) is None
+    assert repo.count == 0
+
+def test_counts_without_materializing(repo: BinaryRepository):
+    tasks = make_tasks(20)
+    for task in tasks[:7]:
+        task.complete()
+    for task in tasks:
+        repo.add(task)
+    repo._materialize = None
+
+    assert repo.count == 20
+    assert repo.completed_count == 7
+    assert list(repo.ids()) == [t.id for t in tasks]
+
+def test_sees_other_writers(filename: str, repo: BinaryRepository):
+    task = make_tasks(1)[0]
+    repo.count
+    BinaryRepository(filename, Task).add(task)
+
+    assert repo.get(task.id).name == task.name
+
+def test_rejects_foreign_files(filename: str, repo: BinaryRepository):
+    with open(filename, 'wb') as f:
+        f.write(bytes(64))
+
+    with pytest.raises(ValueError):
+        repo.list()
+
+def test_add_many(repo: BinaryRepository):
+    tasks = make_tasks(5)
+    repo.add_many(tasks + tasks[:1])
+
+    assert [t.id for t in repo.list()] == [t.id for t in tasks]
+
+def test_get_many(repo: BinaryRepository):
+    tasks = make_tasks(3)
+    repo.add_many(tasks)
+
+    found = repo.get_many([tasks[2].id, uuid4(), tasks[0].id])
+
+    assert [t and t.id for t in found] == [tasks[2].id, None, tasks[0].id]
+
+def test_get_many_empty_store(repo: BinaryRepository):
+    assert repo.get_many([uuid4()]) == [None]
+
+def test_remove_many(repo: BinaryRepository):
+    tasks = make_tasks(4)
+    repo.add_many(tasks)
+
+    repo.remove_many([tasks[0], tasks[3]])
+
+    assert [t.id for t in repo.list()] == [tasks[1].id, tasks[2].id]
+
+def test_iter_and_slice(repo: BinaryRepository):
+    tasks = make_tasks(5)
+    repo.add_many(tasks)
+
+    assert [t.id for t in repo.iter()] == [t.id for t in tasks]
+    assert [t.id for t in repo.slice(3, 10)] == [t.id for t in tasks[3:]]
+
+def test_find_by_name_searches_heap(repo: BinaryRepository):
+    tasks = make_tasks(3)
+    tasks[0].name, tasks[1].name, tasks[2].name = 'Read', 'Read a book', 'a book'
+    tasks[2].complete()
+    repo.add_many(tasks)
+
+    assert repo.find_by_name('Read').id == tasks[0].id
+    assert repo.find_by_name('a book').id == tasks[2].id
+    assert repo.find_by_name('book') is None
+    assert repo.find_by(name='a book', completed=False) == []
+
+def test_find_by_empty_name(repo: BinaryRepository):
+    tasks = make_tasks(2)
+    tasks[1].name = ''
+    repo.add_many(tasks)
+
+    assert [t.id for t in repo.find_by(name='')] == [tasks[1].id]
+
+def test_apply_changes_rewrites_once(repo: BinaryRepository):
+    kept, changed, dropped, added = make_tasks(4)
+    repo.add_many([kept, changed, dropped])
+    writes = []
+    write = repo._write
+    repo._write = lambda columns: writes.append(columns) or write(columns)
+
+    changed.complete()
+    repo.apply_changes([added], [changed], [dropped])
+
+    assert len(writes) == 1
+    assert [t.name for t in repo.list()] == ['Task 0', 'Task 1', 'Task 3']
+    assert repo.get(changed.id).completed
+
+def test_update_flips_completed_bit_in_place(filename: str, repo: BinaryRepository):
+    tasks = make_tasks(10)
+    repo.add_many(tasks)
+    inode = os.stat(filename).st_ino
+
+    tasks[9].complete()
+    repo.update(tasks[9])
+    updated = repo.update_fields(tasks[3].id, completed=True)
+
+    assert os.stat(filename).st_ino == inode
+    assert updated.completed and updated.name == 'Task 3'
+    assert [t.completed for t in repo.list()] == [i in (3, 9) for i in range(10)]
+
+def test_update_rewrites_changed_names(repo: BinaryRepository):
+    tasks = make_tasks(2)
+    repo.add_many(tasks)
+
+    tasks[0].name = 'Renamed'
+    repo.update(tasks[0])
+
+    assert [t.name for t in repo.list()] == ['Renamed', 'Task 1']
+    assert repo.update_fields(uuid4(), completed=True) is None
+
+def test_update_many_indexes_ids_once(repo: BinaryRepository):
+    tasks = make_tasks(50)
+    repo.add_many(tasks)
+    scans = []
+    index_of = repo._index_of
+    repo._index_of = lambda reference: scans.append(reference) or index_of(reference)
+
+    for task in tasks[::2]:
+        task.complete()
+    repo.update_many(tasks)
+
+    assert scans == []
+    assert [t.completed for t in repo.list()] == [i % 2 == 0 for i in range(50)]
+
+@pytest.mark.parametrize('reference', ['not-an-id', 5, None])
+def test_invalid_references_are_not_found(task: Task, repo: BinaryRepository, reference):
+    repo.add(task)
+
+    assert repo.get(reference) is None
+    assert repo.get_many([reference, task.id])[1].id == task.id
+    assert repo.update_fields(reference, completed=True) is None
+
+def test_io_stats_count_rows_read(repo: BinaryRepository):
+    tasks = [Task('One'), Task('Two')]
+    repo.add_many(tasks)
+    written = repo.io.bytes_written
+
+    repo.get(tasks[1].id)
+    repo.list()
+
+    assert written == os.stat(repo.filename).st_size
+    assert repo.io.bytes_read == written
+    assert repo.io.rows_scanned == 3
+
+def test_threads_read_while_another_rewrites(repo: BinaryRepository):
+    repo.add_many(make_tasks(200))
+    errors, done = [], threading.Event()
+
+    def read():
+        while not done.is_set():
+            try:
+                list(repo.iter())
+                repo.find_by_name('Task 5')
+                repo.get_many(list(repo.ids())[:5])
+            except Exception as error:
+                errors.append(error)
+                done.set()
+
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    for task in make_tasks(100):
+        repo.add(task)
+    done.set()
+    for reader in readers:
+        reader.join()
+
+    assert errors == []
+    assert repo.count == 300
+
+def test_iter_streams_across_chunks(repo: BinaryRepository, monkeypatch):
+    monkeypatch.setattr(BinaryRepository, 'ITER_CHUNK_SIZE', 2)
+    tasks = make_tasks(5)
+    repo.add_many(tasks)
+
+    assert [t.id for t in repo.iter()] == [t.id for t in tasks]
+    assert list(repo.ids()) == [t.id for t in tasks]
@@ -35,7 +35,19 @@ def repo():
     file = f'test-{randint(1337, 7331)}.csv'
     yield CsvRepository(file, Task)
 
-    try:
-        remove(file)
-    except FileNotFoundError:
-        pass
+    for leftover in (file, f'{file}.lock'):
+        try:
+            remove(leftover)
+        except FileNotFoundError:
+            pass
+
+@fixture
+def cached_repo():
+    file = f'test-{randint(1337, 7331)}.csv'
+    yield CsvRepository(file, Task, cached=True)
+
+    for leftover in (file, f'{file}.lock'):
+        try:
+            remove(leftover)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,100 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from uuid import uuid4
+
+from viking.domain.task import Task
+from viking.infrastructure.csv_repository import CsvRepository
+
+
+def count_reads(repo: CsvRepository) -> list:
+    reads = []
+    read = repo._read
+    repo._read = lambda: reads.append(1) or read()
+    return reads
+
+def test_cached_get(task: Task, cached_repo: CsvRepository):
+    cached_repo.add(task)
+    assert cached_repo.get(task.id).name == task.name
+
+def test_cached_get_missing(cached_repo: CsvRepository):
+    assert cached_repo.get(uuid4()) is None
+
+def test_cached_list_does_not_reread(cached_repo: CsvRepository):
+    cached_repo.add(Task('Task One'))
+    reads = count_reads(cached_repo)
+
+    cached_repo.list()
+    cached_repo.list()
+    cached_repo.get(uuid4())
+
+    assert len(reads) == 0
+
+def test_cached_remove_does_not_reread(task: Task, cached_repo: CsvRepository):
+    cached_repo.add(task)
+    reads = count_reads(cached_repo)
+
+    cached_repo.remove(task)
+
+    assert cached_repo.list() == []
+    assert len(reads) == 0
+
+def test_cached_sees_external_writes(task: Task, cached_repo: CsvRepository):
+    cached_repo.list()
+    CsvRepository(cached_repo.filename, Task).add(task)
+
+    assert cached_repo.get(task.id).name == task.name
+
+def test_cached_sees_external_removes(task: Task, cached_repo: CsvRepository):
+    cached_repo.add(task)
+    CsvRepository(cached_repo.filename, Task).remove(task)
+
+    assert cached_repo.get(task.id) is None
+
+def test_cached_matches_uncached(cached_repo: CsvRepository):
+    tasks = [Task('Task One'), Task('Task Two')]
+    for task in tasks:
+        cached_repo.add(task)
+
+    uncached = CsvRepository(cached_repo.filename, Task)
+    assert [str(t.id) for t in cached_repo.list()] == [str(t.id) for t in uncached.list()]
+
+def test_cached_reads_are_copies(task: Task, cached_repo: CsvRepository):
+    cached_repo.add(task)
+    read = [
+        cached_repo.get(task.id), cached_repo.list()[0], next(cached_repo.iter()),
+        cached_repo.slice(0, 1)[0], cached_repo.find_by_name(task.name),
+    ]
+
+    for entity in read:
+        entity.name = 'Changed'
+        entity.completed = True
+
+    stored = cached_repo.get(task.id)
+    assert (stored.name, stored.completed) == (task.name, False)
+
+def test_cached_writes_are_copied(cached_repo: CsvRepository):
+    added, changed = Task('Task One'), Task('Task Two')
+    cached_repo.add(added)
+    cached_repo.apply_changes([changed], [added], [])
+
+    added.name = changed.name = 'Changed'
+
+    assert [t.name for t in cached_repo.list()] == ['Task One', 'Task Two']
@@ -18,6 +18,9 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+from uuid import UUID, uuid4
+
 from viking.domain.task import Task
 from viking.infrastructure.csv_repository import CsvRepository
 
@@ -84,3 +87,140 @@ def test_list_all(repo: CsvRepository):
 
 def test_list_all_nonexistent(repo: CsvRepository):
     assert repo.list() == []
+
+def test_add_many(repo: CsvRepository):
+    tasks = [Task('Task One'), Task('Task Two')]
+    repo.add_many(tasks)
+    assert [t.name for t in repo.list()] == ['Task One', 'Task Two']
+
+def test_add_many_nothing(repo: CsvRepository):
+    repo.add_many([])
+    assert repo.list() == []
+
+def test_get_many(repo: CsvRepository):
+    tasks = [Task('Task One'), Task('Task Two')]
+    tasks[1].id = uuid4()
+    repo.add_many(tasks)
+
+    found = repo.get_many([tasks[1].id, uuid4()])
+
+    assert found[0].name == 'Task Two'
+    assert found[1] is None
+
+def test_remove_many(repo: CsvRepository):
+    tasks = [Task('Task One'), Task('Task Two'), Task('Task Three')]
+    for task in tasks:
+        task.id = uuid4()
+    repo.add_many(tasks)
+
+    repo.remove_many(tasks[:2])
+
+    assert [t.name for t in repo.list()] == ['Task Three']
+
+def test_cached_batch_methods(cached_repo: CsvRepository):
+    tasks = [Task('Task One'), Task('Task Two')]
+    for task in tasks:
+        task.id = uuid4()
+
+    cached_repo.add_many(tasks)
+    assert [t.name for t in cached_repo.get_many([t.id for t in tasks])] == ['Task One', 'Task Two']
+
+    cached_repo.remove_many(tasks[:1])
+    assert [t.name for t in CsvRepository(cached_repo.filename, Task).list()] == ['Task Two']
+
+def test_iter_streams_rows(repo: CsvRepository):
+    repo.add_many([Task('Task One'), Task('Task Two')])
+    rows = repo.iter()
+
+    assert next(rows).name == 'Task One'
+    assert [t.name for t in rows] == ['Task Two']
+
+def test_slice(repo: CsvRepository):
+    repo.add_many([Task('Task One'), Task('Task Two'), Task('Task Three')])
+    assert [t.name for t in repo.slice(1, 1)] == ['Task Two']
+
+def test_cached_slice(cached_repo: CsvRepository):
+    cached_repo.add_many([Task('Task One'), Task('Task Two'), Task('Task Three')])
+    assert [t.name for t in cached_repo.slice(1, 5)] == ['Task Two', 'Task Three']
+
+def test_find_by_name(repo: CsvRepository):
+    repo.add_many([Task('Task One'), Task('Task Two')])
+
+    assert repo.find_by_name('Task Two').name == 'Task Two'
+    assert repo.find_by_name('Task Three') is None
+
+def test_cached_find_by_name_uses_index(cached_repo: CsvRepository):
+    cached_repo.add_many([Task('Task One'), Task('Task Two')])
+    cached_repo.iter = None
+
+    assert cached_repo.find_by_name('Task Two').name == 'Task Two'
+    assert cached_repo.find_by(name='Task One', completed=True) == []
+
+def test_cached_find_by_name_sees_external_writes(cached_repo: CsvRepository):
+    cached_repo.list()
+    CsvRepository(cached_repo.filename, Task).add(Task('Task One'))
+
+    assert cached_repo.find_by_name('Task One').name == 'Task One'
+
+def test_apply_changes_rewrites_once(repo: CsvRepository):
+    kept, changed, dropped, added = [Task(f'Task {i}') for i in range(4)]
+    for task in (kept, changed, dropped, added):
+        task.id = uuid4()
+    repo.add_many([kept, changed, changed, dropped])
+    rewrites = []
+    rewrite = repo._rewrite
+    repo._rewrite = lambda entities: rewrites.append(entities) or rewrite(entities)
+    repo._append = None
+
+    changed.name = 'Changed'
+    repo.apply_changes([added], [changed], [dropped])
+
+    assert len(rewrites) == 1
+    assert [t.name for t in repo.list()] == ['Task 0', 'Changed', 'Task 3']
+
+def test_apply_changes_only_appends_new_entities(cached_repo: CsvRepository):
+    cached_repo.add(Task('Task One'))
+    cached_repo._rewrite = None
+
+    cached_repo.apply_changes([Task('Task Two')], [], [])
+
+    assert [t.name for t in cached_repo.list()] == ['Task One', 'Task Two']
+
+def test_update_keeps_row_order(repo: CsvRepository):
+    tasks = [Task(f'Task {i}') for i in range(3)]
+    for task in tasks:
+        task.id = uuid4()
+    repo.add_many(tasks)
+
+    tasks[0].complete()
+    repo.update(tasks[0])
+
+    assert [(t.name, t.completed) for t in repo.list()] == [('Task 0', True), ('Task 1', False), ('Task 2', False)]
+
+def test_update_fields(cached_repo: CsvRepository, task: Task):
+    cached_repo.add(task)
+
+    cached_repo.update_fields(task.id, name='Renamed')
+
+    assert [t.name for t in CsvRepository(cached_repo.filename, Task).list()] == ['Renamed']
+    assert cached_repo.find_by_name('Renamed').id == task.id
+
+def test_rows_decode_to_typed_fields(repo: CsvRepository, task: Task):
+    task.complete()
+    repo.add(task)
+
+    stored = repo.get(task.id)
+
+    assert isinstance(stored.id, UUID) and stored.id == task.id
+    assert stored.completed is True
+
+def test_io_stats_count_scans(repo: CsvRepository):
+    repo.add_many([Task('One'), Task('Two')])
+    size = os.stat(repo.filename).st_size
+    written = repo.io.snapshot()
+
+    repo.list()
+    list(repo.iter())
+
+    assert written == {'opens': 1, 'bytes_read': 0, 'bytes_written': size, 'rows_scanned': 0}
+    assert repo.io.snapshot() == {'opens': 3, 'bytes_read': 2 * size, 'bytes_written': size, 'rows_scanned': 4}
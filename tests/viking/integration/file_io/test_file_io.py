@@ -0,0 +1,125 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from os import chmod, listdir, stat
+from time import sleep
+from uuid import uuid4
+
+import pytest
+from viking.domain.task import Task
+from viking.infrastructure import CsvRepository, file_io
+from viking.infrastructure.file_io import FsyncBatcher, atomic_write
+
+
+@pytest.fixture
+def syncs(monkeypatch) -> list:
+    calls = []
+    fsync = file_io.fsync
+    monkeypatch.setattr(file_io, 'fsync', lambda fd: calls.append(fd) or fsync(fd))
+    return calls
+
+def test_atomic_write_replaces_file(tmp_path):
+    target = tmp_path / 'store.txt'
+    target.write_text('old')
+
+    with atomic_write(str(target)) as f:
+        f.write('new')
+
+    assert target.read_text() == 'new'
+    assert listdir(tmp_path) == ['store.txt']
+
+def test_atomic_write_keeps_file_on_error(tmp_path):
+    target = tmp_path / 'store.txt'
+    target.write_text('old')
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(target)) as f:
+            f.write('partial')
+            raise RuntimeError('crash')
+
+    assert target.read_text() == 'old'
+    assert listdir(tmp_path) == ['store.txt']
+
+def test_atomic_write_keeps_permissions(tmp_path):
+    target = tmp_path / 'store.txt'
+    target.write_text('old')
+    chmod(target, 0o640)
+
+    with atomic_write(str(target)) as f:
+        f.write('new')
+
+    assert stat(target).st_mode & 0o777 == 0o640
+
+def test_batcher_disabled_never_syncs(tmp_path, syncs: list):
+    batcher = FsyncBatcher(str(tmp_path / 'log'))
+    with open(tmp_path / 'log', 'a') as f:
+        for _ in range(5):
+            batcher.written(f)
+    batcher.close()
+
+    assert syncs == []
+
+def test_batcher_syncs_every_n_writes(tmp_path, syncs: list):
+    batcher = FsyncBatcher(str(tmp_path / 'log'), every=3)
+    with open(tmp_path / 'log', 'a') as f:
+        for _ in range(7):
+            batcher.written(f)
+
+    assert len(syncs) == 2
+    assert batcher.pending == 1
+
+    batcher.close()
+    assert len(syncs) == 3
+    assert batcher.pending == 0
+
+def test_batcher_syncs_after_interval(tmp_path, syncs: list):
+    batcher = FsyncBatcher(str(tmp_path / 'log'), interval=10)
+    with open(tmp_path / 'log', 'a') as f:
+        batcher.written(f)
+    sleep(0.2)
+
+    assert len(syncs) == 1
+    assert batcher.pending == 0
+
+def test_csv_remove_is_atomic(tmp_path, monkeypatch):
+    repo = CsvRepository(str(tmp_path / 'tasks.csv'), Task)
+    first, second = Task('First'), Task('Second')
+    second.id = uuid4()
+    repo.add(first)
+    before = (tmp_path / 'tasks.csv').read_text()
+
+    def crash(*args, **kwargs):
+        raise RuntimeError('crash')
+    monkeypatch.setattr(file_io, 'replace_durably', crash)
+
+    with pytest.raises(RuntimeError):
+        repo.remove(second)
+
+    assert (tmp_path / 'tasks.csv').read_text() == before
+    assert sorted(listdir(tmp_path)) == ['tasks.csv', 'tasks.csv.lock']
+
+def test_csv_appends_are_batched(tmp_path, syncs: list):
+    repo = CsvRepository(str(tmp_path / 'tasks.csv'), Task, fsync_every=2)
+    for name in ['One', 'Two', 'Three']:
+        repo.add(Task(name))
+
+    assert len(syncs) == 1
+    repo.close()
+    assert len(syncs) == 2
@@ -0,0 +1,173 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from multiprocessing import Process
+from threading import Barrier, Event, Thread
+from time import sleep
+from uuid import uuid4
+
+import pytest
+from viking.domain.task import Task
+from viking.infrastructure import (BinaryRepository, CsvRepository,
+                                   LogRepository)
+from viking.infrastructure.file_lock import EXCLUSIVE, SHARED, FileLock
+
+WRITERS = 4
+TASKS_PER_WRITER = 25
+
+
+def make_task(name: str) -> Task:
+    task = Task(name)
+    task.id = uuid4()
+    return task
+
+def add_tasks(repository_type: type, filename: str, writer: int) -> None:
+    repository = repository_type(filename, Task)
+    for number in range(TASKS_PER_WRITER):
+        repository.add(make_task(f'Writer {writer} Task {number}'))
+    repository.close()
+
+def run_writers(repository_type: type, filename: str) -> None:
+    writers = [
+        Process(target=add_tasks, args=(repository_type, filename, writer))
+        for writer in range(WRITERS)
+    ]
+    for process in writers:
+        process.start()
+    for process in writers:
+        process.join()
+        assert process.exitcode == 0
+
+def test_lock_file_is_a_sidecar(tmp_path):
+    lock = FileLock(str(tmp_path / 'tasks.csv'))
+
+    with lock.exclusive():
+        pass
+
+    assert lock.filename == str(tmp_path / 'tasks.csv.lock')
+
+def test_readers_share_the_lock(tmp_path):
+    lock = FileLock(str(tmp_path / 'tasks.csv'))
+    together = Barrier(2, timeout=5)
+
+    def read():
+        with lock.shared():
+            together.wait()
+
+    readers = [Thread(target=read) for _ in range(2)]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+
+    assert lock.stats.snapshot()[SHARED]['acquired'] == 2
+    assert lock.stats.snapshot()[SHARED]['contended'] == 0
+
+def test_writer_waits_for_readers(tmp_path):
+    lock = FileLock(str(tmp_path / 'tasks.csv'))
+    reading = Event()
+
+    def read():
+        with lock.shared():
+            reading.set()
+            sleep(0.05)
+
+    reader = Thread(target=read)
+    reader.start()
+    reading.wait()
+    with lock.exclusive():
+        stats = lock.stats.snapshot()[EXCLUSIVE]
+    reader.join()
+
+    assert stats['contended'] == 1
+    assert stats['max_wait'] > 0.0
+    assert stats['total_wait'] == stats['max_wait']
+
+def test_nested_acquisitions_are_free(tmp_path):
+    lock = FileLock(str(tmp_path / 'tasks.csv'))
+
+    with lock.exclusive():
+        with lock.shared():
+            with lock.exclusive():
+                pass
+
+    assert lock.stats.snapshot()[EXCLUSIVE]['acquired'] == 1
+    assert lock.stats.snapshot()[SHARED]['acquired'] == 0
+
+def test_shared_lock_cannot_be_upgraded(tmp_path):
+    lock = FileLock(str(tmp_path / 'tasks.csv'))
+
+    with lock.shared():
+        with pytest.raises(RuntimeError):
+            with lock.exclusive():
+                pass
+
+@pytest.mark.parametrize('repository_type', [CsvRepository, LogRepository, BinaryRepository])
+def test_concurrent_processes_do_not_lose_writes(tmp_path, repository_type: type):
+    filename = str(tmp_path / 'tasks')
+
+    run_writers(repository_type, filename)
+
+    names = [task.name for task in repository_type(filename, Task).list()]
+    assert len(names) == WRITERS * TASKS_PER_WRITER
+    assert len(set(names)) == len(names)
+
+def test_log_sees_appends_from_other_processes(tmp_path):
+    filename = str(tmp_path / 'tasks.log')
+    repository = LogRepository(filename, Task)
+    task = make_task('Mine')
+    repository.add(task)
+
+    run_writers(LogRepository, filename)
+
+    assert repository.get(task.id).name == 'Mine'
+    assert len(repository.list()) == WRITERS * TASKS_PER_WRITER + 1
+    repository.close()
+
+def test_log_follows_compaction_by_another_process(tmp_path):
+    filename = str(tmp_path / 'tasks.log')
+    reader, writer = LogRepository(filename, Task), LogRepository(filename, Task)
+    kept, dropped = make_task('Kept'), make_task('Dropped')
+    writer.add_many([kept, dropped])
+    writer.remove(dropped)
+    assert len(reader.list()) == 1
+
+    writer.compact()
+    writer.add(make_task('After'))
+
+    assert sorted(task.name for task in reader.list()) == ['After', 'Kept']
+    assert reader.garbage == 0
+    reader.close()
+    writer.close()
+
+def test_log_seals_torn_record_before_appending(tmp_path):
+    filename = str(tmp_path / 'tasks.log')
+    repository = LogRepository(filename, Task)
+    first, second = make_task('First'), make_task('Second')
+    repository.add(first)
+    with open(filename, 'a') as f:
+        f.write('{"op": "add", "da')
+
+    repository.add(second)
+    repository.close()
+
+    reopened = LogRepository(filename, Task)
+    assert [task.name for task in reopened.list()] == ['First', 'Second']
+    assert reopened.garbage == 1
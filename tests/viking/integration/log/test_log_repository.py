@@ -0,0 +1,202 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+from uuid import uuid4
+
+from viking.domain.task import Task
+from viking.infrastructure.log_repository import LogRepository
+
+
+def make_tasks(count: int) -> list:
+    tasks = [Task(f'Task {i}') for i in range(count)]
+    for task in tasks:
+        task.id = uuid4()
+    return tasks
+
+def count_records(filename: str) -> int:
+    with open(filename) as f:
+        return len(f.readlines())
+
+def test_log_repository_save(task: Task, repo: LogRepository):
+    repo.add(task)
+    assert repo.get(task.id).name == task.name
+
+def test_log_repository_save_multiple(task: Task, repo: LogRepository):
+    repo.add(task)
+    repo.add(task)
+    assert repo.list() == [task]
+
+def test_get_by_string_reference(task: Task, repo: LogRepository):
+    repo.add(task)
+    assert repo.get(str(task.id)) is task
+
+def test_remove(task: Task, repo: LogRepository):
+    repo.add(task)
+    repo.remove(task)
+    assert repo.get(task.id) is None
+    assert len(repo.list()) == 0
+
+def test_remove_nonexistent(task: Task, repo: LogRepository):
+    assert repo.remove(task) is None
+    assert len(repo.list()) == 0
+
+def test_mutations_are_appended(filename: str, repo: LogRepository):
+    task, other = make_tasks(2)
+    repo.add(task)
+    repo.add(other)
+    repo.add(task)
+    repo.remove(other)
+
+    assert count_records(filename) == 4
+    assert repo.garbage == 3
+
+def test_reopen_replays_log(filename: str, repo: LogRepository):
+    first, second = make_tasks(2)
+    repo.add(first)
+    repo.add(second)
+    first.complete()
+    repo.add(first)
+    repo.remove(second)
+    repo.close()
+
+    reopened = LogRepository(filename, Task)
+
+    assert [t.id for t in reopened.list()] == [first.id]
+    assert reopened.get(first.id).completed
+    assert reopened.get(first.id).name == first.name
+
+def test_reopen_ignores_torn_record(filename: str, repo: LogRepository):
+    task = make_tasks(1)[0]
+    repo.add(task)
+    repo.close()
+    with open(filename, 'a') as f:
+        f.write('{"op": "add", "da')
+
+    assert LogRepository(filename, Task).get(task.id).name == task.name
+
+def test_compact_keeps_live_entities(filename: str, repo: LogRepository):
+    tasks = make_tasks(5)
+    for task in tasks:
+        repo.add(task)
+        repo.add(task)
+    repo.remove(tasks[0])
+
+    repo.compact()
+
+    assert count_records(filename) == 4
+    assert repo.garbage == 0
+    assert {t.id for t in LogRepository(filename, Task).list()} == {t.id for t in tasks[1:]}
+
+def test_writes_after_compact(filename: str, repo: LogRepository):
+    first, second = make_tasks(2)
+    repo.add(first)
+    repo.remove(first)
+    repo.compact()
+
+    repo.add(second)
+
+    assert [t.id for t in LogRepository(filename, Task).list()] == [second.id]
+
+def test_background_compaction(filename: str):
+    repo = LogRepository(filename, Task, compaction_threshold=10)
+    task = make_tasks(1)[0]
+    for _ in range(20):
+        repo.add(task)
+    repo.close()
+
+    assert count_records(filename) < 20
+    assert [t.id for t in LogRepository(filename, Task).list()] == [task.id]
+
+def test_batch_writes_append_once(filename: str, repo: LogRepository):
+    tasks = make_tasks(3)
+    writes = []
+    write = repo._write
+    repo._write = lambda lines: writes.append(lines) or write(lines)
+
+    repo.add_many(tasks)
+    repo.remove_many(tasks[:2])
+
+    assert len(writes) == 2
+    assert count_records(filename) == 5
+    assert repo.get_many([tasks[2].id, tasks[0].id]) == [tasks[2], None]
+
+def test_slice(repo: LogRepository):
+    tasks = make_tasks(4)
+    repo.add_many(tasks)
+
+    assert repo.slice(1, 2) == tasks[1:3]
+
+def test_find_by_name(filename: str, repo: LogRepository):
+    first, second = make_tasks(2)
+    repo.add_many([first, second])
+    first.name = 'Renamed'
+    repo.add(first)
+    repo.remove(second)
+    repo.close()
+
+    reopened = LogRepository(filename, Task)
+
+    assert reopened.find_by_name('Renamed').id == first.id
+    assert reopened.find_by_name('Task 0') is None
+    assert reopened.find_by_name('Task 1') is None
+    assert reopened.list()[0].id == first.id
+
+def test_apply_changes_appends_once(filename: str, repo: LogRepository):
+    kept, changed, dropped, added = make_tasks(4)
+    repo.add_many([kept, changed, dropped])
+    writes = []
+    write = repo._write
+    repo._write = lambda lines: writes.append(lines) or write(lines)
+
+    changed.complete()
+    repo.apply_changes([added], [changed], [dropped])
+    repo.close()
+
+    assert len(writes) == 1
+    reopened = LogRepository(filename, Task)
+    assert [t.name for t in reopened.list()] == ['Task 0', 'Task 1', 'Task 3']
+    assert reopened.get(changed.id).completed
+
+def test_update_fields_appends_one_record(filename: str, repo: LogRepository):
+    task = make_tasks(1)[0]
+    repo.add(task)
+
+    repo.update_fields(task.id, completed=True)
+    repo.close()
+
+    assert count_records(filename) == 2
+    assert LogRepository(filename, Task).get(task.id).completed
+
+def test_io_stats_count_replays_and_appends(filename: str):
+    writer = LogRepository(filename, Task)
+    writer.add_many([Task('One'), Task('Two')])
+    size = os.stat(filename).st_size
+    reader = LogRepository(filename, Task)
+
+    writer.add(Task('Three'))
+    reader.list()
+
+    assert writer.io.bytes_written == os.stat(filename).st_size
+    assert reader.io.rows_scanned == 3
+    assert reader.io.bytes_read == os.stat(filename).st_size
+    assert reader.io.opens == 2 and size < reader.io.bytes_read
+    writer.close()
+    reader.close()
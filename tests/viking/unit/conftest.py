@@ -24,6 +24,7 @@ from pytest import fixture
 from viking.domain.seedwork import Entity
 from viking.domain.task import Task
 from viking.fakes import FakeFactory, FakeRepository
+from viking.infrastructure import AsyncRepository
 
 
 @fixture
@@ -45,3 +46,7 @@ def repo():
 @fixture
 def factory():
     return FakeFactory()
+
+@fixture
+def async_repo(repo):
+    return AsyncRepository(repo)
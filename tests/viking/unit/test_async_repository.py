@@ -0,0 +1,113 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from asyncio import run
+from concurrent.futures import ThreadPoolExecutor
+from threading import get_ident
+from uuid import uuid4
+
+from viking.domain.seedwork import AsyncAbstractRepository, Entity
+from viking.fakes import FakeRepository
+from viking.infrastructure import AsyncRepository
+
+
+def make_entities(count: int) -> list:
+    entities = [Entity() for _ in range(count)]
+    for entity in entities:
+        entity.id = uuid4()
+    return entities
+
+def test_async_repository_is_async_abstract_repository(async_repo: AsyncRepository):
+    assert isinstance(async_repo, AsyncAbstractRepository)
+
+def test_async_add_and_get(async_repo: AsyncRepository, entity: Entity):
+    async def scenario():
+        await async_repo.add(entity)
+        return await async_repo.get(entity.id)
+
+    assert run(scenario()) == entity
+
+def test_async_remove(async_repo: AsyncRepository, entity: Entity):
+    async def scenario():
+        await async_repo.add(entity)
+        await async_repo.remove(entity)
+        return await async_repo.list()
+
+    assert run(scenario()) == []
+
+def test_async_batch_methods(async_repo: AsyncRepository):
+    entities = make_entities(3)
+
+    async def scenario():
+        await async_repo.add_many(entities)
+        await async_repo.remove_many(entities[:1])
+        return await async_repo.get_many(e.id for e in entities)
+
+    assert run(scenario()) == [None] + entities[1:]
+
+def test_async_iter_in_chunks(async_repo: AsyncRepository):
+    entities = make_entities(5)
+    async_repo.ITER_CHUNK_SIZE = 2
+
+    async def scenario():
+        await async_repo.add_many(entities)
+        return [e async for e in async_repo.iter()]
+
+    assert run(scenario()) == entities
+
+def test_async_slice(async_repo: AsyncRepository):
+    entities = make_entities(5)
+
+    async def scenario():
+        await async_repo.add_many(entities)
+        return await async_repo.slice(1, 2)
+
+    assert run(scenario()) == entities[1:3]
+
+def test_calls_run_off_the_event_loop_thread():
+    class ThreadRecordingRepository(FakeRepository):
+        def list(self):
+            return [get_ident()]
+
+    async def scenario():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            repo = AsyncRepository(ThreadRecordingRepository(), executor)
+            return get_ident(), await repo.list()
+
+    loop_thread, (call_thread,) = run(scenario())
+    assert loop_thread != call_thread
+
+def test_async_find_by(async_repo: AsyncRepository, task):
+    async def scenario():
+        await async_repo.add(task)
+        return await async_repo.find_by(name=task.name), await async_repo.find_by_name(task.name)
+
+    assert run(scenario()) == ([task], task)
+
+def test_async_update_methods(async_repo: AsyncRepository):
+    first, second = make_entities(2)
+
+    async def scenario():
+        await async_repo.add_many([first, second])
+        await async_repo.update(first)
+        await async_repo.update_many([second])
+        return await async_repo.update_fields(first.id, id=first.id)
+
+    assert run(scenario()) is first
@@ -0,0 +1,133 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from types import SimpleNamespace
+
+import pytest
+import viking.infrastructure.backends as backends
+from viking.domain.task import Task
+from viking.fakes import FakeRepository
+from viking.infrastructure import CsvRepository, LogRepository, RepositoryFactory
+from viking.infrastructure.backends import (Backend, BackendRegistry, Option,
+                                            load_config)
+
+
+def test_option_parses_strings():
+    assert Option('cached', bool).parse('Yes') is True
+    assert Option('cached', bool).parse('off') is False
+    assert Option('every', int).parse('10') == 10
+    assert Option('every', int).parse(5) == 5
+    assert Option('name').parse('10') == '10'
+
+@pytest.mark.parametrize(('option', 'value'), [(Option('cached', bool), 'maybe'), (Option('every', int), 'ten')])
+def test_option_rejects_invalid_values(option: Option, value: str):
+    with pytest.raises(ValueError, match=option.name):
+        option.parse(value)
+
+def test_backend_fills_defaults_and_rejects_unknown_options():
+    backend = Backend('custom', lambda entity_type, **options: options, (Option('a', int, 1), Option('b', str, 'x')))
+
+    assert backend.create(Task, {'a': '2'}) == {'a': 2, 'b': 'x'}
+    with pytest.raises(ValueError, match='no option c'):
+        backend.configure({'c': '1'})
+
+def test_registry_loads_plugins_once(monkeypatch):
+    plugin = Backend('plugin', lambda entity_type: FakeRepository())
+    loads = []
+    entry_point = SimpleNamespace(name='plugin', load=lambda: loads.append(1) or plugin)
+    monkeypatch.setattr(backends, '_entry_points', lambda group: [entry_point] if group == 'test.group' else [])
+    registry = BackendRegistry('test.group')
+
+    assert registry.get('plugin') is plugin
+    assert registry.get('missing') is None
+    assert registry.names() == ['plugin']
+    assert loads == [1]
+
+def test_load_config(tmp_path):
+    config = tmp_path / 'hungry_task.ini'
+    config.write_text('[repository:fast]\nbackend = csv\ncached = true\n\n[other]\nkey = value\n')
+
+    assert load_config(str(config)) == {'fast': {'backend': 'csv', 'cached': 'true'}}
+
+def test_load_config_rejects_invalid_files(tmp_path):
+    config = tmp_path / 'hungry_task.ini'
+    config.write_text('[repository:fast\n')
+
+    with pytest.raises(ValueError, match='hungry_task.ini'):
+        load_config(str(config))
+
+def test_factory_builds_configured_repositories(tmp_path):
+    filename = str(tmp_path / 'tasks.csv')
+    factory = RepositoryFactory(Task, config={'fast': {'backend': 'csv', 'filename': filename, 'cached': 'true'}})
+
+    repository = factory.create('fast')
+
+    assert isinstance(repository, CsvRepository)
+    assert repository.filename == filename and repository.cached is True
+
+def test_factory_configures_backends_by_name(tmp_path):
+    factory = RepositoryFactory(Task, config={'log': {'filename': str(tmp_path / 'tasks.log'), 'compaction_threshold': '5'}})
+
+    repository = factory.create('log')
+
+    assert isinstance(repository, LogRepository)
+    assert repository.compaction_threshold == 5
+    factory.close()
+
+def test_factory_rejects_invalid_config():
+    factory = RepositoryFactory(Task, config={'csv': {'cache': 'true'}})
+
+    with pytest.raises(ValueError, match='no option cache'):
+        factory.create('csv')
+
+def test_factory_ignores_pool_sizing_on_sqlite(tmp_path):
+    url = f'sqlite:///{tmp_path / "tasks.db"}'
+    factory = RepositoryFactory(Task, config={'sql': {'backend': 'alchemy', 'url': url, 'pool_size': '5', 'max_overflow': '2'}})
+
+    repository = factory.create('sql')
+    repository.add(Task('Pooled'))
+
+    assert repository.find_by_name('Pooled') is not None
+    factory.close()
+
+def test_factory_rejects_invalid_database_url():
+    factory = RepositoryFactory(Task, config={'sql': {'backend': 'alchemy', 'url': 'nope://'}})
+
+    with pytest.raises(ValueError, match='Backend alchemy'):
+        factory.create('sql')
+
+def test_factory_pools_instances(tmp_path):
+    factory = RepositoryFactory(Task, config={'csv': {'filename': str(tmp_path / 'tasks.csv')}})
+
+    assert factory.create('csv') is factory.create('csv')
+    assert factory.create('fake') is not factory.create('fake')
+
+def test_factory_reads_config_file(tmp_path, monkeypatch):
+    config = tmp_path / 'custom.ini'
+    config.write_text(f'[repository:mine]\nbackend = csv\nfilename = {tmp_path / "mine.csv"}\n')
+    monkeypatch.setenv('HUNGRY_TASK_CONFIG', str(config))
+
+    assert RepositoryFactory(Task).create('mine').filename == str(tmp_path / 'mine.csv')
+
+def test_factory_without_config_file(tmp_path, monkeypatch):
+    monkeypatch.delenv('HUNGRY_TASK_CONFIG', raising=False)
+    monkeypatch.chdir(tmp_path)
+
+    assert RepositoryFactory(Task).config == {}
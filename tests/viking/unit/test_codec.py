@@ -0,0 +1,113 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from uuid import UUID, uuid4
+
+import pytest
+from viking.domain.task import Task
+from viking.infrastructure.codec import codec_for
+
+
+@pytest.fixture
+def codec():
+    return codec_for(Task)
+
+def test_codec_is_built_once():
+    assert codec_for(Task) is codec_for(Task)
+
+def test_row_round_trip(codec, task: Task):
+    task.id = uuid4()
+    task.complete()
+    row = [str(value) for value in codec.row(task)]
+
+    decoded = codec.decoder(codec.columns)(row)
+
+    assert codec.columns == ('id', 'name', 'completed', '_completed')
+    assert isinstance(decoded.id, UUID) and decoded.id == task.id
+    assert decoded.name == task.name
+    assert decoded.completed is True
+
+@pytest.mark.parametrize(('text', 'completed'), [('True', True), ('False', False), ('1', True), ('0', False), ('yes', True)])
+def test_decodes_legacy_booleans(codec, text: str, completed: bool):
+    decoded = codec.decoder(('id', 'name', '_completed'))([str(uuid4()), 'Task', text])
+
+    assert decoded.completed is completed
+
+def test_decodes_reordered_and_missing_columns(codec):
+    identifier = uuid4()
+
+    decoded = codec.decoder(('name', 'id'))(['Task', str(identifier).upper()])
+
+    assert decoded.id == identifier
+    assert decoded.completed is False
+
+def test_property_is_decoded_into_backing_field(codec):
+    decoded = codec.decoder(('completed',))(['True'])
+    decoded.completed = False
+
+    assert decoded.completed is False
+
+def test_decoders_are_cached(codec):
+    assert codec.decoder(codec.columns) is codec.decoder(list(codec.columns))
+    assert codec.decoder(codec.columns) is not codec.decoder(codec.columns, text=False)
+
+@pytest.mark.parametrize(('value', 'completed'), [(True, True), (False, False), (1, True), (0, False), ('true', True), ('false', False)])
+def test_decodes_values_as_booleans(codec, value, completed: bool):
+    assert codec.from_dict({'name': 'Task', 'completed': value}).completed is completed
+
+@pytest.mark.parametrize('value', ['False', 'maybe', 2, None, [], {}])
+def test_rejects_values_that_are_not_booleans(codec, value):
+    with pytest.raises(ValueError):
+        codec.from_dict({'name': 'Task', 'completed': value})
+
+def test_copy(codec, task: Task):
+    task.complete()
+
+    copied = codec.copy(task)
+    copied.name = 'Changed'
+
+    assert copied is not task and copied == task
+    assert copied.completed is True and task.name != 'Changed'
+
+def test_dict_round_trip(codec, task: Task):
+    task.id = uuid4()
+    task.complete()
+
+    data = codec.to_dict(task)
+    decoded = codec.from_dict({**data, 'id': str(data['id'])})
+
+    assert data == {'id': task.id, 'name': task.name, 'completed': True}
+    assert decoded.id == task.id and decoded.completed is True
+
+@pytest.mark.parametrize('text', ['+' + 'f' * 35, '0' * 36, 'f' * 36])
+def test_rejects_malformed_uuids(codec, text: str):
+    with pytest.raises(ValueError):
+        codec.decoder(('id', 'name'))((text, 'Task'))
+
+@pytest.mark.parametrize('text', [
+    ' 0000000-0000-0000-0000-000000000000',
+    '0000_000-0000-0000-0000-000000000000',
+    '01A14FA1-112B-704F-9E29-3F0EFF490F20',
+])
+def test_non_canonical_uuids_parse_like_uuid(codec, text: str):
+    decoded = codec.decoder(('id', 'name'))((text, 'Task')).id
+
+    assert decoded == UUID(text)
+    assert UUID(str(decoded)) == decoded
@@ -32,8 +32,8 @@ def test_entity_id_is_uuid(entity: Entity):
 def test_entity_is_equivalent_based_on_id(uuid: UUID):
     first, second = Entity(), Entity()
 
-    first.uuid = uuid
-    second.uuid = uuid
+    first.id = uuid
+    second.id = uuid
 
     assert first == second
 
@@ -46,7 +46,7 @@ def test_entity_is_hashable(entity: Entity):
 def test_entity_hash_is_based_on_id(uuid: UUID):
     first, second = Entity(), Entity()
 
-    first.uuid = uuid
-    second.uuid = uuid
+    first.id = uuid
+    second.id = uuid
 
     assert hash(first) == hash(second)
@@ -0,0 +1,91 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from multiprocessing import Pipe, Process
+from uuid import UUID, uuid4
+
+import pytest
+from viking.domain.seedwork import (Entity, RandomIdAllocator,
+                                    TimeOrderedIdAllocator, get_id_allocator,
+                                    new_id, set_id_allocator)
+from viking.domain.task import Task
+
+
+@pytest.fixture
+def allocator():
+    previous = get_id_allocator()
+    yield
+    set_id_allocator(previous)
+
+def send_id(connection) -> None:
+    connection.send(new_id())
+    connection.close()
+
+@pytest.mark.parametrize(('allocator_type', 'version'), [(RandomIdAllocator, 4), (TimeOrderedIdAllocator, 7)])
+def test_allocators_make_unique_rfc_ids(allocator_type: type, version: int):
+    allocate = allocator_type()
+
+    ids = [allocate() for _ in range(10000)]
+
+    assert len(set(ids)) == len(ids)
+    assert {uuid.version for uuid in ids} == {version}
+    assert {uuid.variant for uuid in ids} == {'specified in RFC 4122'}
+    assert all(UUID(str(uuid)) == uuid for uuid in ids)
+
+def test_time_ordered_ids_sort_in_allocation_order():
+    allocate = TimeOrderedIdAllocator()
+
+    ids = [allocate() for _ in range(10000)]
+
+    assert ids == sorted(ids)
+    assert sorted(str(uuid) for uuid in ids) == [str(uuid) for uuid in ids]
+
+def test_entities_default_to_time_ordered_ids():
+    first, second = Task('First'), Task('Second')
+
+    assert first.id.version == 7
+    assert first.id < second.id
+
+def test_set_id_allocator(allocator):
+    fixed = uuid4()
+
+    set_id_allocator(lambda: fixed)
+
+    assert Entity().id == fixed
+    assert Task('Task').id == fixed
+
+def test_forked_child_does_not_repeat_ids(allocator):
+    set_id_allocator(RandomIdAllocator())
+    new_id()
+    receiver, sender = Pipe(duplex=False)
+    child = Process(target=send_id, args=(sender,))
+    child.start()
+    child_id = receiver.recv()
+    child.join()
+
+    assert child_id != new_id()
+
+def test_entities_are_equal_by_id():
+    first, second = Task('First'), Task('Second')
+    second.id = first.id
+
+    assert first == second
+    assert len({first, second}) == 1
+    assert Task('First') != first
@@ -0,0 +1,86 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import pytest
+from viking.domain.task import Task
+from viking.fakes import FakeRepository
+from viking.infrastructure import InstrumentedRepository, MetricsRegistry
+from viking.infrastructure.file_io import IOStats
+
+CALLS = 'hungry_task_repository_calls_total'
+
+
+class CountingRepository(FakeRepository):
+    def __init__(self):
+        super().__init__()
+        self.io = IOStats()
+
+    def list(self):
+        self.io.opens += 1
+        self.io.rows_scanned += len(self._entities)
+        return super().list()
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+@pytest.fixture
+def instrumented(registry):
+    return InstrumentedRepository(FakeRepository(), 'fake', registry)
+
+def test_records_calls_and_latency(instrumented: InstrumentedRepository, registry: MetricsRegistry, task: Task):
+    instrumented.add(task)
+    instrumented.get(task.id)
+    instrumented.get(task.id)
+
+    assert registry.counter(CALLS, backend='fake', operation='add') == 1
+    assert registry.counter(CALLS, backend='fake', operation='get') == 2
+    assert registry.histogram('hungry_task_repository_seconds', backend='fake', operation='get').count == 2
+
+def test_records_errors(instrumented: InstrumentedRepository, registry: MetricsRegistry, task: Task):
+    with pytest.raises(KeyError):
+        instrumented.remove(task)
+
+    assert registry.counter(CALLS, backend='fake', operation='remove') == 1
+    assert registry.counter('hungry_task_repository_errors_total', backend='fake', operation='remove') == 1
+
+def test_records_iteration_once_finished(instrumented: InstrumentedRepository, registry: MetricsRegistry):
+    instrumented.add_many([Task('One'), Task('Two')])
+    entities = instrumented.iter()
+
+    assert registry.counter(CALLS, backend='fake', operation='iter') == 0
+    assert len(list(entities)) == 2
+    assert registry.counter(CALLS, backend='fake', operation='iter') == 1
+
+def test_records_io_of_file_backends(registry: MetricsRegistry):
+    instrumented = InstrumentedRepository(CountingRepository(), 'counting', registry)
+    instrumented.add_many([Task('One'), Task('Two')])
+
+    instrumented.list()
+
+    assert registry.counter('hungry_task_repository_rows_scanned_total', backend='counting', operation='list') == 2
+    assert registry.counter('hungry_task_repository_file_opens_total', backend='counting', operation='list') == 1
+    assert registry.counter('hungry_task_repository_rows_scanned_total', backend='counting', operation='add_many') == 0
+
+def test_forwards_other_attributes(registry: MetricsRegistry):
+    repository = CountingRepository()
+
+    assert InstrumentedRepository(repository, 'counting', registry).io is repository.io
@@ -0,0 +1,86 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from viking.infrastructure.metrics import (Histogram, MetricsRegistry,
+                                           NullSink, labels, prometheus_text)
+
+
+class RecordingSink(NullSink):
+    def __init__(self):
+        self.seen = []
+
+    def increment(self, name, labels, amount=1):
+        self.seen.append(('increment', name, labels, amount))
+
+    def observe(self, name, labels, value):
+        self.seen.append(('observe', name, labels, value))
+
+
+def test_labels_are_canonical():
+    assert labels(b='2', a=1) == (('a', '1'), ('b', '2'))
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((1.0, 2.0))
+    for value in (0.5, 1.0, 1.5, 3.0):
+        histogram.observe(value)
+
+    assert histogram.cumulative() == [(1.0, 2), (2.0, 3), (float('inf'), 4)]
+    assert histogram.count == 4
+    assert histogram.sum == 6.0
+
+def test_registry_keeps_series_apart():
+    registry = MetricsRegistry()
+    registry.increment('calls', labels(operation='get'))
+    registry.increment('calls', labels(operation='get'), 2)
+    registry.increment('calls', labels(operation='list'))
+
+    assert registry.counter('calls', operation='get') == 3
+    assert registry.counter('calls', operation='list') == 1
+    assert registry.counter('calls', operation='add') == 0
+
+def test_registry_forwards_to_sinks():
+    registry, sink = MetricsRegistry(), RecordingSink()
+    registry.add_sink(sink)
+
+    registry.increment('calls', labels(operation='get'))
+    registry.observe('seconds', labels(operation='get'), 0.5)
+
+    assert sink.seen == [
+        ('increment', 'calls', (('operation', 'get'),), 1),
+        ('observe', 'seconds', (('operation', 'get'),), 0.5),
+    ]
+    assert registry.histogram('seconds', operation='get').count == 1
+
+def test_prometheus_text():
+    registry = MetricsRegistry()
+    registry.describe('calls_total', 'Calls.')
+    registry.increment('calls_total', labels(operation='get'), 3)
+    registry.observe('seconds', labels(operation='say "hi"'), 0.00001)
+
+    text = prometheus_text(registry)
+
+    assert text.startswith('# HELP calls_total Calls.\n# TYPE calls_total counter\ncalls_total{operation="get"} 3\n')
+    assert '# TYPE seconds histogram\n' in text
+    assert 'seconds_bucket{operation="say \\"hi\\"",le="1e-05"} 1\n' in text
+    assert 'seconds_bucket{operation="say \\"hi\\"",le="+Inf"} 1\n' in text
+    assert 'seconds_count{operation="say \\"hi\\""} 1\n' in text
+
+def test_prometheus_text_of_empty_registry():
+    assert prometheus_text(MetricsRegistry()) == ''
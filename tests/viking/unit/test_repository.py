@@ -18,9 +18,11 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
-from uuid import UUID
+from uuid import UUID, uuid4
 
 from viking.domain.seedwork import AbstractRepository, Entity
+from viking.domain.task import Task
+from viking.fakes import FakeRepository
 
 
 def test_repository_add_entity(repo: AbstractRepository, entity: Entity):
@@ -62,3 +64,113 @@ def test_add_three_different_entities_list_three_entities(repo: AbstractReposito
     for e in expected:
         repo.add(e)
         assert e in repo.list()
+
+def test_add_many_entities(repo: AbstractRepository):
+    expected = [Entity(), Entity(), Entity()]
+    for e in expected:
+        e.id = uuid4()
+
+    repo.add_many(expected)
+
+    assert repo.list() == expected
+
+def test_get_many_entities_keeps_order(repo: AbstractRepository):
+    first, second = Entity(), Entity()
+    first.id, second.id = uuid4(), uuid4()
+    repo.add_many([first, second])
+
+    assert repo.get_many([second.id, uuid4(), first.id]) == [second, None, first]
+
+def test_remove_many_entities(repo: AbstractRepository):
+    first, second = Entity(), Entity()
+    first.id, second.id = uuid4(), uuid4()
+    repo.add_many([first, second])
+
+    repo.remove_many([first, Entity()])
+
+    assert repo.list() == [second]
+
+def test_batch_methods_fall_back_to_single_calls():
+    class LoopingRepository(FakeRepository):
+        add_many = AbstractRepository.add_many
+        get_many = AbstractRepository.get_many
+        remove_many = AbstractRepository.remove_many
+
+    repo, entity = LoopingRepository(), Entity()
+    repo.add_many([entity])
+
+    assert repo.get_many([entity.id]) == [entity]
+    repo.remove_many([entity])
+    assert repo.list() == []
+
+def test_iter_entities(repo: AbstractRepository):
+    expected = [Entity(), Entity()]
+    for e in expected:
+        e.id = uuid4()
+    repo.add_many(expected)
+
+    assert list(repo.iter()) == expected
+
+def test_slice_entities(repo: AbstractRepository):
+    expected = [Entity(), Entity(), Entity()]
+    for e in expected:
+        e.id = uuid4()
+    repo.add_many(expected)
+
+    assert repo.slice(1, 5) == expected[1:]
+    assert repo.slice(0, 1) == expected[:1]
+
+def test_find_by_name(repo: AbstractRepository):
+    first, second = Task('First'), Task('Second')
+    first.id, second.id = uuid4(), uuid4()
+    repo.add_many([first, second])
+
+    assert repo.find_by_name('Second') is second
+    assert repo.find_by_name('Third') is None
+
+def test_find_by_name_follows_renames(repo: AbstractRepository, task: Task):
+    repo.add(task)
+    task.name = 'Renamed'
+    repo.add(task)
+
+    assert repo.find_by_name('Task Name') is None
+    assert repo.find_by_name('Renamed') is task
+
+def test_find_by_name_after_remove(repo: AbstractRepository, task: Task):
+    repo.add(task)
+    repo.remove(task)
+
+    assert repo.find_by_name(task.name) is None
+
+def test_find_by_criteria(repo: AbstractRepository):
+    tasks = [Task('Same'), Task('Same'), Task('Other')]
+    for task in tasks:
+        task.id = uuid4()
+    tasks[1].complete()
+    repo.add_many(tasks)
+
+    assert repo.find_by(name='Same') == tasks[:2]
+    assert repo.find_by(name='Same', completed=True) == [tasks[1]]
+    assert repo.find_by(completed=False) == [tasks[0], tasks[2]]
+
+def test_update_replaces_in_place(repo: AbstractRepository):
+    tasks = [Task('First'), Task('Second'), Task('Third')]
+    for task in tasks:
+        task.id = uuid4()
+    repo.add_many(tasks)
+    changed = Task('Changed')
+    changed.id = tasks[1].id
+
+    repo.update(changed)
+
+    assert [task.name for task in repo.list()] == ['First', 'Changed', 'Third']
+    assert repo.find_by_name('Second') is None
+
+def test_update_fields(repo: AbstractRepository, task: Task):
+    repo.add(task)
+
+    updated = repo.update_fields(task.id, name='Renamed', completed=True)
+
+    assert updated.name == 'Renamed' and updated.completed
+    assert repo.find_by_name('Renamed') is task
+    assert repo.update_fields(uuid4(), name='Missing') is None
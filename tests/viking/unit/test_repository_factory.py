@@ -21,11 +21,45 @@
 import pytest
 from viking.domain.task import Task
 from viking.fakes import FakeRepository
-from viking.infrastructure import (AlchemyRepository, CsvRepository,
+from viking.infrastructure import (AlchemyRepository, BinaryRepository,
+                                   CsvRepository, InstrumentedRepository,
+                                   LogRepository, MetricsRegistry,
                                    RepositoryFactory)
+from viking.infrastructure.backends import Backend, registry
 
 
-@pytest.mark.parametrize(('name', 'expected'), [('alchemy', AlchemyRepository), ('csv', CsvRepository), ('fake', FakeRepository)])
+@pytest.mark.parametrize(('name', 'expected'), [('alchemy', AlchemyRepository), ('binary', BinaryRepository), ('csv', CsvRepository), ('log', LogRepository), ('fake', FakeRepository)])
 def test_repository_factory_create(name: str, expected: type):
     factory = RepositoryFactory(Task)
     assert type(factory.create(name)) == expected
+
+def test_repository_factory_instruments_with_metrics():
+    registry = MetricsRegistry()
+    repository = RepositoryFactory(Task, metrics=registry).create('fake')
+
+    repository.list()
+
+    assert isinstance(repository, InstrumentedRepository)
+    assert registry.counter('hungry_task_repository_calls_total', backend='fake', operation='list') == 1
+
+def test_repository_factory_uses_registered_backends(monkeypatch):
+    monkeypatch.setattr(registry, '_backends', dict(registry._backends))
+    registry.register(Backend('registered', lambda entity_type: FakeRepository()))
+
+    assert 'registered' in registry.names()
+    assert type(RepositoryFactory(Task).create('registered')) == FakeRepository
+
+def test_registered_backends_do_not_leak():
+    assert 'registered' not in registry.names()
+
+def test_repository_factory_rejects_unknown_backends():
+    with pytest.raises(Exception, match='Unknown repository type: nope'):
+        RepositoryFactory(Task).create('nope')
+
+def test_infrastructure_exports_are_lazy():
+    import viking.infrastructure as infrastructure
+
+    assert infrastructure.CsvRepository is CsvRepository
+    assert set(infrastructure.__all__) <= set(dir(infrastructure))
+    with pytest.raises(AttributeError):
+        infrastructure.Missing
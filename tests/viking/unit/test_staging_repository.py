@@ -0,0 +1,98 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import pytest
+from viking.domain.task import Task
+from viking.fakes import FakeRepository
+from viking.infrastructure.staging_repository import StagingRepository
+
+
+class RecordingRepository(FakeRepository):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def apply_changes(self, added, changed, removed):
+        added, changed, removed = list(added), list(changed), list(removed)
+        self.batches.append(([t.name for t in added], [t.name for t in changed], [t.name for t in removed]))
+        super().apply_changes(added, changed, removed)
+
+
+@pytest.fixture
+def stored():
+    repository = RecordingRepository()
+    repository.add_many([Task('Stored'), Task('Doomed')])
+    return repository
+
+@pytest.fixture
+def staging(stored):
+    return StagingRepository(stored)
+
+def test_writes_wait_for_flush(staging: StagingRepository, stored: RecordingRepository):
+    staging.add(Task('New'))
+    staging.remove(staging.find_by_name('Doomed'))
+
+    assert staging.pending == 2
+    assert sorted(t.name for t in stored.list()) == ['Doomed', 'Stored']
+    assert stored.batches == []
+
+def test_reads_see_staged_writes(staging: StagingRepository):
+    new = Task('New')
+    staging.add(new)
+    doomed = staging.find_by_name('Doomed')
+    staging.remove(doomed)
+
+    assert staging.get(new.id) is new
+    assert staging.get(doomed.id) is None
+    assert staging.find_by_name('New') is new
+    assert staging.find_by_name('Doomed') is None
+    assert [t.name for t in staging.list()] == ['Stored', 'New']
+
+def test_reads_see_staged_changes(staging: StagingRepository):
+    task = staging.find_by_name('Stored')
+    renamed = Task('Renamed')
+    renamed.id = task.id
+    staging.update(renamed)
+
+    assert staging.find_by_name('Stored') is None
+    assert staging.find_by_name('Renamed') is renamed
+    assert staging.get_many([task.id]) == [renamed]
+
+def test_flush_applies_one_batch(staging: StagingRepository, stored: RecordingRepository):
+    staging.add(Task('New'))
+    staging.update(staging.find_by_name('Stored').complete())
+    staging.remove(staging.find_by_name('Doomed'))
+
+    staging.flush()
+    staging.flush()
+
+    assert stored.batches == [(['New'], ['Stored'], ['Doomed'])]
+    assert sorted(t.name for t in stored.list()) == ['New', 'Stored']
+    assert stored.find_by_name('Stored').completed
+    assert staging.pending == 0
+
+def test_discard_forgets_writes(staging: StagingRepository, stored: RecordingRepository):
+    staging.add(Task('New'))
+
+    staging.discard()
+    staging.flush()
+
+    assert staging.find_by_name('New') is None
+    assert stored.batches == []
@@ -18,6 +18,9 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import pickle
+import tracemalloc
+from dataclasses import asdict
 from uuid import UUID
 
 import pytest
@@ -74,3 +77,40 @@ def test_task_id_is_uuid(task):
 def test_task_is_entity(task):
     assert issubclass(type(task), Entity)
 
+
+# Bytes each task may take, its id included, so million-task stores stay within a few hundred MB.
+TASK_MEMORY_BUDGET = 200
+
+def test_task_has_no_instance_dict(task):
+    assert not hasattr(task, '__dict__')
+    with pytest.raises(AttributeError):
+        task.unknown = True
+
+def test_tasks_have_distinct_ids():
+    assert Task('First').id != Task('Second').id
+
+def test_task_as_dict(task):
+    task.complete()
+
+    assert asdict(task) == {'id': task.id, 'name': task.name, 'completed': True, '_completed': True}
+
+def test_task_pickles(task):
+    task.complete()
+
+    restored = pickle.loads(pickle.dumps(task))
+
+    assert restored == task
+    with pytest.raises(Task.AlreadyCompletedError):
+        restored.complete()
+
+def test_task_memory_budget():
+    names = [f'Task {number}' for number in range(10000)]
+
+    tracemalloc.start()
+    try:
+        tasks = [Task(name) for name in names]
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert size / len(tasks) <= TASK_MEMORY_BUDGET
@@ -0,0 +1,185 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from copy import copy
+
+import pytest
+from viking.domain.task import Task
+from viking.fakes import FakeRepository
+from viking.infrastructure import transfer
+from viking.infrastructure.codec import codec_for
+from viking.infrastructure.binary_repository import BinaryRepository
+from viking.infrastructure.csv_repository import CsvRepository
+from viking.infrastructure.log_repository import LogRepository
+
+
+class RecordingRepository(FakeRepository):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def apply_changes(self, added, changed, removed):
+        added, changed = list(added), list(changed)
+        self.batches.append((len(added), len(changed)))
+        super().apply_changes(added, changed, removed)
+
+
+@pytest.fixture
+def tasks():
+    tasks = [Task(f'Task {number}') for number in range(5)]
+    tasks[1].complete()
+    return tasks
+
+def lines(text: str):
+    return text.splitlines(keepends=True)
+
+def test_chunks():
+    assert list(transfer.chunks(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(transfer.chunks([], 2)) == []
+
+@pytest.mark.parametrize('format_name', sorted(transfer.FORMATS))
+def test_round_trip(tasks, format_name: str):
+    codec = codec_for(Task)
+    text = ''.join(transfer.encode(tasks, codec, format_name, chunk_size=2))
+
+    decoded = list(transfer.decode(lines(text), codec, format_name))
+
+    assert [(t.id, t.name, t.completed) for t in decoded] == [(t.id, t.name, t.completed) for t in tasks]
+
+@pytest.mark.parametrize('format_name', sorted(transfer.FORMATS))
+def test_empty(format_name: str):
+    codec = codec_for(Task)
+    text = ''.join(transfer.encode([], codec, format_name))
+
+    assert list(transfer.decode(lines(text), codec, format_name)) == []
+
+def test_encode_is_lazy():
+    def endless():
+        while True:
+            yield Task('Forever')
+
+    encoded = transfer.encode(endless(), codec_for(Task), 'ndjson', chunk_size=3)
+
+    assert next(encoded) == ''
+    assert next(encoded).count('\n') == 3
+
+def test_columnar_batches(tasks):
+    text = ''.join(transfer.encode(tasks, codec_for(Task), 'columnar', chunk_size=2))
+
+    assert len(lines(text)) == 4
+    assert '"schema": [{"name": "id", "type": "uuid"}' in text
+
+def test_columnar_requires_schema():
+    with pytest.raises(ValueError):
+        list(transfer.decode(['{"length": 0, "columns": []}\n'], codec_for(Task), 'columnar'))
+
+@pytest.mark.parametrize(('format_name', 'text'), [
+    ('ndjson', '[1, 2]\n'),
+    ('columnar', '{"schema": "id"}\n'),
+    ('columnar', '{"schema": [{"name": "id"}]}\n{"columns": 5}\n'),
+    ('columnar', '{"schema": [{"name": "id"}]}\n[]\n'),
+    ('columnar', '{"schema": [{"name": "id"}, {"name": "name"}]}\n{"columns": [["a"], ["b", "c"]]}\n'),
+])
+def test_decode_rejects_malformed_shapes(format_name: str, text: str):
+    with pytest.raises(ValueError):
+        list(transfer.decode(lines(text), codec_for(Task), format_name))
+
+@pytest.mark.parametrize(('format_name', 'text'), [
+    ('ndjson', '{"name": "Task", "extra": 1}\n'),
+    ('csv', 'name,extra\nTask,1\n'),
+    ('csv', 'name,name\nTask,Task\n'),
+    ('columnar', '{"schema": [{"name": "name"}, {"name": "extra"}]}\n'),
+    ('columnar', '{"schema": [{"name": "name"}, {"name": "name"}]}\n'),
+])
+def test_decode_rejects_unknown_columns(format_name: str, text: str):
+    with pytest.raises(ValueError):
+        list(transfer.decode(lines(text), codec_for(Task), format_name))
+
+def test_decoders_are_bounded_by_the_fields():
+    codec = codec_for(Task)
+    text = '{"name": "One", "completed": false}\n{"completed": true, "name": "Two"}\n'
+    list(transfer.decode(lines(text), codec, 'ndjson'))
+    cached = len(codec._decoders)
+
+    decoded = list(transfer.decode(lines(text), codec, 'ndjson'))
+
+    assert [(t.name, t.completed) for t in decoded] == [('One', False), ('Two', True)]
+    assert len(codec._decoders) == cached
+
+def test_csv_columns_in_any_order(tasks):
+    text = ''.join(f'{t.name},{t.id}\n' for t in tasks)
+
+    decoded = list(transfer.decode(lines('name,id\n' + text), codec_for(Task), 'csv'))
+
+    assert [(t.id, t.name) for t in decoded] == [(t.id, t.name) for t in tasks]
+
+def test_parallel_encoding_keeps_order(tasks):
+    codec = codec_for(Task)
+    serial = ''.join(transfer.encode(tasks, codec, 'csv', chunk_size=1))
+
+    assert ''.join(transfer.encode(tasks, codec, 'csv', chunk_size=1, workers=2)) == serial
+
+def test_decode_csv_repository_file(tmp_path, tasks):
+    filename = str(tmp_path / 'tasks.csv')
+    CsvRepository(filename, Task).add_many(tasks)
+
+    with open(filename, newline='') as f:
+        decoded = list(transfer.decode(f, codec_for(Task), 'csv'))
+
+    assert [(t.id, t.completed) for t in decoded] == [(t.id, t.completed) for t in tasks]
+
+def test_load_writes_a_batch_per_chunk(tasks):
+    repository = RecordingRepository()
+
+    assert transfer.load(repository, iter(tasks), chunk_size=2) == 5
+    assert repository.batches == [(2, 0), (2, 0), (1, 0)]
+    assert repository.get(tasks[4].id).name == 'Task 4'
+
+def test_load_replaces_stored_entities(tasks):
+    repository = RecordingRepository()
+    repository.add_many(tasks[:3])
+    incoming = [copy(task) for task in tasks + tasks[:1]]
+    incoming[1].name = 'Renamed'
+
+    assert transfer.load(repository, incoming, chunk_size=4) == 3
+    assert repository.batches == [(1, 1), (1, 0)]
+    assert repository.get(tasks[1].id).name == 'Renamed'
+
+@pytest.mark.parametrize('backend', [
+    lambda directory: CsvRepository(str(directory / 'tasks.csv'), Task),
+    lambda directory: CsvRepository(str(directory / 'tasks.csv'), Task, cached=True),
+    lambda directory: BinaryRepository(str(directory / 'tasks.bin'), Task),
+    lambda directory: LogRepository(str(directory / 'tasks.log'), Task),
+], ids=['csv', 'csv-cached', 'binary', 'log'])
+@pytest.mark.parametrize('format_name', sorted(transfer.FORMATS))
+def test_reimport_keeps_one_copy(tmp_path, tasks, backend, format_name: str):
+    codec = codec_for(Task)
+    repository = backend(tmp_path)
+    repository.add_many(tasks)
+    exported = ''.join(transfer.encode(repository.iter(), codec, format_name, chunk_size=2))
+    tasks[0].complete()
+    repository.update(tasks[0])
+
+    transfer.load(repository, transfer.decode(lines(exported), codec, format_name), chunk_size=2)
+    transfer.load(repository, transfer.decode(lines(exported), codec, format_name), chunk_size=2)
+
+    stored = sorted(repository.list(), key=lambda task: task.name)
+    assert [(t.id, t.completed) for t in stored] == [(t.id, t.completed and t is not tasks[0]) for t in tasks]
+    getattr(repository, 'close', lambda: None)()
@@ -0,0 +1,158 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from asyncio import run
+from uuid import uuid4
+
+import pytest
+from viking.domain.seedwork import AsyncUnitOfWork, UnitOfWork
+from viking.domain.task import Task
+from viking.fakes import FakeRepository
+from viking.infrastructure import AsyncRepository
+
+
+def make_tasks(count: int) -> list:
+    tasks = [Task(f'Task {number}') for number in range(count)]
+    for task in tasks:
+        task.id = uuid4()
+    return tasks
+
+class RecordingRepository(FakeRepository):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+        self.updates = []
+
+    def apply_changes(self, added, changed, removed):
+        self.batches.append((list(added), list(changed), list(removed)))
+        super().apply_changes(added, changed, removed)
+
+    def update_many(self, entities):
+        entities = list(entities)
+        self.updates.append(entities)
+        super().update_many(entities)
+
+@pytest.fixture
+def recording() -> RecordingRepository:
+    return RecordingRepository()
+
+def test_commit_writes_one_batch(recording: RecordingRepository):
+    kept, changed, dropped, created = make_tasks(4)
+    recording.add_many([kept, changed, dropped])
+
+    with UnitOfWork(recording) as unit_of_work:
+        unit_of_work.get(kept.id)
+        unit_of_work.get(changed.id).complete()
+        unit_of_work.register_removed(unit_of_work.get(dropped.id))
+        unit_of_work.register_new(created)
+
+    assert recording.batches == [([created], [changed], [dropped])]
+    assert recording.get(changed.id).completed
+    assert recording.get(dropped.id) is None
+    assert recording.get(created.id) == created
+
+def test_commit_without_changes_does_not_write(recording: RecordingRepository):
+    task = make_tasks(1)[0]
+    recording.add(task)
+
+    with UnitOfWork(recording) as unit_of_work:
+        unit_of_work.get(task.id)
+
+    assert recording.batches == []
+    assert recording.updates == []
+
+def test_rollback_on_error_restores_entities(recording: RecordingRepository):
+    task = make_tasks(1)[0]
+    recording.add(task)
+
+    with pytest.raises(RuntimeError):
+        with UnitOfWork(recording) as unit_of_work:
+            loaded = unit_of_work.get(task.id)
+            loaded.name = 'Renamed'
+            loaded.complete()
+            raise RuntimeError('abort')
+
+    assert recording.batches == []
+    assert recording.get(task.id).name == 'Task 0'
+    assert not recording.get(task.id).completed
+
+def test_failed_commit_rolls_back(repo: FakeRepository):
+    task = make_tasks(1)[0]
+    repo.add(task)
+
+    def fail(entities):
+        raise IOError('disk full')
+    repo.update_many = fail
+
+    unit_of_work = UnitOfWork(repo)
+    unit_of_work.get(task.id).name = 'Renamed'
+    with pytest.raises(IOError):
+        unit_of_work.commit()
+
+    assert task.name == 'Task 0'
+    assert unit_of_work.changes() == ([], [], [])
+
+def test_identity_map(repo: FakeRepository):
+    task = make_tasks(1)[0]
+    repo.add(task)
+    unit_of_work = UnitOfWork(repo)
+
+    assert unit_of_work.get(task.id) is unit_of_work.get_many([task.id])[0]
+
+def test_removed_entities_are_not_returned(repo: FakeRepository):
+    task = make_tasks(1)[0]
+    repo.add(task)
+    unit_of_work = UnitOfWork(repo)
+
+    unit_of_work.register_removed(task)
+
+    assert unit_of_work.get(task.id) is None
+
+def test_removing_a_new_entity_cancels_it(repo: FakeRepository):
+    task = make_tasks(1)[0]
+    unit_of_work = UnitOfWork(repo)
+
+    unit_of_work.register_new(task)
+    unit_of_work.register_removed(task)
+
+    assert unit_of_work.changes() == ([], [], [])
+
+def test_async_unit_of_work(recording: RecordingRepository):
+    task = make_tasks(1)[0]
+    recording.add(task)
+
+    async def scenario():
+        async with AsyncUnitOfWork(AsyncRepository(recording)) as unit_of_work:
+            (await unit_of_work.get(task.id)).name = 'Renamed'
+
+    run(scenario())
+
+    assert recording.updates == [[task]]
+    assert recording.get(task.id).name == 'Renamed'
+
+def test_changes_alone_are_updated_in_place(recording: RecordingRepository):
+    task = make_tasks(1)[0]
+    recording.add(task)
+
+    with UnitOfWork(recording) as unit_of_work:
+        unit_of_work.get(task.id).complete()
+
+    assert recording.batches == []
+    assert recording.updates == [[task]]
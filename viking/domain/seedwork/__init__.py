@@ -20,6 +20,27 @@
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 from viking.domain.seedwork.abstract_factory import AbstractFactory
 from viking.domain.seedwork.abstract_repository import AbstractRepository
+from viking.domain.seedwork.async_abstract_repository import \
+    AsyncAbstractRepository
 from viking.domain.seedwork.entity import Entity
+from viking.domain.seedwork.identity import (RandomIdAllocator,
+                                             TimeOrderedIdAllocator,
+                                             get_id_allocator, new_id,
+                                             set_id_allocator)
+from viking.domain.seedwork.slots import slotted
+from viking.domain.seedwork.unit_of_work import AsyncUnitOfWork, UnitOfWork
 
-__all__ = ['AbstractFactory', 'AbstractRepository', 'Entity']
+__all__ = [
+    'AbstractFactory',
+    'AbstractRepository',
+    'AsyncAbstractRepository',
+    'AsyncUnitOfWork',
+    'Entity',
+    'RandomIdAllocator',
+    'TimeOrderedIdAllocator',
+    'UnitOfWork',
+    'get_id_allocator',
+    'new_id',
+    'set_id_allocator',
+    'slotted',
+]
@@ -19,7 +19,8 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 from abc import ABC, abstractmethod
-from typing import List
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional
 
 from viking.domain.seedwork.entity import Entity
 
@@ -66,3 +67,157 @@ class AbstractRepository(ABC):
         Returns:
             list: The list of entities.
         """
+
+    def add_many(self, entities: Iterable[Entity]) -> None:
+        """
+        Add entities to the repository.
+
+        Repositories should override this with a single-pass write.
+
+        Args:
+            entities (Iterable[Entity]): The entities to add.
+        """
+        for entity in entities:
+            self.add(entity)
+
+    def get_many(self, references: Iterable) -> List[Entity]:
+        """
+        Get entities from the repository.
+
+        Args:
+            references (Iterable): The references of the entities to get.
+
+        Returns:
+            list: The entity for each reference, or None where it is missing.
+        """
+        return [self.get(reference) for reference in references]
+
+    def remove_many(self, entities: Iterable[Entity]) -> None:
+        """
+        Remove entities from the repository.
+
+        Repositories should override this with a single-pass write.
+
+        Args:
+            entities (Iterable[Entity]): The entities to remove.
+        """
+        for entity in entities:
+            self.remove(entity)
+
+    def apply_changes(
+        self,
+        added: Iterable[Entity],
+        changed: Iterable[Entity],
+        removed: Iterable[Entity],
+    ) -> None:
+        """
+        Write a batch of changes to the repository.
+
+        Repositories should override this with a single write that either
+        applies every change or none of them.
+
+        Args:
+            added (Iterable[Entity]): The entities to add.
+            changed (Iterable[Entity]): The stored entities to replace.
+            removed (Iterable[Entity]): The entities to remove.
+        """
+        self.remove_many(removed)
+        self.update_many(changed)
+        self.add_many(added)
+
+    def update(self, entity: Entity) -> None:
+        """
+        Replace a stored entity in place, adding it if it is not stored.
+
+        Args:
+            entity (Entity): The changed entity.
+        """
+        self.update_many([entity])
+
+    def update_many(self, entities: Iterable[Entity]) -> None:
+        """
+        Replace stored entities in place, adding the ones that are not stored.
+
+        Repositories should override this, as the default removes and re-adds
+        the entities.
+
+        Args:
+            entities (Iterable[Entity]): The changed entities.
+        """
+        entities = list(entities)
+        self.remove_many(entities)
+        self.add_many(entities)
+
+    def update_fields(self, reference, **changes) -> Optional[Entity]:
+        """
+        Change fields of a stored entity.
+
+        Args:
+            reference: The reference of the entity to change.
+            **changes: The new field values.
+
+        Returns:
+            Optional[Entity]: The changed entity, or None if it is not stored.
+        """
+        entity = self.get(reference)
+        if entity is None:
+            return None
+        for field, value in changes.items():
+            setattr(entity, field, value)
+        self.update(entity)
+        return entity
+
+    def iter(self) -> Iterator[Entity]:
+        """
+        Iterate over all entities in the repository.
+
+        Repositories should override this to yield entities as they are read
+        instead of building the whole list first.
+
+        Returns:
+            Iterator[Entity]: The entities.
+        """
+        return iter(self.list())
+
+    def slice(self, offset: int, limit: int) -> List[Entity]:
+        """
+        List a window of the entities in the repository.
+
+        Args:
+            offset (int): The number of entities to skip.
+            limit (int): The maximum number of entities to return.
+
+        Returns:
+            list: The entities in the window.
+        """
+        return list(islice(self.iter(), offset, offset + limit))
+
+    def find_by(self, **criteria) -> List[Entity]:
+        """
+        Find the entities whose attributes equal every criterion.
+
+        Repositories should override this to use an index where they have one.
+
+        Args:
+            **criteria: The attribute values to match.
+
+        Returns:
+            list: The matching entities.
+        """
+        return [
+            entity for entity in self.iter()
+            if all(getattr(entity, field, None) == value for field, value in criteria.items())
+        ]
+
+    def find_by_name(self, name: str) -> Optional[Entity]:
+        """
+        Find the first entity with a name.
+
+        Args:
+            name (str): The name to look up.
+
+        Returns:
+            Optional[Entity]: The entity, or None if no entity has the name.
+        """
+        found = self.find_by(name=name)
+        return found[0] if found else None
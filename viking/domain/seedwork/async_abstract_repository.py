@@ -0,0 +1,211 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Iterable, List, Optional
+
+from viking.domain.seedwork.entity import Entity
+
+
+class AsyncAbstractRepository(ABC):
+    """
+    Asynchronous counterpart of AbstractRepository for use on an event loop.
+    """
+    @abstractmethod
+    async def add(self, entity: Entity):
+        """
+        Add an entity to the repository.
+
+        Args:
+            entity (Entity): The entity to add.
+        """
+
+    @abstractmethod
+    async def get(self, reference) -> Entity:
+        """
+        Get an entity from the repository.
+
+        Args:
+            reference: The reference of the entity to get.
+
+        Returns:
+            Entity: The entity.
+        """
+
+    @abstractmethod
+    async def remove(self, entity: Entity) -> Entity:
+        """
+        Remove an entity from the repository.
+
+        Args:
+            entity (Entity): The entity to remove.
+
+        Returns:
+            Entity: The entity.
+        """
+
+    @abstractmethod
+    async def list(self) -> List[Entity]:
+        """
+        List all entities in the repository.
+
+        Returns:
+            list: The list of entities.
+        """
+
+    async def add_many(self, entities: Iterable[Entity]) -> None:
+        """
+        Add entities to the repository.
+
+        Args:
+            entities (Iterable[Entity]): The entities to add.
+        """
+        for entity in entities:
+            await self.add(entity)
+
+    async def get_many(self, references: Iterable) -> List[Entity]:
+        """
+        Get entities from the repository.
+
+        Args:
+            references (Iterable): The references of the entities to get.
+
+        Returns:
+            list: The entity for each reference, or None where it is missing.
+        """
+        return [await self.get(reference) for reference in references]
+
+    async def remove_many(self, entities: Iterable[Entity]) -> None:
+        """
+        Remove entities from the repository.
+
+        Args:
+            entities (Iterable[Entity]): The entities to remove.
+        """
+        for entity in entities:
+            await self.remove(entity)
+
+    async def apply_changes(
+        self,
+        added: Iterable[Entity],
+        changed: Iterable[Entity],
+        removed: Iterable[Entity],
+    ) -> None:
+        """
+        Write a batch of changes to the repository.
+
+        Args:
+            added (Iterable[Entity]): The entities to add.
+            changed (Iterable[Entity]): The stored entities to replace.
+            removed (Iterable[Entity]): The entities to remove.
+        """
+        await self.remove_many(removed)
+        await self.update_many(changed)
+        await self.add_many(added)
+
+    async def update(self, entity: Entity) -> None:
+        """
+        Replace a stored entity in place, adding it if it is not stored.
+
+        Args:
+            entity (Entity): The changed entity.
+        """
+        await self.update_many([entity])
+
+    async def update_many(self, entities: Iterable[Entity]) -> None:
+        """
+        Replace stored entities in place, adding the ones that are not stored.
+
+        Args:
+            entities (Iterable[Entity]): The changed entities.
+        """
+        entities = list(entities)
+        await self.remove_many(entities)
+        await self.add_many(entities)
+
+    async def update_fields(self, reference, **changes) -> Optional[Entity]:
+        """
+        Change fields of a stored entity.
+
+        Args:
+            reference: The reference of the entity to change.
+            **changes: The new field values.
+
+        Returns:
+            Optional[Entity]: The changed entity, or None if it is not stored.
+        """
+        entity = await self.get(reference)
+        if entity is None:
+            return None
+        for field, value in changes.items():
+            setattr(entity, field, value)
+        await self.update(entity)
+        return entity
+
+    async def iter(self) -> AsyncIterator[Entity]:
+        """
+        Iterate over all entities in the repository.
+
+        Returns:
+            AsyncIterator[Entity]: The entities.
+        """
+        for entity in await self.list():
+            yield entity
+
+    async def slice(self, offset: int, limit: int) -> List[Entity]:
+        """
+        List a window of the entities in the repository.
+
+        Args:
+            offset (int): The number of entities to skip.
+            limit (int): The maximum number of entities to return.
+
+        Returns:
+            list: The entities in the window.
+        """
+        return (await self.list())[offset:offset + limit]
+
+    async def find_by(self, **criteria) -> List[Entity]:
+        """
+        Find the entities whose attributes equal every criterion.
+
+        Args:
+            **criteria: The attribute values to match.
+
+        Returns:
+            list: The matching entities.
+        """
+        return [
+            entity for entity in await self.list()
+            if all(getattr(entity, field, None) == value for field, value in criteria.items())
+        ]
+
+    async def find_by_name(self, name: str) -> Optional[Entity]:
+        """
+        Find the first entity with a name.
+
+        Args:
+            name (str): The name to look up.
+
+        Returns:
+            Optional[Entity]: The entity, or None if no entity has the name.
+        """
+        found = await self.find_by(name=name)
+        return found[0] if found else None
@@ -18,15 +18,21 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict
-from uuid import UUID, uuid4
+from uuid import UUID
 
+from viking.domain.seedwork.identity import new_id
+from viking.domain.seedwork.slots import slotted
 
+
+@slotted
 @dataclass(unsafe_hash=True)
 class Entity:
     """
     Domain Model based on domain driven design.
+
+    Entities are equal, and hash alike, when their ids are equal.
     """
-    id: UUID = uuid4()
+    id: UUID = field(default_factory=new_id)
 
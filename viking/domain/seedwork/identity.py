@@ -0,0 +1,230 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+from threading import Lock
+from time import time_ns
+from typing import Callable, Iterator, List
+from uuid import UUID, SafeUUID
+from weakref import WeakSet
+
+IdAllocator = Callable[[], UUID]
+
+# Bits fixed by RFC 9562: the version nibble and the variant bits.
+VERSION_BITS = (0xF << 76) | (0x3 << 62)
+VARIANT = 0x2 << 62
+RANDOM_VERSION = (0x4 << 76) | VARIANT
+TIME_ORDERED_VERSION = (0x7 << 76) | VARIANT
+COUNTER_MAX = 0xFFF
+RANDOM_B_MASK = (1 << 62) - 1
+
+_new = object.__new__
+_set = object.__setattr__
+_UNKNOWN_SAFETY = SafeUUID.unknown
+_allocators: 'WeakSet[EntropyPool]' = WeakSet()
+
+
+def _uuid(value: int) -> UUID:
+    """
+    Build a UUID from its 128 bit value without re-validating it
+
+    Args:
+        value (int): The value, with its version and variant already set
+
+    Returns:
+        UUID: The UUID
+    """
+    uuid = _new(UUID)
+    _set(uuid, 'int', value)
+    _set(uuid, 'is_safe', _UNKNOWN_SAFETY)
+    return uuid
+
+
+class EntropyPool:
+    """
+    Random 64 bit words drawn from os.urandom in batches, so allocating an
+    id does not cost a system call.
+
+    A forked child discards the words and lock it inherited, so parent and
+    child never hand out the same words.
+    """
+    def __init__(self, batch: int = 512):
+        """
+        Constructor for the EntropyPool
+
+        Args:
+            batch (int): The number of words drawn at a time
+        """
+        self.batch = batch
+        self.lock = Lock()
+        self._words: List[int] = []
+        _allocators.add(self)
+
+    def word(self) -> int:
+        """
+        Take a random 64 bit word; callers must hold the lock
+
+        Returns:
+            int: The word
+        """
+        if not self._words:
+            data = os.urandom(self.batch * 8)
+            self._words = [int.from_bytes(data[at:at + 8], 'big') for at in range(0, len(data), 8)]
+        return self._words.pop()
+
+    def _after_fork(self) -> None:
+        """
+        Forget the inherited words and lock in a forked child
+        """
+        self.lock = Lock()
+        self._words = []
+
+
+class RandomIdAllocator(EntropyPool):
+    """
+    Allocates random version 4 UUIDs, building a batch of them from each
+    os.urandom call.
+    """
+    def __init__(self, batch: int = 256):
+        """
+        Constructor for the RandomIdAllocator
+
+        Args:
+            batch (int): The number of ids built at a time
+        """
+        super().__init__(batch)
+        self._ids: Iterator[UUID] = iter(())
+
+    def __call__(self) -> UUID:
+        """
+        Allocate an id
+
+        Returns:
+            UUID: A random UUID
+        """
+        for uuid in self._ids:
+            return uuid
+        with self.lock:
+            data = os.urandom(self.batch * 16)
+            self._ids = iter([
+                _uuid(int.from_bytes(data[at:at + 16], 'big') & ~VERSION_BITS | RANDOM_VERSION)
+                for at in range(0, len(data), 16)
+            ])
+        return self()
+
+    def _after_fork(self) -> None:
+        super()._after_fork()
+        self._ids = iter(())
+
+
+class TimeOrderedIdAllocator(EntropyPool):
+    """
+    Allocates time-ordered version 7 UUIDs.
+
+    The top 48 bits hold the Unix time in milliseconds and the next 12 bits
+    a counter, so ids allocated by one process sort in allocation order and
+    new rows land next to each other in ordered indexes. When the counter of
+    a millisecond runs out the timestamp is advanced, as RFC 9562 allows.
+    """
+    def __init__(self, batch: int = 512):
+        """
+        Constructor for the TimeOrderedIdAllocator
+
+        Args:
+            batch (int): The number of random words drawn at a time
+        """
+        super().__init__(batch)
+        self._millisecond = 0
+        self._counter = 0
+
+    def __call__(self) -> UUID:
+        """
+        Allocate an id
+
+        Returns:
+            UUID: A time-ordered UUID
+        """
+        with self.lock:
+            now = time_ns() // 1_000_000
+            random = self.word()
+            if now > self._millisecond:
+                # Start low in the counter range so a busy millisecond rarely overflows.
+                self._millisecond, self._counter = now, random >> 57
+            elif self._counter < COUNTER_MAX:
+                self._counter += 1
+            else:
+                self._millisecond, self._counter = self._millisecond + 1, 0
+            value = (self._millisecond << 80) | (self._counter << 64)
+        return _uuid(value | TIME_ORDERED_VERSION | (random & RANDOM_B_MASK))
+
+    def _after_fork(self) -> None:
+        super()._after_fork()
+        self._millisecond = 0
+        self._counter = 0
+
+
+def _reset_after_fork() -> None:
+    """
+    Reset every allocator in a forked child
+    """
+    for allocator in list(_allocators):
+        allocator._after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+_allocator: IdAllocator = TimeOrderedIdAllocator()
+
+
+def new_id() -> UUID:
+    """
+    Allocate an id for a new entity with the current allocator
+
+    Returns:
+        UUID: The id
+    """
+    return _allocator()
+
+
+def get_id_allocator() -> IdAllocator:
+    """
+    Get the allocator new entities take their ids from
+
+    Returns:
+        IdAllocator: The allocator
+    """
+    return _allocator
+
+
+def set_id_allocator(allocator: IdAllocator) -> IdAllocator:
+    """
+    Replace the allocator new entities take their ids from
+
+    Args:
+        allocator (IdAllocator): Any callable returning a new UUID, such as
+            RandomIdAllocator(), TimeOrderedIdAllocator() or uuid.uuid4
+
+    Returns:
+        IdAllocator: The allocator that was replaced
+    """
+    global _allocator
+    previous, _allocator = _allocator, allocator
+    return previous
@@ -0,0 +1,49 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from dataclasses import fields
+
+
+def slotted(cls: type) -> type:
+    """
+    Rebuild a dataclass with __slots__ for the fields it declares, so its
+    instances carry no __dict__.
+
+    Fields that are properties are left out, as are fields already slotted
+    by a base class. The class is rebuilt, so methods of it must not rely on
+    zero-argument super(), which would still refer to the original class.
+
+    Args:
+        cls (type): The dataclass to rebuild.
+
+    Returns:
+        type: The slotted class.
+    """
+    inherited = {name for base in cls.__mro__[1:] for name in getattr(base, '__slots__', ())}
+    names = tuple(
+        field.name for field in fields(cls)
+        if field.name not in inherited and not isinstance(cls.__dict__.get(field.name), property)
+    )
+
+    namespace = dict(cls.__dict__)
+    for name in (*names, '__dict__', '__weakref__'):
+        namespace.pop(name, None)
+    namespace['__slots__'] = names
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
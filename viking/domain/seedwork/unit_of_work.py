@@ -0,0 +1,291 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from dataclasses import fields
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from viking.domain.seedwork.abstract_repository import AbstractRepository
+from viking.domain.seedwork.async_abstract_repository import \
+    AsyncAbstractRepository
+from viking.domain.seedwork.entity import Entity
+
+Changes = Tuple[List[Entity], List[Entity], List[Entity]]
+
+
+def _state(entity: Entity) -> Dict[str, object]:
+    """
+    Capture the stored fields of an entity, skipping fields that are
+    properties over a private backing field.
+
+    Args:
+        entity (Entity): The entity to capture.
+
+    Returns:
+        dict: The value of each stored field.
+    """
+    return {
+        field.name: getattr(entity, field.name)
+        for field in fields(entity)
+        if not isinstance(getattr(type(entity), field.name, None), property)
+    }
+
+
+class BaseUnitOfWork:
+    """
+    Tracks the entities added, changed and removed during a business
+    transaction so they can be written back in one batch.
+
+    Entities loaded through the unit of work are snapshotted; any whose
+    fields differ from the snapshot at commit time are written as changed,
+    with an in-place update when nothing was added or removed.
+    """
+    def __init__(self):
+        """
+        Constructor for the BaseUnitOfWork
+        """
+        self._new: Dict[str, Entity] = {}
+        self._dirty: Dict[str, Entity] = {}
+        self._removed: Dict[str, Entity] = {}
+        self._clean: Dict[str, Tuple[Entity, Dict[str, object]]] = {}
+
+    def _track(self, entity: Optional[Entity]) -> Optional[Entity]:
+        """
+        Snapshot a loaded entity, or return the tracked copy of it.
+
+        Args:
+            entity (Optional[Entity]): The loaded entity.
+
+        Returns:
+            Optional[Entity]: The entity to hand to the caller.
+        """
+        if entity is None:
+            return None
+
+        key = str(entity.id)
+        if key in self._removed:
+            return None
+        for tracked in (self._new, self._dirty):
+            if key in tracked:
+                return tracked[key]
+        if key not in self._clean:
+            self._clean[key] = (entity, _state(entity))
+        return self._clean[key][0]
+
+    def register_new(self, entity: Entity) -> None:
+        """
+        Add an entity when the unit of work commits.
+
+        Args:
+            entity (Entity): The entity to add.
+        """
+        key = str(entity.id)
+        if self._removed.pop(key, None) is not None:
+            self._dirty[key] = entity
+        else:
+            self._new[key] = entity
+
+    def register_dirty(self, entity: Entity) -> None:
+        """
+        Replace a stored entity when the unit of work commits.
+
+        Entities loaded through the unit of work do not need registering.
+
+        Args:
+            entity (Entity): The changed entity.
+        """
+        key = str(entity.id)
+        if key not in self._new:
+            self._dirty[key] = entity
+
+    def register_removed(self, entity: Entity) -> None:
+        """
+        Remove an entity when the unit of work commits.
+
+        Args:
+            entity (Entity): The entity to remove.
+        """
+        key = str(entity.id)
+        if self._new.pop(key, None) is not None:
+            return
+        self._dirty.pop(key, None)
+        self._removed[key] = entity
+
+    def changes(self) -> Changes:
+        """
+        Collect the pending changes.
+
+        Returns:
+            Changes: The added, changed and removed entities.
+        """
+        dirty = dict(self._dirty)
+        for key, (entity, state) in self._clean.items():
+            if key not in dirty and key not in self._removed and _state(entity) != state:
+                dirty[key] = entity
+        return list(self._new.values()), list(dirty.values()), list(self._removed.values())
+
+    def rollback(self) -> None:
+        """
+        Discard the pending changes and restore the loaded entities to the
+        state they were loaded in.
+        """
+        for entity, state in self._clean.values():
+            for field, value in state.items():
+                setattr(entity, field, value)
+        self._forget()
+
+    def _forget(self) -> None:
+        """
+        Stop tracking every entity.
+        """
+        self._new, self._dirty, self._removed, self._clean = {}, {}, {}, {}
+
+
+class UnitOfWork(BaseUnitOfWork):
+    """
+    Unit of work over a repository.
+
+    Used as a context manager it commits when the block succeeds and rolls
+    back when it raises.
+    """
+    def __init__(self, repository: AbstractRepository):
+        """
+        Constructor for the UnitOfWork
+
+        Args:
+            repository (AbstractRepository): The repository to write to.
+        """
+        super().__init__()
+        self.repository = repository
+
+    def __enter__(self) -> 'UnitOfWork':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    def get(self, reference) -> Optional[Entity]:
+        """
+        Load an entity and track changes to it.
+
+        Args:
+            reference: The reference of the entity to get.
+
+        Returns:
+            Optional[Entity]: The entity, or None if it is missing.
+        """
+        return self._track(self.repository.get(reference))
+
+    def get_many(self, references: Iterable) -> List[Optional[Entity]]:
+        """
+        Load entities and track changes to them.
+
+        Args:
+            references (Iterable): The references of the entities to get.
+
+        Returns:
+            list: The entity for each reference, or None where it is missing.
+        """
+        return [self._track(entity) for entity in self.repository.get_many(references)]
+
+    def commit(self) -> None:
+        """
+        Write the pending changes to the repository in one batch, rolling
+        back if the write fails.
+        """
+        added, changed, removed = self.changes()
+        try:
+            if added or removed:
+                self.repository.apply_changes(added, changed, removed)
+            elif changed:
+                self.repository.update_many(changed)
+        except Exception:
+            self.rollback()
+            raise
+        self._forget()
+
+
+class AsyncUnitOfWork(BaseUnitOfWork):
+    """
+    Unit of work over an asynchronous repository.
+
+    Used as an async context manager it commits when the block succeeds and
+    rolls back when it raises.
+    """
+    def __init__(self, repository: AsyncAbstractRepository):
+        """
+        Constructor for the AsyncUnitOfWork
+
+        Args:
+            repository (AsyncAbstractRepository): The repository to write to.
+        """
+        super().__init__()
+        self.repository = repository
+
+    async def __aenter__(self) -> 'AsyncUnitOfWork':
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            await self.commit()
+        else:
+            self.rollback()
+
+    async def get(self, reference) -> Optional[Entity]:
+        """
+        Load an entity and track changes to it.
+
+        Args:
+            reference: The reference of the entity to get.
+
+        Returns:
+            Optional[Entity]: The entity, or None if it is missing.
+        """
+        return self._track(await self.repository.get(reference))
+
+    async def get_many(self, references: Iterable) -> List[Optional[Entity]]:
+        """
+        Load entities and track changes to them.
+
+        Args:
+            references (Iterable): The references of the entities to get.
+
+        Returns:
+            list: The entity for each reference, or None where it is missing.
+        """
+        return [self._track(entity) for entity in await self.repository.get_many(references)]
+
+    async def commit(self) -> None:
+        """
+        Write the pending changes to the repository in one batch, rolling
+        back if the write fails.
+        """
+        added, changed, removed = self.changes()
+        try:
+            if added or removed:
+                await self.repository.apply_changes(added, changed, removed)
+            elif changed:
+                await self.repository.update_many(changed)
+        except Exception:
+            self.rollback()
+            raise
+        self._forget()
@@ -22,9 +22,11 @@ from dataclasses import dataclass, field
 from typing import Dict
 
 from viking.domain.seedwork.entity import Entity
+from viking.domain.seedwork.slots import slotted
 
 
-@dataclass
+@slotted
+@dataclass(eq=False)
 class Task(Entity):
     """
     State of unit of work.
@@ -64,7 +66,9 @@ class Task(Entity):
         Args:
             name (str): The short description of the task.
         """
+        Entity.__init__(self)
         self.name = name
+        self._completed = False
 
     def complete(self) -> "Task":
         """
@@ -18,7 +18,8 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
-from typing import Dict, List
+from itertools import islice
+from typing import Dict, Iterable, List
 from uuid import UUID
 
 from viking.domain.seedwork.abstract_repository import AbstractRepository
@@ -30,6 +31,8 @@ class FakeRepository(AbstractRepository):
     Fake repository for testing purposes.
     """
     _entities: Dict[UUID, Entity]
+    _names: Dict[str, Dict[UUID, Entity]]
+    _indexed_names: Dict[UUID, str]
     
     def __init__(self, entities: Dict[UUID, Entity] = None):
         """
@@ -41,6 +44,37 @@ class FakeRepository(AbstractRepository):
         if entities is None:
             entities = dict()
         self._entities = entities
+        self._names = dict()
+        self._indexed_names = dict()
+        for entity in entities.values():
+            self._index(entity)
+
+    def _index(self, entity: Entity):
+        """
+        Index an entity by its current name, dropping the name it was indexed under.
+
+        Args:
+            entity (Entity): The entity to index.
+        """
+        self._unindex(entity.id)
+        name = getattr(entity, 'name', None)
+        self._names.setdefault(name, dict())[entity.id] = entity
+        self._indexed_names[entity.id] = name
+
+    def _unindex(self, reference: UUID):
+        """
+        Drop an entity from the name index.
+
+        Args:
+            reference (UUID): The reference of the entity to drop.
+        """
+        if reference not in self._indexed_names:
+            return
+        name = self._indexed_names.pop(reference)
+        named = self._names[name]
+        del named[reference]
+        if not named:
+            del self._names[name]
 
     def add(self, entity: Entity):
         """
@@ -50,6 +84,7 @@ class FakeRepository(AbstractRepository):
             entity (Entity): The entity to add.
         """
         self._entities[entity.id] = entity
+        self._index(entity)
 
     def get(self, reference: UUID) -> Entity:
         """
@@ -73,7 +108,9 @@ class FakeRepository(AbstractRepository):
         Returns:
             Entity: The entity.
         """
-        return self._entities.pop(entity.id)
+        removed = self._entities.pop(entity.id)
+        self._unindex(entity.id)
+        return removed
 
     def list(self) -> List[Entity]:
         """
@@ -84,6 +121,79 @@ class FakeRepository(AbstractRepository):
         """
         return list(self._entities.values())
 
+    def slice(self, offset: int, limit: int) -> List[Entity]:
+        """
+        List a window of the entities in the repository.
+
+        Args:
+            offset (int): The number of entities to skip.
+            limit (int): The maximum number of entities to return.
+
+        Returns:
+            list: The entities in the window.
+        """
+        return list(islice(self._entities.values(), offset, offset + limit))
+
+    def add_many(self, entities: Iterable[Entity]) -> None:
+        """
+        Add entities to the repository.
+
+        Args:
+            entities (Iterable[Entity]): The entities to add.
+        """
+        for entity in entities:
+            self.add(entity)
+
+    def update_many(self, entities: Iterable[Entity]) -> None:
+        """
+        Replace stored entities in place, adding the ones that are not stored.
+
+        Args:
+            entities (Iterable[Entity]): The changed entities.
+        """
+        self.add_many(entities)
+
+    def get_many(self, references: Iterable[UUID]) -> List[Entity]:
+        """
+        Get entities from the repository.
+
+        Args:
+            references (Iterable[UUID]): The references of the entities to get.
+
+        Returns:
+            list: The entity for each reference, or None where it is missing.
+        """
+        return [self._entities.get(reference) for reference in references]
+
+    def remove_many(self, entities: Iterable[Entity]) -> None:
+        """
+        Remove entities from the repository, ignoring missing ones.
+
+        Args:
+            entities (Iterable[Entity]): The entities to remove.
+        """
+        for entity in entities:
+            self._entities.pop(entity.id, None)
+            self._unindex(entity.id)
+
+    def find_by(self, **criteria) -> List[Entity]:
+        """
+        Find the entities whose attributes equal every criterion, using the
+        name index when a name is given.
+
+        Args:
+            **criteria: The attribute values to match.
+
+        Returns:
+            list: The matching entities.
+        """
+        if 'name' not in criteria:
+            return super().find_by(**criteria)
+        return [
+            entity for entity in self._names.get(criteria['name'], dict()).values()
+            if all(getattr(entity, field, None) == value for field, value in criteria.items())
+        ]
+
     @property
     def count(self) -> int:
         """
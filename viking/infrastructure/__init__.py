@@ -18,8 +18,33 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
-from viking.infrastructure.alchemy_repository import AlchemyRepository
-from viking.infrastructure.csv_repository import CsvRepository
-from viking.infrastructure.repository_factory import RepositoryFactory
+from importlib import import_module
+from typing import List
 
-__all__ = ['AlchemyRepository', 'CsvRepository', 'RepositoryFactory']
+# Backends are imported on first use, so a command using one backend never
+# pays for the import graph of another, such as SQLAlchemy.
+_EXPORTS = {
+    'AlchemyRepository': 'viking.infrastructure.alchemy_repository',
+    'AsyncRepository': 'viking.infrastructure.async_repository',
+    'BinaryRepository': 'viking.infrastructure.binary_repository',
+    'CsvRepository': 'viking.infrastructure.csv_repository',
+    'InstrumentedRepository': 'viking.infrastructure.instrumented_repository',
+    'LogRepository': 'viking.infrastructure.log_repository',
+    'MetricsRegistry': 'viking.infrastructure.metrics',
+    'MetricsSink': 'viking.infrastructure.metrics',
+    'RepositoryFactory': 'viking.infrastructure.repository_factory',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
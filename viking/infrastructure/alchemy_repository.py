@@ -18,29 +18,371 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
-from typing import List
+from dataclasses import fields
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import (CHAR, Boolean, Column, Float, Integer, MetaData,
+                        String, Table, create_engine, delete, insert, select,
+                        update)
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.types import TypeDecorator
 from viking.domain.seedwork.abstract_repository import AbstractRepository
 from viking.domain.seedwork.entity import Entity
+from viking.infrastructure.codec import codec_for
+
+# Bounds the bound parameters of one statement below SQLite's oldest limit.
+MAX_PARAMETERS = 999
+INDEXED_FIELDS = {'name'}
+# Sizing options of a QueuePool, which SQLite's NullPool and StaticPool reject.
+QUEUE_POOL_OPTIONS = ('pool_size', 'max_overflow')
+
+metadata = MetaData()
+_tables: Dict[type, Table] = {}
+_engines: Dict[Tuple[str, str], Engine] = {}
+
+
+class GUID(TypeDecorator):
+    """
+    UUID stored as 32 hexadecimal characters on every database.
+    """
+    impl = CHAR(32)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else UUID(str(value)).hex
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else UUID(value)
+
+
+COLUMN_TYPES = {UUID: GUID, str: String, bool: Boolean, int: Integer, float: Float}
+
+
+def entity_table(entity_type: type) -> Table:
+    """
+    Get the table mapping the public dataclass fields of an entity type
+
+    Args:
+        entity_type (type): The type of entity to map
+
+    Returns:
+        Table: The table, keyed by the id of the entity
+    """
+    if entity_type not in _tables:
+        columns = [
+            Column(f.name, COLUMN_TYPES[f.type], primary_key=f.name == 'id', index=f.name in INDEXED_FIELDS)
+            for f in fields(entity_type) if not f.name.startswith('_')
+        ]
+        _tables[entity_type] = Table(f'{entity_type.__name__.lower()}s', metadata, *columns)
+    return _tables[entity_type]
+
+
+def engine_from_url(url: str, **options) -> Engine:
+    """
+    Get the shared engine for a database URL and options, creating it on
+    first use
+
+    Args:
+        url (str): The database URL
+        **options: Overrides of the engine and pool options; pool sizing is
+            ignored on SQLite, whose connections are not queued
+
+    Returns:
+        Engine: The engine and its connection pool
+    """
+    key = (url, repr(sorted(options.items())))
+    if key not in _engines:
+        if url.startswith('sqlite'):
+            for name in QUEUE_POOL_OPTIONS:
+                options.pop(name, None)
+            options.setdefault('connect_args', {'check_same_thread': False})
+            if url in ('sqlite://', 'sqlite:///:memory:'):
+                options.setdefault('poolclass', StaticPool)
+        else:
+            options.setdefault('pool_size', 10)
+            options.setdefault('max_overflow', 20)
+            options.setdefault('pool_pre_ping', True)
+            options.setdefault('pool_recycle', 1800)
+        _engines[key] = create_engine(url, future=True, **options)
+    return _engines[key]
+
+
+def session_factory(url: str, **options) -> sessionmaker:
+    """
+    Get a session factory bound to the shared engine of a database URL
+
+    Args:
+        url (str): The database URL
+        **options: Overrides of the engine and pool options
+
+    Returns:
+        sessionmaker: The session factory
+    """
+    return sessionmaker(bind=engine_from_url(url, **options), future=True)
 
 
 class AlchemyRepository(AbstractRepository):
-    def __init__(self, session):
+    def __init__(self, session, entity_type: type = Entity, autocommit: bool = False):
         """
         Constructor for the AlchemyRepository
 
         Args:
             session (Session): SQLAlchemy session
-        """        
+            entity_type (type): The type of entity stored in the repository
+            autocommit (bool): Commit the session after every write instead
+                of leaving it to the owner of the session
+        """
         self.session = session
+        self.type = entity_type
+        self.table = entity_table(entity_type)
+        self.codec = codec_for(entity_type)
+        self.autocommit = autocommit
+        self._table_ready = False
+
+    def _execute(self, statement, parameters=None):
+        """
+        Execute a statement, creating the table first if needed
+
+        Args:
+            statement: The statement to execute
+            parameters: The parameters for an executemany
+
+        Returns:
+            Result: The result of the statement
+        """
+        if not self._table_ready:
+            self.table.create(bind=self.session.connection(), checkfirst=True)
+            self._table_ready = True
+        return self.session.execute(statement, parameters)
+
+    def _commit(self) -> None:
+        """
+        Commit the session when the repository owns it
+        """
+        if self.autocommit:
+            self.session.commit()
+
+    def _key(self, reference) -> Optional[UUID]:
+        """
+        Convert a reference into an id
+
+        Args:
+            reference: The reference of the entity
+
+        Returns:
+            Optional[UUID]: The id, or None if the reference is not an id
+        """
+        try:
+            return UUID(str(reference))
+        except ValueError:
+            return None
+
+    def _to_row(self, entity: Entity) -> dict:
+        """
+        Convert an entity into the values of its row
+
+        Args:
+            entity (Entity): The entity to convert
+
+        Returns:
+            dict: The column values
+        """
+        return self.codec.to_dict(entity)
+
+    def _to_entity(self, row) -> Entity:
+        """
+        Convert a row into an entity
+
+        Args:
+            row (Row): The row to convert
+
+        Returns:
+            Entity: The entity
+        """
+        return self.codec.from_dict(row._mapping)
+
+    def _chunks(self, items: List, width: int) -> Iterable[List]:
+        """
+        Split items so a statement binds at most MAX_PARAMETERS values
+
+        Args:
+            items (List): The items to split
+            width (int): The number of parameters bound per item
+
+        Returns:
+            Iterable[List]: The chunks of items
+        """
+        size = max(1, MAX_PARAMETERS // width)
+        for start in range(0, len(items), size):
+            yield items[start:start + size]
+
+    def _upsert(self, entity: Entity) -> None:
+        """
+        Update the row of an entity, inserting it if it is not stored
+
+        Args:
+            entity (Entity): The entity to store
+        """
+        row = self._to_row(entity)
+        result = self._execute(update(self.table).where(self.table.c.id == entity.id).values(**row))
+        if result.rowcount == 0:
+            self._execute(insert(self.table).values(**row))
 
     def add(self, entity: Entity) -> None:
-        return self.session.add(entity)
+        self._upsert(entity)
+        self._commit()
+
+    def update_many(self, entities: Iterable[Entity]) -> None:
+        """
+        Update the row of each entity in place, inserting the ones that are
+        not stored
+
+        Args:
+            entities (Iterable[Entity]): The changed entities
+        """
+        for entity in entities:
+            self._upsert(entity)
+        self._commit()
+
+    def update_fields(self, reference, **changes) -> Optional[Entity]:
+        """
+        Change columns of a stored entity with a single UPDATE
+
+        Args:
+            reference: The reference of the entity to change
+            **changes: The new column values
+
+        Returns:
+            Optional[Entity]: The changed entity, or None if it is not stored
+        """
+        if not set(changes) <= set(self.table.columns.keys()):
+            return super().update_fields(reference, **changes)
+
+        key = self._key(reference)
+        if key is None or not changes:
+            return None if key is None else self.get(key)
+        result = self._execute(update(self.table).where(self.table.c.id == key).values(**changes))
+        self._commit()
+        return self.get(key) if result.rowcount else None
 
     def get(self, reference) -> Entity:
-        return self.session.query(Entity).get(reference)
+        key = self._key(reference)
+        if key is None:
+            return None
+        row = self._execute(select(self.table).where(self.table.c.id == key)).first()
+        return None if row is None else self._to_entity(row)
 
     def remove(self, entity: Entity) -> Entity:
-        return self.session.delete(entity)
+        result = self._execute(delete(self.table).where(self.table.c.id == entity.id))
+        self._commit()
+        return entity if result.rowcount else None
 
     def list(self) -> List[Entity]:
-        return self.session.query(Entity).all()
\ No newline at end of file
+        return [self._to_entity(row) for row in self._execute(select(self.table).order_by(self.table.c.id))]
+
+    def iter(self) -> Iterator[Entity]:
+        statement = select(self.table).order_by(self.table.c.id).execution_options(stream_results=True)
+        for row in self._execute(statement):
+            yield self._to_entity(row)
+
+    def slice(self, offset: int, limit: int) -> List[Entity]:
+        statement = select(self.table).order_by(self.table.c.id).offset(offset).limit(limit)
+        return [self._to_entity(row) for row in self._execute(statement)]
+
+    def find_by(self, **criteria) -> List[Entity]:
+        if not set(criteria) <= set(self.table.columns.keys()):
+            return super().find_by(**criteria)
+
+        conditions = [self.table.c[field] == value for field, value in criteria.items()]
+        statement = select(self.table).where(*conditions).order_by(self.table.c.id)
+        return [self._to_entity(row) for row in self._execute(statement)]
+
+    def find_by_name(self, name: str) -> Optional[Entity]:
+        if 'name' not in self.table.columns:
+            return super().find_by_name(name)
+
+        statement = select(self.table).where(self.table.c.name == name).order_by(self.table.c.id).limit(1)
+        row = self._execute(statement).first()
+        return None if row is None else self._to_entity(row)
+
+    def add_many(self, entities: Iterable[Entity]) -> None:
+        """
+        Add entities with one multi-row INSERT per chunk, replacing any
+        stored entities with the same ids
+
+        Args:
+            entities (Iterable[Entity]): The entities to add
+        """
+        rows = list({str(e.id): self._to_row(e) for e in entities}.values())
+        for chunk in self._chunks([row['id'] for row in rows], 1):
+            self._execute(delete(self.table).where(self.table.c.id.in_(chunk)))
+        for chunk in self._chunks(rows, len(self.table.columns)):
+            self._execute(insert(self.table).values(chunk))
+        self._commit()
+
+    def get_many(self, references: Iterable) -> List[Entity]:
+        """
+        Get entities with one SELECT ... WHERE id IN (...) per chunk
+
+        Args:
+            references (Iterable): The references of the entities to get
+
+        Returns:
+            List[Entity]: The entity for each reference, or None where it is
+                missing
+        """
+        keys = [self._key(reference) for reference in references]
+        found = {}
+        for chunk in self._chunks([key for key in keys if key is not None], 1):
+            for row in self._execute(select(self.table).where(self.table.c.id.in_(chunk))):
+                entity = self._to_entity(row)
+                found[entity.id] = entity
+        return [found.get(key) for key in keys]
+
+    def remove_many(self, entities: Iterable[Entity]) -> None:
+        """
+        Remove entities with one DELETE ... WHERE id IN (...) per chunk
+
+        Args:
+            entities (Iterable[Entity]): The entities to remove
+        """
+        for chunk in self._chunks([e.id for e in entities], 1):
+            self._execute(delete(self.table).where(self.table.c.id.in_(chunk)))
+        self._commit()
+
+    def apply_changes(
+        self,
+        added: Iterable[Entity],
+        changed: Iterable[Entity],
+        removed: Iterable[Entity],
+    ) -> None:
+        """
+        Write a batch of changes in one transaction, rolling it back if any
+        statement fails
+
+        Args:
+            added (Iterable[Entity]): The entities to add
+            changed (Iterable[Entity]): The stored entities to replace
+            removed (Iterable[Entity]): The entities to remove
+        """
+        autocommit, self.autocommit = self.autocommit, False
+        try:
+            self.remove_many(removed)
+            self.update_many(changed)
+            self.add_many(added)
+        except Exception:
+            if autocommit:
+                self.session.rollback()
+            raise
+        finally:
+            self.autocommit = autocommit
+        self._commit()
+
+    def close(self) -> None:
+        """
+        Close the session and return its connection to the pool
+        """
+        self.session.close()
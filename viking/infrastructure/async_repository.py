@@ -0,0 +1,121 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from asyncio import get_running_loop
+from concurrent.futures import Executor
+from contextvars import copy_context
+from functools import partial
+from itertools import islice
+from typing import AsyncIterator, Iterable, List, Optional
+
+from viking.domain.seedwork.abstract_repository import AbstractRepository
+from viking.domain.seedwork.async_abstract_repository import \
+    AsyncAbstractRepository
+from viking.domain.seedwork.entity import Entity
+
+
+class AsyncRepository(AsyncAbstractRepository):
+    """
+    Runs a synchronous repository on an executor so its I/O never blocks the
+    event loop.
+    """
+    ITER_CHUNK_SIZE = 500
+
+    def __init__(self, repository: AbstractRepository, executor: Optional[Executor] = None):
+        """
+        Constructor for the AsyncRepository
+
+        Args:
+            repository (AbstractRepository): The repository to run
+            executor (Optional[Executor]): The executor to run calls on, or
+                None for the default executor of the running loop
+        """
+        self.repository = repository
+        self.executor = executor
+
+    async def _run(self, function, *args):
+        """
+        Run a blocking call on the executor, keeping the current context
+
+        Args:
+            function: The blocking callable
+            *args: The arguments for the callable
+
+        Returns:
+            The result of the call
+        """
+        call = partial(copy_context().run, function, *args)
+        return await get_running_loop().run_in_executor(self.executor, call)
+
+    async def add(self, entity: Entity) -> None:
+        return await self._run(self.repository.add, entity)
+
+    async def get(self, reference) -> Entity:
+        return await self._run(self.repository.get, reference)
+
+    async def remove(self, entity: Entity) -> Entity:
+        return await self._run(self.repository.remove, entity)
+
+    async def list(self) -> List[Entity]:
+        return await self._run(self.repository.list)
+
+    async def add_many(self, entities: Iterable[Entity]) -> None:
+        return await self._run(self.repository.add_many, list(entities))
+
+    async def get_many(self, references: Iterable) -> List[Entity]:
+        return await self._run(self.repository.get_many, list(references))
+
+    async def remove_many(self, entities: Iterable[Entity]) -> None:
+        return await self._run(self.repository.remove_many, list(entities))
+
+    async def apply_changes(
+        self,
+        added: Iterable[Entity],
+        changed: Iterable[Entity],
+        removed: Iterable[Entity],
+    ) -> None:
+        return await self._run(self.repository.apply_changes, list(added), list(changed), list(removed))
+
+    async def update(self, entity: Entity) -> None:
+        return await self._run(self.repository.update, entity)
+
+    async def update_many(self, entities: Iterable[Entity]) -> None:
+        return await self._run(self.repository.update_many, list(entities))
+
+    async def update_fields(self, reference, **changes) -> Optional[Entity]:
+        return await self._run(partial(self.repository.update_fields, reference, **changes))
+
+    async def iter(self) -> AsyncIterator[Entity]:
+        entities = await self._run(self.repository.iter)
+        while True:
+            chunk = await self._run(lambda: list(islice(entities, self.ITER_CHUNK_SIZE)))
+            if not chunk:
+                return
+            for entity in chunk:
+                yield entity
+
+    async def slice(self, offset: int, limit: int) -> List[Entity]:
+        return await self._run(self.repository.slice, offset, limit)
+
+    async def find_by(self, **criteria) -> List[Entity]:
+        return await self._run(partial(self.repository.find_by, **criteria))
+
+    async def find_by_name(self, name: str) -> Optional[Entity]:
+        return await self._run(self.repository.find_by_name, name)
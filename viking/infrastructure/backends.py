@@ -0,0 +1,235 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from configparser import ConfigParser, Error
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from viking.domain.seedwork.abstract_repository import AbstractRepository
+
+ENTRY_POINT_GROUP = 'hungry_task.repositories'
+SECTION_PREFIX = 'repository:'
+TRUE_STRINGS = frozenset(('1', 'true', 'yes', 'on'))
+FALSE_STRINGS = frozenset(('0', 'false', 'no', 'off'))
+
+Config = Dict[str, Dict[str, str]]
+
+
+@dataclass(frozen=True)
+class Option:
+    """
+    A setting a backend accepts, with its type and default.
+    """
+    name: str
+    type: type = str
+    default: object = None
+    help: str = ''
+
+    def parse(self, value: object) -> object:
+        """
+        Convert a setting, such as a string from a config file, to the type
+        of the option
+
+        Args:
+            value (object): The setting
+
+        Raises:
+            ValueError: The setting is not a valid value of the type
+
+        Returns:
+            object: The converted setting
+        """
+        if not isinstance(value, str) or self.type is str:
+            return value
+        if self.type is bool:
+            lowered = value.strip().lower()
+            if lowered in TRUE_STRINGS or lowered in FALSE_STRINGS:
+                return lowered in TRUE_STRINGS
+            raise ValueError(f'{self.name} must be a boolean, not {value!r}')
+        try:
+            return self.type(value)
+        except ValueError:
+            raise ValueError(f'{self.name} must be a {self.type.__name__}, not {value!r}') from None
+
+
+@dataclass(frozen=True)
+class Backend:
+    """
+    A storage backend: its name, a function building a repository from an
+    entity type and its options, and the schema of those options.
+    """
+    name: str
+    build: Callable[..., AbstractRepository]
+    options: Tuple[Option, ...] = ()
+    pooled: bool = True
+
+    def configure(self, settings: Mapping[str, object]) -> Dict[str, object]:
+        """
+        Validate settings against the schema and fill in the defaults
+
+        Args:
+            settings (Mapping[str, object]): The settings of a repository
+
+        Raises:
+            ValueError: A setting is unknown or invalid
+
+        Returns:
+            Dict[str, object]: The value of every option
+        """
+        known = {option.name: option for option in self.options}
+        unknown = sorted(set(settings) - set(known))
+        if unknown:
+            raise ValueError(f"Backend {self.name} has no option {', '.join(unknown)}")
+        return {
+            name: option.parse(settings[name]) if name in settings else option.default
+            for name, option in known.items()
+        }
+
+    def create(self, entity_type: type, settings: Mapping[str, object]) -> AbstractRepository:
+        """
+        Build a repository from validated settings
+
+        Args:
+            entity_type (type): The type of entity to store
+            settings (Mapping[str, object]): The settings of the repository
+
+        Returns:
+            AbstractRepository: The repository
+        """
+        return self.build(entity_type, **self.configure(settings))
+
+
+class BackendRegistry:
+    """
+    The backends repositories can be created with, by name.
+
+    Backends installed as plugins are found through the hungry_task.repositories
+    entry point group, each naming a Backend, the first time a name is not
+    registered already.
+    """
+    def __init__(self, group: str = ENTRY_POINT_GROUP):
+        """
+        Constructor for the BackendRegistry
+
+        Args:
+            group (str): The entry point group plugins register in
+        """
+        self.group = group
+        self._backends: Dict[str, Backend] = {}
+        self._plugins_loaded = False
+
+    def register(self, backend: Backend, *aliases: str) -> Backend:
+        """
+        Register a backend under its name and any aliases
+
+        Args:
+            backend (Backend): The backend
+            *aliases (str): Other names it is created by
+
+        Returns:
+            Backend: The backend
+        """
+        for name in (backend.name,) + aliases:
+            self._backends[name] = backend
+        return backend
+
+    def get(self, name: str) -> Optional[Backend]:
+        """
+        Get a backend by name, loading plugins if it is not registered
+
+        Args:
+            name (str): The name of the backend
+
+        Returns:
+            Optional[Backend]: The backend, or None if nothing provides it
+        """
+        if name not in self._backends:
+            self.load_plugins()
+        return self._backends.get(name)
+
+    def names(self) -> List[str]:
+        """
+        Get the names of every backend, including plugins
+
+        Returns:
+            List[str]: The names, sorted
+        """
+        self.load_plugins()
+        return sorted(self._backends)
+
+    def load_plugins(self) -> None:
+        """
+        Register the backends of installed plugins, once
+        """
+        if self._plugins_loaded:
+            return
+        self._plugins_loaded = True
+        for entry_point in _entry_points(self.group):
+            if entry_point.name not in self._backends:
+                self.register(entry_point.load(), entry_point.name)
+
+
+def _entry_points(group: str) -> Iterable:
+    """
+    Get the entry points of a group on every supported Python version
+
+    Args:
+        group (str): The group
+
+    Returns:
+        Iterable: The entry points
+    """
+    from importlib.metadata import entry_points
+    found = entry_points()
+    if hasattr(found, 'select'):
+        return found.select(group=group)
+    return found.get(group, ())
+
+
+def load_config(filename: str) -> Config:
+    """
+    Read the repositories configured in an INI file.
+
+    Each [repository:<name>] section configures the repository created by
+    that name; its backend key picks the backend, defaulting to the name,
+    and every other key is an option of the backend.
+
+    Args:
+        filename (str): The INI file
+
+    Raises:
+        ValueError: The file is not valid INI
+
+    Returns:
+        Config: The settings of each repository, by name
+    """
+    parser = ConfigParser(interpolation=None)
+    with open(filename, encoding='UTF8') as f:
+        try:
+            parser.read_file(f)
+        except Error as error:
+            raise ValueError(f'{filename}: {error}') from None
+    return {
+        section[len(SECTION_PREFIX):]: dict(parser.items(section))
+        for section in parser.sections() if section.startswith(SECTION_PREFIX)
+    }
+
+
+registry = BackendRegistry()
@@ -0,0 +1,621 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import mmap
+from bisect import bisect_left
+from functools import wraps
+from os import stat
+from struct import Struct
+from threading import RLock
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from viking.domain.seedwork.abstract_repository import AbstractRepository
+from viking.domain.seedwork.entity import Entity
+from viking.infrastructure.codec import codec_for
+from viking.infrastructure.file_io import IOStats, atomic_write, sync_file
+from viking.infrastructure.file_lock import FileLock
+
+HEADER = Struct('<4sHHQQ')
+MAGIC = b'VKTB'
+VERSION = 1
+ID_SIZE = 16
+OFFSET = Struct('<Q')
+
+Columns = Tuple[List[bytes], List[bool], List[bytes]]
+
+
+def _synchronized(method: Callable) -> Callable:
+    """
+    Run a method holding the in-process lock of its repository
+
+    Args:
+        method (Callable): The method
+
+    Returns:
+        Callable: The method, serialized with every other synchronized call
+    """
+    @wraps(method)
+    def synchronized(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return synchronized
+
+
+class BinaryRepository(AbstractRepository):
+    """
+    Columnar binary repository for tasks, read through mmap.
+
+    The file is a header followed by three columns: the 16 byte ids, a bitset
+    of completed flags and an offset-indexed heap of UTF-8 names. Counts and
+    id lookups read the mapped columns directly instead of building tasks.
+    Every mutation rewrites the file, so the format suits large stores that
+    are read far more often than they are written.
+
+    Writers from any process take an exclusive lock around the read, modify
+    and rewrite. A rewrite replaces the file atomically, so readers in other
+    processes need no lock and keep their old mapping until they remap.
+    Completing tasks is the exception: only the completed bits change, and
+    they are written into the file in place, so a reader in another process
+    can see a flag flip between two reads of the same row.
+
+    Within a process, every call holds a lock, so no thread remaps or
+    unmaps the file while another is reading it. iter and ids take the
+    lock for one chunk of rows at a time.
+    """
+    ITER_CHUNK_SIZE = 1024
+
+    def __init__(self, filename: str, entity_type: type):
+        """
+        Initialize the binary repository
+
+        Args:
+            filename (str): The filename to use for the binary repository
+            entity_type (type): The type of entity, which must have a name
+                and a completed flag
+        """
+        self.filename = filename
+        self.type = entity_type
+        self.file_lock = FileLock(filename)
+        self.io = IOStats()
+        self._decode = codec_for(entity_type).decoder(('id', 'name', 'completed'), text=False)
+        self._map: Optional[mmap.mmap] = None
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._count = 0
+        self._offsets: Optional[Tuple[int, ...]] = None
+        self._lock = RLock()
+
+    def _file_signature(self) -> Optional[Tuple[int, int, int]]:
+        """
+        Get the signature used to detect a replaced file
+
+        Returns:
+            Optional[Tuple[int, int, int]]: The inode, mtime and size of the
+                file, or None if it does not exist
+        """
+        try:
+            stats = stat(self.filename)
+        except FileNotFoundError:
+            return None
+        return (stats.st_ino, stats.st_mtime_ns, stats.st_size)
+
+    def _mapped(self) -> Optional[mmap.mmap]:
+        """
+        Get the mapping of the file, remapping it if the file was replaced
+
+        Raises:
+            ValueError: The file is not a binary task store
+
+        Returns:
+            Optional[mmap.mmap]: The mapping, or None if the store is empty
+        """
+        signature = self._file_signature()
+        if signature == self._signature:
+            return self._map
+
+        self.close()
+        self._signature = signature
+        if signature is None or signature[2] == 0:
+            return None
+
+        with open(self.filename, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.io.opens += 1
+        self.io.bytes_read += len(self._map)
+        magic, version, _, self._count, _ = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f'{self.filename} is not a binary task store')
+        return self._map
+
+    def _layout(self, count: int) -> Tuple[int, int, int, int]:
+        """
+        Get the offsets of each section for a number of rows
+
+        Args:
+            count (int): The number of rows
+
+        Returns:
+            Tuple[int, int, int, int]: The offsets of the id column, the
+                completed bitset, the name offsets and the name heap
+        """
+        ids_at = HEADER.size
+        bits_at = ids_at + count * ID_SIZE
+        offsets_at = bits_at + (count + 7) // 8
+        offsets_at += -offsets_at % OFFSET.size
+        heap_at = offsets_at + (count + 1) * OFFSET.size
+        return ids_at, bits_at, offsets_at, heap_at
+
+    @property
+    @_synchronized
+    def count(self) -> int:
+        """
+        Get the number of entities in the repository
+
+        Returns:
+            int: The number of entities
+        """
+        return self._count if self._mapped() is not None else 0
+
+    @property
+    @_synchronized
+    def completed_count(self) -> int:
+        """
+        Get the number of completed entities without reading any names
+
+        Returns:
+            int: The number of set bits in the completed column
+        """
+        mapped = self._mapped()
+        if mapped is None:
+            return 0
+        _, bits_at, _, _ = self._layout(self._count)
+        bits = mapped[bits_at:bits_at + (self._count + 7) // 8]
+        return bin(int.from_bytes(bits, 'little')).count('1')
+
+    def _key(self, reference) -> Optional[bytes]:
+        """
+        Convert a reference into the bytes of an id
+
+        Args:
+            reference: The reference of the entity
+
+        Returns:
+            Optional[bytes]: The id, or None if the reference is not an id
+        """
+        try:
+            return UUID(str(reference)).bytes
+        except ValueError:
+            return None
+
+    def _index_of(self, reference) -> int:
+        """
+        Find the row of an id by scanning the mapped id column
+
+        Args:
+            reference: The id to look up
+
+        Returns:
+            int: The row of the id, or -1 if it is not stored or not an id
+        """
+        mapped = self._mapped()
+        needle = self._key(reference)
+        if mapped is None or needle is None:
+            return -1
+
+        start = HEADER.size
+        end = start + self._count * ID_SIZE
+        position = mapped.find(needle, start, end)
+        while position != -1 and (position - start) % ID_SIZE:
+            position = mapped.find(needle, position + 1, end)
+        return -1 if position == -1 else (position - start) // ID_SIZE
+
+    def _row(self, row: int) -> Tuple[bytes, bool, bytes]:
+        """
+        Read the raw columns of a single row
+
+        Args:
+            row (int): The row to read
+
+        Returns:
+            Tuple[bytes, bool, bytes]: The id, completed flag and encoded name
+        """
+        mapped = self._map
+        self.io.rows_scanned += 1
+        ids_at, bits_at, offsets_at, heap_at = self._layout(self._count)
+        identifier = mapped[ids_at + row * ID_SIZE:ids_at + (row + 1) * ID_SIZE]
+        completed = bool(mapped[bits_at + row // 8] & (1 << (row % 8)))
+        start, = OFFSET.unpack_from(mapped, offsets_at + row * OFFSET.size)
+        end, = OFFSET.unpack_from(mapped, offsets_at + (row + 1) * OFFSET.size)
+        return identifier, completed, mapped[heap_at + start:heap_at + end]
+
+    def _name_offsets(self) -> Tuple[int, ...]:
+        """
+        Get the offsets of the names in the heap, unpacked once per mapping
+
+        Returns:
+            Tuple[int, ...]: The start of each name followed by the heap size
+        """
+        if self._offsets is None:
+            _, _, offsets_at, _ = self._layout(self._count)
+            self._offsets = Struct(f'<{self._count + 1}Q').unpack_from(self._map, offsets_at)
+        return self._offsets
+
+    def _name_rows(self, name: Optional[str]) -> Iterator[int]:
+        """
+        Find the rows with a name by searching the mapped name heap
+
+        Args:
+            name (Optional[str]): The name to look up
+
+        Returns:
+            Iterator[int]: The matching rows in row order
+        """
+        mapped = self._mapped()
+        if mapped is None:
+            return
+        offsets = self._name_offsets()
+        needle = (name or '').encode('UTF8')
+        if not needle:
+            yield from (row for row in range(self._count) if offsets[row] == offsets[row + 1])
+            return
+
+        _, _, _, heap_at = self._layout(self._count)
+        end = heap_at + offsets[-1]
+        position = mapped.find(needle, heap_at, end)
+        while position != -1:
+            start = position - heap_at
+            row = bisect_left(offsets, start)
+            if row < self._count and offsets[row] == start and offsets[row + 1] == start + len(needle):
+                yield row
+            position = mapped.find(needle, position + 1, end)
+
+    def _materialize(self, identifier: bytes, completed: bool, name: bytes) -> Entity:
+        """
+        Build an entity from the raw columns of a row
+
+        Args:
+            identifier (bytes): The 16 byte id
+            completed (bool): The completed flag
+            name (bytes): The UTF-8 encoded name
+
+        Returns:
+            Entity: The entity
+        """
+        return self._decode((UUID(bytes=identifier), name.decode('UTF8'), completed))
+
+    def _columns(self) -> Columns:
+        """
+        Read every column into lists of raw values
+
+        Returns:
+            Columns: The ids, completed flags and encoded names
+        """
+        if self._mapped() is None:
+            return [], [], []
+        rows = [self._row(row) for row in range(self._count)]
+        return [r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows]
+
+    def _id_column(self) -> List[bytes]:
+        """
+        Read the id column alone, without reading the flags or names
+
+        Returns:
+            List[bytes]: The ids in row order
+        """
+        mapped = self._mapped()
+        if mapped is None:
+            return []
+        start = HEADER.size
+        return [mapped[at:at + ID_SIZE] for at in range(start, start + self._count * ID_SIZE, ID_SIZE)]
+
+    def _write(self, columns: Columns) -> None:
+        """
+        Write the columns to a new file and atomically replace the store
+
+        Args:
+            columns (Columns): The ids, completed flags and encoded names
+        """
+        ids, completed, names = columns
+        count = len(ids)
+        ids_at, bits_at, offsets_at, heap_at = self._layout(count)
+
+        bits = bytearray((count + 7) // 8)
+        for row, done in enumerate(completed):
+            if done:
+                bits[row // 8] |= 1 << (row % 8)
+
+        offsets = [0]
+        for name in names:
+            offsets.append(offsets[-1] + len(name))
+
+        self.close()
+        with atomic_write(self.filename, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, count, offsets[-1]))
+            f.write(b''.join(ids))
+            f.write(bits)
+            f.write(bytes(offsets_at - bits_at - len(bits)))
+            f.write(Struct(f'<{count + 1}Q').pack(*offsets))
+            f.write(b''.join(names))
+            self.io.opens += 1
+            self.io.bytes_written += f.tell()
+
+    def _encode(self, entity: Entity) -> Tuple[bytes, bool, bytes]:
+        """
+        Encode an entity into the raw columns of a row
+
+        Args:
+            entity (Entity): The entity to encode
+
+        Returns:
+            Tuple[bytes, bool, bytes]: The id, completed flag and encoded name
+        """
+        name = entity.name if entity.name is not None else ''
+        return UUID(str(entity.id)).bytes, bool(entity.completed), name.encode('UTF8')
+
+    def _rows_by_id(self, ids: List[bytes]) -> Dict[bytes, int]:
+        """
+        Index the rows of an id column
+
+        Args:
+            ids (List[bytes]): The id column
+
+        Returns:
+            Dict[bytes, int]: The row of each id
+        """
+        return {identifier: row for row, identifier in enumerate(ids)}
+
+    def _upsert(self, columns: Columns, encoded: List[Tuple[bytes, bool, bytes]]) -> None:
+        """
+        Add encoded entities to the columns, replacing rows with the same id
+
+        Args:
+            columns (Columns): The columns to update
+            encoded (List[Tuple[bytes, bool, bytes]]): The encoded entities
+        """
+        ids, completed, names = columns
+        rows = self._rows_by_id(ids)
+        for identifier, done, name in encoded:
+            row = rows.get(identifier)
+            if row is None:
+                rows[identifier] = len(ids)
+                ids.append(identifier)
+                completed.append(done)
+                names.append(name)
+            else:
+                completed[row], names[row] = done, name
+
+    def add(self, entity: Entity) -> None:
+        self.add_many([entity])
+
+    @_synchronized
+    def add_many(self, entities: Iterable[Entity]) -> None:
+        encoded = [self._encode(entity) for entity in entities]
+        with self.file_lock.exclusive():
+            columns = self._columns()
+            self._upsert(columns, encoded)
+            self._write(columns)
+
+    @_synchronized
+    def apply_changes(
+        self,
+        added: Iterable[Entity],
+        changed: Iterable[Entity],
+        removed: Iterable[Entity],
+    ) -> None:
+        """
+        Write a batch of changes with a single rewrite
+
+        Args:
+            added (Iterable[Entity]): The entities to add
+            changed (Iterable[Entity]): The stored entities to replace
+            removed (Iterable[Entity]): The entities to remove
+        """
+        encoded = [self._encode(entity) for entity in [*added, *changed]]
+        dropped = {UUID(str(entity.id)).bytes for entity in removed}
+        with self.file_lock.exclusive():
+            ids, completed, names = self._columns()
+            kept = [row for row, identifier in enumerate(ids) if identifier not in dropped]
+            columns = ([ids[r] for r in kept], [completed[r] for r in kept], [names[r] for r in kept])
+            self._upsert(columns, encoded)
+            self._write(columns)
+
+    def _set_completed(self, flags: Dict[int, bool]) -> None:
+        """
+        Overwrite completed flags in the mapped bitset of the file in place
+
+        Args:
+            flags (Dict[int, bool]): The new flag of each row
+        """
+        mapped = self._map
+        _, bits_at, _, _ = self._layout(self._count)
+        bits: Dict[int, int] = {}
+        for row, done in flags.items():
+            at = bits_at + row // 8
+            byte = bits.get(at, mapped[at])
+            bits[at] = byte | (1 << (row % 8)) if done else byte & ~(1 << (row % 8))
+
+        with open(self.filename, 'r+b') as f:
+            for at, byte in sorted(bits.items()):
+                f.seek(at)
+                f.write(bytes([byte]))
+            sync_file(f)
+        self.io.opens += 1
+        self.io.bytes_written += len(bits)
+
+    @_synchronized
+    def update_many(self, entities: Iterable[Entity]) -> None:
+        """
+        Replace stored entities, flipping their completed bits in place when
+        only those changed and rewriting the file otherwise
+
+        Args:
+            entities (Iterable[Entity]): The changed entities
+        """
+        entities = list(entities)
+        with self.file_lock.exclusive():
+            rows = self._rows_by_id(self._id_column())
+            flags = {}
+            for entity in entities:
+                identifier, done, name = self._encode(entity)
+                row = rows.get(identifier, -1)
+                if row == -1 or self._row(row)[2] != name:
+                    return self.apply_changes([], entities, [])
+                flags[row] = done
+            if flags:
+                self._set_completed(flags)
+
+    @_synchronized
+    def update_fields(self, reference, **changes) -> Optional[Entity]:
+        """
+        Change fields of a stored entity, flipping its completed bit in place
+        when that is the only change
+
+        Args:
+            reference: The reference of the entity to change
+            **changes: The new field values
+
+        Returns:
+            Optional[Entity]: The changed entity, or None if it is not stored
+        """
+        if set(changes) != {'completed'}:
+            return super().update_fields(reference, **changes)
+
+        with self.file_lock.exclusive():
+            row = self._index_of(reference)
+            if row == -1:
+                return None
+            self._set_completed({row: bool(changes['completed'])})
+            return self._materialize(*self._row(row))
+
+    @_synchronized
+    def get(self, reference) -> Entity:
+        row = self._index_of(reference)
+        if row == -1:
+            return None
+        return self._materialize(*self._row(row))
+
+    @_synchronized
+    def get_many(self, references: Iterable) -> List[Entity]:
+        if self._mapped() is None:
+            return [None for _ in references]
+        rows = self._rows_by_id(self._id_column())
+        found = []
+        for reference in references:
+            row = rows.get(self._key(reference))
+            found.append(None if row is None else self._materialize(*self._row(row)))
+        return found
+
+    @_synchronized
+    def remove(self, entity: Entity) -> Entity:
+        with self.file_lock.exclusive():
+            row = self._index_of(entity.id)
+            if row == -1:
+                return None
+            removed = self._materialize(*self._row(row))
+            ids, completed, names = self._columns()
+            del ids[row], completed[row], names[row]
+            self._write((ids, completed, names))
+            return removed
+
+    @_synchronized
+    def remove_many(self, entities: Iterable[Entity]) -> None:
+        removed = {UUID(str(entity.id)).bytes for entity in entities}
+        with self.file_lock.exclusive():
+            ids, completed, names = self._columns()
+            kept = [row for row, identifier in enumerate(ids) if identifier not in removed]
+            if len(kept) != len(ids):
+                self._write(([ids[r] for r in kept], [completed[r] for r in kept], [names[r] for r in kept]))
+
+    @_synchronized
+    def list(self) -> List[Entity]:
+        return [self._materialize(*row) for row in zip(*self._columns())]
+
+    def iter(self) -> Iterator[Entity]:
+        offset = 0
+        while True:
+            chunk = self.slice(offset, self.ITER_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield from chunk
+            offset += len(chunk)
+
+    @_synchronized
+    def slice(self, offset: int, limit: int) -> List[Entity]:
+        if self._mapped() is None:
+            return []
+        rows = range(offset, min(offset + limit, self._count))
+        return [self._materialize(*self._row(row)) for row in rows]
+
+    @_synchronized
+    def find_by(self, **criteria) -> List[Entity]:
+        if 'name' not in criteria:
+            return super().find_by(**criteria)
+
+        found = [self._materialize(*self._row(row)) for row in self._name_rows(criteria['name'])]
+        return [
+            entity for entity in found
+            if all(getattr(entity, field, None) == value for field, value in criteria.items())
+        ]
+
+    def ids(self) -> Iterator[UUID]:
+        """
+        Scan the id column without reading names or building entities
+
+        Returns:
+            Iterator[UUID]: The stored ids in row order
+        """
+        offset = 0
+        while True:
+            chunk = self._ids(offset, self.ITER_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield from chunk
+            offset += len(chunk)
+
+    @_synchronized
+    def _ids(self, offset: int, limit: int) -> List[UUID]:
+        """
+        Read a range of the id column
+
+        Args:
+            offset (int): The first row
+            limit (int): The most rows to read
+
+        Returns:
+            List[UUID]: The ids of the rows
+        """
+        if self._mapped() is None:
+            return []
+        start = HEADER.size
+        rows = range(offset, min(offset + limit, self._count))
+        return [UUID(bytes=self._map[start + row * ID_SIZE:start + (row + 1) * ID_SIZE]) for row in rows]
+
+    @_synchronized
+    def close(self) -> None:
+        """
+        Release the mapping of the file
+        """
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._signature = None
+        self._count = 0
+        self._offsets = None
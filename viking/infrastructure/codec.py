@@ -0,0 +1,288 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import re
+from dataclasses import MISSING, fields
+from operator import attrgetter
+from typing import Callable, Dict, Mapping, Sequence, Tuple
+from uuid import UUID, SafeUUID
+
+from viking.domain.seedwork.entity import Entity
+
+# Every spelling distutils' strtobool accepted as true, as older files may hold any of them.
+TRUE_STRINGS = frozenset(
+    spelling
+    for value in ('y', 'yes', 't', 'true', 'on', '1')
+    for spelling in (value, value.upper(), value.capitalize())
+)
+
+# How a stored string is parsed into each field type, as a Python expression.
+TEXT_PARSERS = {
+    UUID: '_parse_uuid({})',
+    bool: '({} in TRUE_STRINGS)',
+    int: 'int({})',
+    float: 'float({})',
+}
+
+# How an already decoded value, such as a JSON or SQL value, is coerced.
+VALUE_PARSERS = {
+    UUID: '_uuid({})',
+    bool: '_bool({})',
+}
+
+# The values accepted as booleans besides True and False, such as the 0 and 1
+# some SQL drivers return. Anything else is an error rather than truthy.
+BOOLEAN_VALUES = {0: False, 1: True, 'false': False, 'true': True}
+
+_codecs: Dict[type, 'Codec'] = {}
+_new = object.__new__
+_set = object.__setattr__
+_UNKNOWN_SAFETY = SafeUUID.unknown
+# int() also accepts signs, whitespace and underscores, so the fast path only
+# takes strings that are exactly 32 hex digits in the canonical 8-4-4-4-12 groups.
+_canonical_uuid = re.compile('-'.join(f'[0-9a-fA-F]{{{n}}}' for n in (8, 4, 4, 4, 12))).fullmatch
+
+Decoder = Callable[[Sequence], Entity]
+
+
+def _parse_uuid(text: str) -> UUID:
+    """
+    Parse the canonical string form of a UUID, skipping the normalization
+    UUID() does for every other form, which it is still used for and which
+    rejects malformed strings
+
+    Args:
+        text (str): The string form
+
+    Returns:
+        UUID: The UUID
+    """
+    if len(text) != 36 or _canonical_uuid(text) is None:
+        return UUID(text)
+    uuid = _new(UUID)
+    _set(uuid, 'int', int(text.replace('-', ''), 16))
+    _set(uuid, 'is_safe', _UNKNOWN_SAFETY)
+    return uuid
+
+
+def _uuid(value) -> UUID:
+    """
+    Coerce a value into a UUID without re-parsing UUIDs
+
+    Args:
+        value: A UUID or its string form
+
+    Returns:
+        UUID: The UUID
+    """
+    return value if value.__class__ is UUID else _parse_uuid(str(value))
+
+
+def _bool(value) -> bool:
+    """
+    Coerce a value into a bool, without treating every non-empty value as true
+
+    Args:
+        value: A bool, 0 or 1, or 'true' or 'false'
+
+    Raises:
+        ValueError: The value is not one of those
+
+    Returns:
+        bool: The bool
+    """
+    if value.__class__ is bool:
+        return value
+    try:
+        return BOOLEAN_VALUES[value]
+    except (KeyError, TypeError):
+        raise ValueError(f'Not a boolean: {value!r}') from None
+
+
+class Codec:
+    """
+    Converts entities of one dataclass type to and from stored rows.
+
+    Decoders are generated once per entity type and column layout, so a row
+    becomes a fully typed entity through straight-line attribute assignments
+    instead of per-cell reflection. A field that is a property over a
+    private backing field, like Task.completed, is decoded straight into the
+    backing field so no domain logic runs while loading.
+    """
+    def __init__(self, entity_type: type):
+        """
+        Initialize the codec
+
+        Args:
+            entity_type (type): The dataclass type of entity to convert
+        """
+        self.type = entity_type
+        self._fields = {f.name: f for f in fields(entity_type)}
+        self.columns: Tuple[str, ...] = tuple(self._fields)
+        self.public: Tuple[str, ...] = tuple(name for name in self.columns if not name.startswith('_'))
+        self.row: Callable[[Entity], tuple] = self._getter(self.columns)
+        self.public_row: Callable[[Entity], tuple] = self._getter(self.public)
+        self.public_types: Dict[str, str] = {
+            name: getattr(self._fields[name].type, '__name__', str(self._fields[name].type)).lower()
+            for name in self.public
+        }
+        self._decoders: Dict[Tuple[Tuple[str, ...], bool], Decoder] = {}
+        self._copy: Decoder = self._compile(self.columns, {})
+
+    def _getter(self, names: Tuple[str, ...]) -> Callable[[Entity], tuple]:
+        """
+        Build a function reading the named attributes of an entity as a tuple
+
+        Args:
+            names (Tuple[str, ...]): The attributes to read
+
+        Returns:
+            Callable[[Entity], tuple]: The getter
+        """
+        if len(names) == 1:
+            getter = attrgetter(names[0])
+            return lambda entity: (getter(entity),)
+        return attrgetter(*names)
+
+    def _target(self, column: str) -> str:
+        """
+        Get the attribute a column is stored into
+
+        Args:
+            column (str): The name of the column
+
+        Returns:
+            str: The column, or the private backing field of a property
+        """
+        if isinstance(getattr(self.type, column, None), property) and f'_{column}' in self._fields:
+            return f'_{column}'
+        return column
+
+    def decoder(self, columns: Sequence[str], text: bool = True) -> Decoder:
+        """
+        Get the decoder for rows laid out in the given columns, generating it
+        on first use
+
+        Args:
+            columns (Sequence[str]): The column of each value in a row
+            text (bool): True if values are strings to parse, as in a CSV
+                file, False if they are already decoded, as in JSON or SQL
+
+        Returns:
+            Decoder: A function building an entity from a row
+        """
+        key = (tuple(columns), text)
+        if key not in self._decoders:
+            self._decoders[key] = self._compile(key[0], TEXT_PARSERS if text else VALUE_PARSERS)
+        return self._decoders[key]
+
+    def copy(self, entity: Entity) -> Entity:
+        """
+        Copy an entity field by field, without parsing the values or running
+        any domain logic
+
+        Args:
+            entity (Entity): The entity to copy
+
+        Returns:
+            Entity: A new entity equal to it
+        """
+        return self._copy(self.row(entity))
+
+    def _compile(self, columns: Tuple[str, ...], parsers: Mapping[type, str]) -> Decoder:
+        """
+        Generate the source of a decoder and compile it
+
+        Args:
+            columns (Tuple[str, ...]): The column of each value in a row
+            parsers (Mapping[type, str]): How a value of each field type is
+                parsed, such as TEXT_PARSERS
+
+        Returns:
+            Decoder: A function building an entity from a row
+        """
+        assignments: Dict[str, str] = {}
+        for position, column in enumerate(columns):
+            target = self._target(column)
+            if target not in self._fields or (target != column and target in columns):
+                continue
+            parser = parsers.get(self._fields[target].type, '{}')
+            assignments[target] = parser.format(f'row[{position}]')
+
+        namespace = {
+            '_parse_uuid': _parse_uuid, '_uuid': _uuid, '_bool': _bool,
+            'TRUE_STRINGS': TRUE_STRINGS, 'new': object.__new__,
+        }
+        for name, field in self._fields.items():
+            if name in assignments or isinstance(getattr(self.type, name, None), property):
+                continue
+            if field.default is not MISSING:
+                namespace[f'default_{name}'] = field.default
+                assignments[name] = f'default_{name}'
+            elif field.default_factory is not MISSING:
+                namespace[f'factory_{name}'] = field.default_factory
+                assignments[name] = f'factory_{name}()'
+
+        namespace['cls'] = self.type
+        lines = ['def decode(row):', '    entity = new(cls)']
+        lines += [f'    entity.{name} = {value}' for name, value in assignments.items()]
+        lines.append('    return entity')
+        exec('\n'.join(lines), namespace)
+        return namespace['decode']
+
+    def to_dict(self, entity: Entity) -> dict:
+        """
+        Get the public fields of an entity
+
+        Args:
+            entity (Entity): The entity to convert
+
+        Returns:
+            dict: The value of each public field
+        """
+        return dict(zip(self.public, self.public_row(entity)))
+
+    def from_dict(self, data: Mapping) -> Entity:
+        """
+        Build an entity from decoded field values, such as a JSON object or
+        a SQL row mapping
+
+        Args:
+            data (Mapping): The value of each field
+
+        Returns:
+            Entity: The entity
+        """
+        return self.decoder(tuple(data), text=False)(tuple(data.values()))
+
+
+def codec_for(entity_type: type) -> Codec:
+    """
+    Get the codec of an entity type, building it on first use
+
+    Args:
+        entity_type (type): The dataclass type of entity
+
+    Returns:
+        Codec: The codec
+    """
+    if entity_type not in _codecs:
+        _codecs[entity_type] = Codec(entity_type)
+    return _codecs[entity_type]
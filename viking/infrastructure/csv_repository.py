@@ -18,28 +18,55 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
-from csv import DictReader, DictWriter
-from dataclasses import asdict
-from distutils.util import strtobool
+from csv import reader, writer
+from itertools import islice
 from os import remove, stat
 from os.path import exists as file_exists
-from typing import List, cast
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from viking.domain.seedwork.abstract_repository import AbstractRepository
 from viking.domain.seedwork.entity import Entity
+from viking.infrastructure.codec import codec_for
+from viking.infrastructure.file_io import FsyncBatcher, IOStats, atomic_write
+from viking.infrastructure.file_lock import FileLock
 
 
 class CsvRepository(AbstractRepository):
-    def __init__(self, filename: str, entity_type: type):
+    READ_CHUNK_SIZE = 1 << 16
+
+    def __init__(
+        self,
+        filename: str,
+        entity_type: type,
+        cached: bool = False,
+        fsync_every: Optional[int] = None,
+        fsync_interval: Optional[float] = None,
+    ):
         """
         Initialize the CSV repository
 
         Args:
             filename (str): The filename to use for the CSV repository
             entity_type (type): The type of entity to use for the CSV repository
+            cached (bool): Keep the parsed file and an index by id in memory,
+                only re-reading the file when its mtime or size changes.
+                Entities are copied in and out of the cache, so changing
+                one that was read or written leaves the cache as stored
+            fsync_every (Optional[int]): Force appends to disk every N writes
+            fsync_interval (Optional[float]): Force appends to disk at most
+                this many milliseconds after they are written
         """
         self.filename = filename
         self.type = entity_type
+        self.codec = codec_for(entity_type)
+        self.cached = cached
+        self.fsync = FsyncBatcher(filename, fsync_every, fsync_interval)
+        self.file_lock = FileLock(filename)
+        self.io = IOStats()
+        self._entities: List[Entity] = []
+        self._index: Dict[str, Entity] = {}
+        self._names: Dict[str, List[Entity]] = {}
+        self._signature: Optional[Tuple[int, int, int]] = None
 
     def _file_empty(self) -> bool:
         """
@@ -52,61 +79,300 @@ class CsvRepository(AbstractRepository):
             return True
         return stat(self.filename).st_size == 0
 
-    def add(self, entity: Entity) -> None:
+    def _file_signature(self) -> Optional[Tuple[int, int, int]]:
+        """
+        Get the signature used to detect changes to the file
+
+        Returns:
+            Optional[Tuple[int, int, int]]: The inode, mtime and size of the
+                file, or None if it does not exist
+        """
+        try:
+            stats = stat(self.filename)
+        except FileNotFoundError:
+            return None
+        return (stats.st_ino, stats.st_mtime_ns, stats.st_size)
+
+    def _load(self) -> List[Entity]:
+        """
+        Get the stored entities, re-reading the file only when the cache is
+        disabled or the file changed since it was last read
+
+        Returns:
+            List[Entity]: The stored entities
+        """
+        if not self.cached:
+            return self._read()
+
+        with self.file_lock.shared():
+            signature = self._file_signature()
+            if signature is None or signature != self._signature:
+                self._remember(self._read() if signature else [])
+                self._signature = signature
+        return self._entities
+
+    def _remember(self, entities: List[Entity]) -> None:
+        """
+        Replace the cached entities and rebuild the indexes by id and name
+
+        Args:
+            entities (List[Entity]): The entities to cache
+        """
+        self._entities = entities
+        self._index = {}
+        self._names = {}
+        for entity in entities:
+            self._index_entity(entity)
+
+    def _index_entity(self, entity: Entity) -> None:
+        """
+        Add a cached entity to the indexes by id and name
+
+        Args:
+            entity (Entity): The entity to index
+        """
+        self._index.setdefault(str(entity.id), entity)
+        self._names.setdefault(getattr(entity, 'name', None), []).append(entity)
+
+    def _append(self, entities: List[Entity]) -> None:
+        """
+        Append a row per entity in a single write, writing the header if the
+        file is empty
+
+        Args:
+            entities (List[Entity]): The entities to append
+        """
+        if not entities:
+            return
+
         with open(self.filename, 'a+', encoding='UTF8', newline='') as f:
-            fields = list(asdict(entity).keys())
-            writer = DictWriter(f, fieldnames=fields)
+            self.io.opens += 1
+            start = f.tell()
+            rows = writer(f)
             if self._file_empty():
-                writer.writeheader()
-            writer.writerow(asdict(entity))
+                rows.writerow(self.codec.columns)
+            rows.writerows(map(self.codec.row, entities))
+            self.io.bytes_written += f.tell() - start
+            self.fsync.written(f)
+
+    def _rewrite(self, entities: List[Entity]) -> None:
+        """
+        Atomically replace the file with a row per entity
+
+        Args:
+            entities (List[Entity]): The entities to keep
+        """
+        if not entities:
+            if file_exists(self.filename):
+                remove(self.filename)
+            return
+
+        with atomic_write(self.filename, encoding='UTF8', newline='') as f:
+            rows = writer(f)
+            rows.writerow(self.codec.columns)
+            rows.writerows(map(self.codec.row, entities))
+            self.io.opens += 1
+            self.io.bytes_written += f.tell()
+
+    def add(self, entity: Entity) -> None:
+        self.add_many([entity])
+
+    def add_many(self, entities: Iterable[Entity]) -> None:
+        entities = list(entities)
+        with self.file_lock.exclusive():
+            if self.cached:
+                self._load()
+
+            self._append(entities)
+
+            if self.cached:
+                for entity in map(self.codec.copy, entities):
+                    self._entities.append(entity)
+                    self._index_entity(entity)
+                self._signature = self._file_signature()
 
     def remove(self, entity: Entity) -> Entity:
-        stored = self.list()
-        if file_exists(self.filename):
-            remove(self.filename)
-        
-        for s in stored:
-            if str(entity.id) != str(s.id):
-                self.add(s)
+        self.remove_many([entity])
+
+    def remove_many(self, entities: Iterable[Entity]) -> None:
+        ids = {str(entity.id) for entity in entities}
+        with self.file_lock.exclusive():
+            stored = self._load()
+            if self.cached and ids.isdisjoint(self._index):
+                return
+
+            remaining = [s for s in stored if str(s.id) not in ids]
+            self._rewrite(remaining)
+
+            if self.cached:
+                self._remember(remaining)
+                self._signature = self._file_signature()
+
+    def apply_changes(
+        self,
+        added: Iterable[Entity],
+        changed: Iterable[Entity],
+        removed: Iterable[Entity],
+    ) -> None:
+        """
+        Write a batch of changes with one append when entities are only added,
+        or one atomic rewrite that replaces changed rows in place otherwise
+
+        Args:
+            added (Iterable[Entity]): The entities to add
+            changed (Iterable[Entity]): The stored entities to replace
+            removed (Iterable[Entity]): The entities to remove
+        """
+        added = list(added)
+        replacements = {str(entity.id): entity for entity in changed}
+        dropped = {str(entity.id) for entity in removed}
+        if not replacements and not dropped:
+            return self.add_many(added)
+        if self.cached:
+            added = list(map(self.codec.copy, added))
+            replacements = {key: self.codec.copy(entity) for key, entity in replacements.items()}
+
+        with self.file_lock.exclusive():
+            kept, replaced = [], set()
+            for stored in self._load():
+                key = str(stored.id)
+                if key in dropped or key in replaced:
+                    continue
+                if key in replacements:
+                    stored = replacements[key]
+                    replaced.add(key)
+                kept.append(stored)
+            kept.extend(entity for key, entity in replacements.items() if key not in replaced)
+            kept.extend(added)
+            self._rewrite(kept)
+
+            if self.cached:
+                self._remember(kept)
+                self._signature = self._file_signature()
+
+    def update_many(self, entities: Iterable[Entity]) -> None:
+        """
+        Replace stored rows in place with one atomic rewrite, keeping the
+        order of the file
+
+        Args:
+            entities (Iterable[Entity]): The changed entities
+        """
+        self.apply_changes([], entities, [])
 
     def get(self, reference) -> Entity:
-        stored = self.list()
+        return self.get_many([reference])[0]
+
+    def get_many(self, references: Iterable) -> List[Entity]:
+        if self.cached:
+            self._load()
+            copy, index = self.codec.copy, self._index
+            found = (index.get(str(reference)) for reference in references)
+            return [entity if entity is None else copy(entity) for entity in found]
 
-        for s in stored:
-            if str(s.id) == str(reference):
-                return s
+        index = {}
+        for s in self._read():
+            index.setdefault(str(s.id), s)
+        return [index.get(str(reference)) for reference in references]
 
-    def _cast_field_to_type(self, entity: object, field: str, value: str) -> object:
+    def find_by(self, **criteria) -> List[Entity]:
+        if not self.cached or 'name' not in criteria:
+            return super().find_by(**criteria)
+
+        self._load()
+        return [
+            self.codec.copy(entity) for entity in self._names.get(criteria['name'], [])
+            if all(getattr(entity, field, None) == value for field, value in criteria.items())
+        ]
+
+    def close(self) -> None:
+        """
+        Force any appends still waiting for their fsync batch to disk
         """
-        Cast the field to the correct type
+        self.fsync.close()
+
+    def list(self) -> List[Entity]:
+        if self.cached:
+            return list(map(self.codec.copy, self._load()))
+        return self._read()
+
+    def iter(self) -> Iterator[Entity]:
+        if self.cached:
+            return map(self.codec.copy, list(self._load()))
+        return self._rows()
+
+    def slice(self, offset: int, limit: int) -> List[Entity]:
+        if self.cached:
+            return list(map(self.codec.copy, self._load()[offset:offset + limit]))
+        return list(islice(self._rows(), offset, offset + limit))
+
+    def _read(self) -> List[Entity]:
+        """
+        Parse every row of the file into an entity
+
+        Returns:
+            List[Entity]: The entities in file order
+        """
+        with self.file_lock.shared():
+            try:
+                with open(self.filename, encoding='UTF8', newline='') as f:
+                    entities = list(self._decode(f))
+                    self.io.opens += 1
+                    self.io.read(f, len(entities))
+                    return entities
+            except FileNotFoundError:
+                return []
+
+    def _decode(self, lines: Iterable[str]) -> Iterator[Entity]:
+        """
+        Parse CSV lines into entities with the decoder the codec generated for
+        the columns of the header
+
+        Args:
+            lines (Iterable[str]): The lines of the file
+
+        Returns:
+            Iterator[Entity]: The entities in file order
+        """
+        rows = reader(lines)
+        header = next(rows, None)
+        if header is None:
+            return iter(())
+        return map(self.codec.decoder(header), filter(None, rows))
+
+    def _lines(self, f: IO[str]) -> Iterator[str]:
+        """
+        Read the lines of the file a chunk at a time, holding the shared lock
+        only while each chunk is read so a slow consumer never blocks writers
 
         Args:
-            entity (object): The entity to cast the field to
-            field (str): The field to cast
-            value (str): The value to cast
+            f (IO[str]): The open file
 
         Returns:
-            object: The casted value
+            Iterator[str]: The lines of the file
         """
-        target_type = type(getattr(entity, field))
-        if target_type == bool:
-            casted = strtobool(value)
-        elif target_type == callable:
-            casted = target_type(value)
-        else:
-            casted = cast(target_type, value)
+        while True:
+            with self.file_lock.shared():
+                lines = f.readlines(self.READ_CHUNK_SIZE)
+            if not lines:
+                return
+            yield from lines
 
-        return casted
+    def _rows(self) -> Iterator[Entity]:
+        """
+        Parse the rows of the file into entities as they are read
 
-    def list(self) -> List[Entity]:
-        return_list = []
+        Returns:
+            Iterator[Entity]: The entities in file order
+        """
         try:
             with open(self.filename, encoding='UTF8', newline='') as f:
-                for row in DictReader(f):
-                    entity = self.__new__(self.type)
-                    for field in row:
-                        setattr(entity, field, self._cast_field_to_type(entity, field, row[field]))
-                    return_list.append(entity)
+                self.io.opens += 1
+                rows = 0
+                try:
+                    for rows, entity in enumerate(self._decode(self._lines(f)), 1):
+                        yield entity
+                finally:
+                    self.io.read(f, rows)
         except FileNotFoundError:
             pass
-        return return_list
@@ -0,0 +1,242 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from contextlib import contextmanager
+from os import O_RDONLY, SEEK_CUR, chmod, close, fsync, lseek
+from os import name as os_name
+from os import open as os_open
+from os import remove, replace, stat
+from os.path import abspath, basename, dirname
+from tempfile import mkstemp
+from threading import Lock, Timer
+from time import monotonic
+from typing import IO, Dict, Iterator, Optional
+
+
+def sync_file(f: IO) -> None:
+    """
+    Flush a file object and force its data to disk
+
+    Args:
+        f (IO): The open file
+    """
+    f.flush()
+    fsync(f.fileno())
+
+
+def sync_directory(directory: str) -> None:
+    """
+    Force a directory entry change, such as a rename, to disk
+
+    Args:
+        directory (str): The directory holding the renamed file
+    """
+    if os_name != 'posix':
+        return
+    descriptor = os_open(directory, O_RDONLY)
+    try:
+        fsync(descriptor)
+    finally:
+        close(descriptor)
+
+
+def temporary_path(filename: str) -> str:
+    """
+    Create an empty temporary file next to a file, with the same permissions
+
+    Args:
+        filename (str): The file the temporary file will replace
+
+    Returns:
+        str: The path of the temporary file
+    """
+    descriptor, temporary = mkstemp(prefix=f'.{basename(filename)}.', suffix='.tmp', dir=dirname(abspath(filename)))
+    close(descriptor)
+    try:
+        chmod(temporary, stat(filename).st_mode)
+    except FileNotFoundError:
+        chmod(temporary, 0o644)
+    return temporary
+
+
+def replace_durably(temporary: str, filename: str) -> None:
+    """
+    Atomically move a fully written temporary file over a file
+
+    Args:
+        temporary (str): The temporary file, already synced to disk
+        filename (str): The file to replace
+    """
+    replace(temporary, filename)
+    sync_directory(dirname(abspath(filename)))
+
+
+@contextmanager
+def atomic_write(filename: str, mode: str = 'w', **kwargs) -> Iterator[IO]:
+    """
+    Write a file through a temporary sibling that replaces it on success, so
+    readers and crashes only ever see the old or the new contents
+
+    Args:
+        filename (str): The file to write
+        mode (str): The mode to open the temporary file with
+        **kwargs: Extra arguments for open
+
+    Returns:
+        Iterator[IO]: The temporary file to write to
+    """
+    temporary = temporary_path(filename)
+    try:
+        with open(temporary, mode, **kwargs) as f:
+            yield f
+            sync_file(f)
+        replace_durably(temporary, filename)
+    except BaseException:
+        try:
+            remove(temporary)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class IOStats:
+    """
+    Counts the file opens, bytes and rows a file backed repository reads and
+    writes, so an instrumenting wrapper can attribute them to operations.
+    """
+    FIELDS = ('opens', 'bytes_read', 'bytes_written', 'rows_scanned')
+
+    def __init__(self):
+        """
+        Constructor for the IOStats
+        """
+        self.opens = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.rows_scanned = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        """
+        Get the current value of every counter
+
+        Returns:
+            Dict[str, int]: The counters by name
+        """
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def read(self, f: IO, rows: int = 0, start: int = 0) -> None:
+        """
+        Record a sequential read of an open file
+
+        Args:
+            f (IO): The file, after reading it
+            rows (int): The number of rows parsed from it
+            start (int): The offset the read started at
+        """
+        self.bytes_read += lseek(f.fileno(), 0, SEEK_CUR) - start
+        self.rows_scanned += rows
+
+
+class FsyncBatcher:
+    """
+    Group commit for appends: forces the file to disk every N writes or once
+    T milliseconds have passed since the first unsynced write, instead of
+    after every write.
+    """
+    def __init__(self, filename: str, every: Optional[int] = None, interval: Optional[float] = None):
+        """
+        Constructor for the FsyncBatcher
+
+        Args:
+            filename (str): The file the appends go to
+            every (Optional[int]): Sync after this many writes
+            interval (Optional[float]): Sync at most this many milliseconds
+                after a write
+        """
+        self.filename = filename
+        self.every = every
+        self.interval = interval
+        self.pending = 0
+        self._first_pending: Optional[float] = None
+        self._timer: Optional[Timer] = None
+        self._lock = Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Check if appends are ever synced by the batcher
+
+        Returns:
+            bool: False when syncing is left to the operating system
+        """
+        return self.every is not None or self.interval is not None
+
+    def written(self, f: IO) -> None:
+        """
+        Record a write to the open file, syncing it if a batch is due
+
+        Args:
+            f (IO): The file the write went to
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self.pending += 1
+            if self._first_pending is None:
+                self._first_pending = monotonic()
+            due = self.every is not None and self.pending >= self.every
+            overdue = self.interval is not None and (monotonic() - self._first_pending) * 1000 >= self.interval
+            if due or overdue:
+                sync_file(f)
+                self._synced()
+            elif self.interval is not None and self._timer is None:
+                self._timer = Timer(self.interval / 1000, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _synced(self) -> None:
+        """
+        Reset the batch after a sync
+        """
+        self.pending = 0
+        self._first_pending = None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def flush(self) -> None:
+        """
+        Sync any writes still waiting for their batch
+        """
+        with self._lock:
+            if self.pending:
+                try:
+                    with open(self.filename, 'ab') as f:
+                        fsync(f.fileno())
+                except FileNotFoundError:
+                    pass
+            self._synced()
+
+    def close(self) -> None:
+        """
+        Sync pending writes and stop the timer
+        """
+        self.flush()
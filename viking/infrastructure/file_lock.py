@@ -0,0 +1,176 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from contextlib import contextmanager
+from os import O_CREAT, O_RDWR, close
+from os import open as os_open
+from threading import Lock, local
+from time import perf_counter
+from typing import Dict, Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - advisory locks are POSIX only
+    fcntl = None
+
+SHARED = 'shared'
+EXCLUSIVE = 'exclusive'
+
+
+class LockStats:
+    """
+    Counts lock acquisitions and the time spent waiting for them.
+    """
+    def __init__(self):
+        """
+        Constructor for the LockStats
+        """
+        self._lock = Lock()
+        self.acquired: Dict[str, int] = {SHARED: 0, EXCLUSIVE: 0}
+        self.contended: Dict[str, int] = {SHARED: 0, EXCLUSIVE: 0}
+        self.total_wait: Dict[str, float] = {SHARED: 0.0, EXCLUSIVE: 0.0}
+        self.max_wait: Dict[str, float] = {SHARED: 0.0, EXCLUSIVE: 0.0}
+
+    def record(self, kind: str, waited: float, contended: bool) -> None:
+        """
+        Record an acquisition
+
+        Args:
+            kind (str): SHARED or EXCLUSIVE
+            waited (float): Seconds spent acquiring the lock
+            contended (bool): True if another holder made the caller wait
+        """
+        with self._lock:
+            self.acquired[kind] += 1
+            self.contended[kind] += int(contended)
+            self.total_wait[kind] += waited
+            self.max_wait[kind] = max(self.max_wait[kind], waited)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get a copy of the statistics
+
+        Returns:
+            Dict[str, Dict[str, float]]: The statistics of each kind of lock
+        """
+        with self._lock:
+            return {
+                kind: {
+                    'acquired': self.acquired[kind],
+                    'contended': self.contended[kind],
+                    'total_wait': self.total_wait[kind],
+                    'max_wait': self.max_wait[kind],
+                }
+                for kind in (SHARED, EXCLUSIVE)
+            }
+
+
+class FileLock:
+    """
+    Advisory reader/writer lock shared by every process using a file.
+
+    Locks are taken with flock on a sidecar '.lock' file, because the data
+    file itself is atomically replaced on rewrites. Each acquisition opens its
+    own descriptor, so threads of one process exclude each other as well.
+    Nested acquisitions by the thread already holding the lock are free.
+    """
+    def __init__(self, filename: str):
+        """
+        Constructor for the FileLock
+
+        Args:
+            filename (str): The file the lock protects
+        """
+        self.filename = f'{filename}.lock'
+        self.stats = LockStats()
+        self._held = local()
+
+    @contextmanager
+    def shared(self) -> Iterator[None]:
+        """
+        Hold the lock alongside any other readers
+
+        Returns:
+            Iterator[None]: A context holding the lock
+        """
+        with self._acquire(SHARED):
+            yield
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        """
+        Hold the lock with no other readers or writers
+
+        Returns:
+            Iterator[None]: A context holding the lock
+        """
+        with self._acquire(EXCLUSIVE):
+            yield
+
+    @contextmanager
+    def _acquire(self, kind: str) -> Iterator[None]:
+        """
+        Acquire the lock unless the current thread already holds it
+
+        Args:
+            kind (str): SHARED or EXCLUSIVE
+
+        Raises:
+            RuntimeError: A shared holder asked for the exclusive lock
+
+        Returns:
+            Iterator[None]: A context holding the lock
+        """
+        held = getattr(self._held, 'kind', None)
+        if held is not None:
+            if held == SHARED and kind == EXCLUSIVE:
+                raise RuntimeError('A shared lock cannot be upgraded to an exclusive lock')
+            yield
+            return
+
+        descriptor = os_open(self.filename, O_RDWR | O_CREAT, 0o644)
+        try:
+            self._lock(descriptor, kind)
+            self._held.kind = kind
+            try:
+                yield
+            finally:
+                self._held.kind = None
+        finally:
+            close(descriptor)
+
+    def _lock(self, descriptor: int, kind: str) -> None:
+        """
+        Block until flock grants the lock, recording how long it took
+
+        Args:
+            descriptor (int): The open lock file
+            kind (str): SHARED or EXCLUSIVE
+        """
+        start = perf_counter()
+        contended = False
+        if fcntl is not None:
+            operation = fcntl.LOCK_SH if kind == SHARED else fcntl.LOCK_EX
+            try:
+                fcntl.flock(descriptor, operation | fcntl.LOCK_NB)
+            except BlockingIOError:
+                contended = True
+                fcntl.flock(descriptor, operation)
+        self.stats.record(kind, perf_counter() - start, contended)
@@ -0,0 +1,217 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from time import perf_counter
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from viking.domain.seedwork.abstract_repository import AbstractRepository
+from viking.domain.seedwork.entity import Entity
+from viking.infrastructure.file_io import IOStats
+from viking.infrastructure.metrics import MetricsSink, labels, registry
+
+CALLS = 'hungry_task_repository_calls_total'
+ERRORS = 'hungry_task_repository_errors_total'
+SECONDS = 'hungry_task_repository_seconds'
+IO_COUNTERS = {
+    'opens': 'hungry_task_repository_file_opens_total',
+    'bytes_read': 'hungry_task_repository_bytes_read_total',
+    'bytes_written': 'hungry_task_repository_bytes_written_total',
+    'rows_scanned': 'hungry_task_repository_rows_scanned_total',
+}
+DESCRIPTIONS = {
+    CALLS: 'Repository calls by backend and operation.',
+    ERRORS: 'Repository calls that raised.',
+    SECONDS: 'Time spent in repository calls.',
+    IO_COUNTERS['opens']: 'Files opened by repository calls.',
+    IO_COUNTERS['bytes_read']: 'Bytes read, or mapped, by repository calls.',
+    IO_COUNTERS['bytes_written']: 'Bytes written by repository calls.',
+    IO_COUNTERS['rows_scanned']: 'Stored rows parsed by repository calls.',
+}
+
+
+class InstrumentedRepository(AbstractRepository):
+    """
+    Records the calls, latency and file I/O of every operation of a wrapped
+    repository in a metrics sink.
+
+    File I/O is taken from the IOStats a file backend exposes as `io`, so it
+    is only attributed correctly while calls are not interleaved, as they
+    are not behind the single worker thread of the API.
+    """
+    def __init__(self, repository: AbstractRepository, backend: str, sink: Optional[MetricsSink] = None):
+        """
+        Constructor for the InstrumentedRepository
+
+        Args:
+            repository (AbstractRepository): The repository to measure
+            backend (str): The name of the backend, used as a label
+            sink (Optional[MetricsSink]): Where measurements go, the
+                process-wide registry by default
+        """
+        self.repository = repository
+        self.backend = backend
+        self.sink = registry if sink is None else sink
+        describe = getattr(self.sink, 'describe', None)
+        if describe is not None:
+            for name, description in DESCRIPTIONS.items():
+                describe(name, description)
+
+    def __getattr__(self, name: str):
+        return getattr(self.repository, name)
+
+    def _io(self) -> Optional[Dict[str, int]]:
+        """
+        Get the I/O counters of the wrapped repository
+
+        Returns:
+            Optional[Dict[str, int]]: The counters, or None if the backend
+                does not count its I/O
+        """
+        io = getattr(self.repository, 'io', None)
+        return io.snapshot() if isinstance(io, IOStats) else None
+
+    def _record(self, operation: str, seconds: float, before: Optional[Dict[str, int]], failed: bool) -> None:
+        """
+        Send the measurements of a finished call to the sink
+
+        Args:
+            operation (str): The name of the operation
+            seconds (float): The time spent in the call
+            before (Optional[Dict[str, int]]): The I/O counters before the call
+            failed (bool): Whether the call raised
+        """
+        series = labels(backend=self.backend, operation=operation)
+        self.sink.increment(CALLS, series)
+        self.sink.observe(SECONDS, series, seconds)
+        if failed:
+            self.sink.increment(ERRORS, series)
+        if before is not None:
+            after = self._io()
+            for field, name in IO_COUNTERS.items():
+                if after[field] != before[field]:
+                    self.sink.increment(name, series, after[field] - before[field])
+
+    def _call(self, operation: str, method, *args, **kwargs):
+        """
+        Call a method of the wrapped repository and record it
+
+        Args:
+            operation (str): The name of the operation
+            method: The bound method to call
+            *args: The arguments for the method
+            **kwargs: The keyword arguments for the method
+
+        Returns:
+            The result of the method
+        """
+        before = self._io()
+        failed = True
+        start = perf_counter()
+        try:
+            result = method(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            self._record(operation, perf_counter() - start, before, failed)
+
+    def _iterate(self, entities: Iterator[Entity], before: Optional[Dict[str, int]], elapsed: float) -> Iterator[Entity]:
+        """
+        Yield from an iterator of the wrapped repository, recording the time
+        spent producing entities once it is exhausted or closed
+
+        Args:
+            entities (Iterator[Entity]): The iterator
+            before (Optional[Dict[str, int]]): The I/O counters before it
+                was created
+            elapsed (float): The time spent creating it
+
+        Returns:
+            Iterator[Entity]: The entities
+        """
+        failed = True
+        try:
+            while True:
+                start = perf_counter()
+                try:
+                    entity = next(entities)
+                except StopIteration:
+                    break
+                finally:
+                    elapsed += perf_counter() - start
+                yield entity
+            failed = False
+        except GeneratorExit:
+            failed = False
+            raise
+        finally:
+            self._record('iter', elapsed, before, failed)
+
+    def add(self, entity: Entity) -> None:
+        return self._call('add', self.repository.add, entity)
+
+    def get(self, reference) -> Entity:
+        return self._call('get', self.repository.get, reference)
+
+    def remove(self, entity: Entity) -> Entity:
+        return self._call('remove', self.repository.remove, entity)
+
+    def list(self) -> List[Entity]:
+        return self._call('list', self.repository.list)
+
+    def add_many(self, entities: Iterable[Entity]) -> None:
+        return self._call('add_many', self.repository.add_many, entities)
+
+    def get_many(self, references: Iterable) -> List[Entity]:
+        return self._call('get_many', self.repository.get_many, references)
+
+    def remove_many(self, entities: Iterable[Entity]) -> None:
+        return self._call('remove_many', self.repository.remove_many, entities)
+
+    def apply_changes(
+        self,
+        added: Iterable[Entity],
+        changed: Iterable[Entity],
+        removed: Iterable[Entity],
+    ) -> None:
+        return self._call('apply_changes', self.repository.apply_changes, added, changed, removed)
+
+    def update(self, entity: Entity) -> None:
+        return self._call('update', self.repository.update, entity)
+
+    def update_many(self, entities: Iterable[Entity]) -> None:
+        return self._call('update_many', self.repository.update_many, entities)
+
+    def update_fields(self, reference, **changes) -> Optional[Entity]:
+        return self._call('update_fields', self.repository.update_fields, reference, **changes)
+
+    def iter(self) -> Iterator[Entity]:
+        before = self._io()
+        start = perf_counter()
+        entities = iter(self.repository.iter())
+        return self._iterate(entities, before, perf_counter() - start)
+
+    def slice(self, offset: int, limit: int) -> List[Entity]:
+        return self._call('slice', self.repository.slice, offset, limit)
+
+    def find_by(self, **criteria) -> List[Entity]:
+        return self._call('find_by', self.repository.find_by, **criteria)
+
+    def find_by_name(self, name: str) -> Optional[Entity]:
+        return self._call('find_by_name', self.repository.find_by_name, name)
@@ -0,0 +1,472 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+import os
+from itertools import islice
+from threading import Lock, RLock, Thread
+from typing import IO, Dict, Iterable, List, Optional
+
+from viking.domain.seedwork.abstract_repository import AbstractRepository
+from viking.domain.seedwork.entity import Entity
+from viking.infrastructure.codec import codec_for
+from viking.infrastructure.file_io import (FsyncBatcher, IOStats,
+                                          replace_durably, sync_file,
+                                          temporary_path)
+from viking.infrastructure.file_lock import FileLock
+
+
+class LogRepository(AbstractRepository):
+    """
+    Append-only, log-structured repository.
+
+    Every mutation appends a single record to the log and an in-memory index
+    keeps the latest version of each entity. Once enough stale records have
+    piled up the log is compacted on a background thread.
+
+    Several processes may share one log: appends and compactions hold an
+    exclusive lock on it, and every operation first replays whatever other
+    processes appended since the index was last brought up to date.
+    """
+    ADD = 'add'
+    UPDATE = 'update'
+    REMOVE = 'remove'
+
+    def __init__(
+        self,
+        filename: str,
+        entity_type: type,
+        compaction_threshold: int = 1000,
+        fsync_every: Optional[int] = None,
+        fsync_interval: Optional[float] = None,
+    ):
+        """
+        Initialize the log repository and replay the log into the index
+
+        Args:
+            filename (str): The filename of the log
+            entity_type (type): The type of entity stored in the log
+            compaction_threshold (int): The number of stale records that
+                triggers a background compaction
+            fsync_every (Optional[int]): Force appends to disk every N writes
+            fsync_interval (Optional[float]): Force appends to disk at most
+                this many milliseconds after they are written
+        """
+        self.filename = filename
+        self.type = entity_type
+        self.codec = codec_for(entity_type)
+        self.compaction_threshold = compaction_threshold
+        self.fsync = FsyncBatcher(filename, fsync_every, fsync_interval)
+        self.file_lock = FileLock(filename)
+        self.io = IOStats()
+        self._index: Dict[str, Entity] = {}
+        self._names: Dict[str, Dict[str, Entity]] = {}
+        self._indexed_names: Dict[str, str] = {}
+        self._records = 0
+        self._size = 0
+        self._inode: Optional[int] = None
+        self._file: Optional[IO[str]] = None
+        self._lock = RLock()
+        self._compaction_lock = Lock()
+        self._compactor: Optional[Thread] = None
+        with self.file_lock.shared():
+            self._replay()
+
+    @property
+    def garbage(self) -> int:
+        """
+        Get the number of stale records in the log
+
+        Returns:
+            int: Records that no longer describe a live entity
+        """
+        return self._records - len(self._index)
+
+    @property
+    def compacting(self) -> bool:
+        """
+        Check if a background compaction is running
+
+        Returns:
+            bool: True while the compactor thread is alive
+        """
+        return self._compactor is not None and self._compactor.is_alive()
+
+    @property
+    def count(self) -> int:
+        """
+        Get the number of entities in the repository
+
+        Returns:
+            int: The number of entities
+        """
+        return len(self._index)
+
+    def _serialize(self, entity: Entity) -> dict:
+        """
+        Convert an entity into the fields persisted in the log
+
+        Args:
+            entity (Entity): The entity to convert
+
+        Returns:
+            dict: The public fields of the entity
+        """
+        return self.codec.to_dict(entity)
+
+    def _deserialize(self, data: dict) -> Entity:
+        """
+        Rebuild an entity from the fields persisted in the log
+
+        Args:
+            data (dict): The public fields of the entity
+
+        Returns:
+            Entity: The entity
+        """
+        return self.codec.from_dict(data)
+
+    def _encode(self, op: str, payload) -> str:
+        """
+        Encode a single log record
+
+        Args:
+            op (str): The operation of the record
+            payload: The entity fields, or the id for a tombstone
+
+        Returns:
+            str: The record as a line of JSON
+        """
+        return json.dumps({'op': op, 'data': payload}, default=str) + '\n'
+
+    def _put(self, key: str, entity: Entity) -> None:
+        """
+        Store the latest version of an entity in the id and name indexes
+
+        Args:
+            key (str): The id of the entity
+            entity (Entity): The entity
+        """
+        self._unname(key)
+        name = getattr(entity, 'name', None)
+        self._index[key] = entity
+        self._names.setdefault(name, {})[key] = entity
+        self._indexed_names[key] = name
+
+    def _drop(self, key: str) -> Optional[Entity]:
+        """
+        Drop an entity from the id and name indexes
+
+        Args:
+            key (str): The id of the entity
+
+        Returns:
+            Optional[Entity]: The dropped entity, if it was stored
+        """
+        self._unname(key)
+        return self._index.pop(key, None)
+
+    def _unname(self, key: str) -> None:
+        """
+        Drop an entity from the name index
+
+        Args:
+            key (str): The id of the entity
+        """
+        if key not in self._indexed_names:
+            return
+        name = self._indexed_names.pop(key)
+        named = self._names[name]
+        del named[key]
+        if not named:
+            del self._names[name]
+
+    def _apply(self, record: dict) -> None:
+        """
+        Apply a decoded record to the index
+
+        Args:
+            record (dict): The decoded record
+        """
+        if record['op'] == self.REMOVE:
+            self._drop(record['data'])
+        else:
+            self._put(record['data']['id'], self._deserialize(record['data']))
+        self._records += 1
+
+    def _replay(self, offset: int = 0) -> None:
+        """
+        Apply the records written to the log from the given offset onwards
+
+        Args:
+            offset (int): The offset of the first record to apply
+        """
+        try:
+            with open(self.filename, 'rb') as f:
+                self.io.opens += 1
+                self._inode = os.fstat(f.fileno()).st_ino
+                f.seek(offset)
+                start, records = offset, self._records
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        # A torn write from a crash; the next append seals it.
+                        break
+                    try:
+                        self._apply(json.loads(line))
+                    except ValueError:
+                        # A torn write that a later append already sealed.
+                        self._records += 1
+                    offset += len(line)
+                self.io.read(f, self._records - records, start)
+        except FileNotFoundError:
+            self._inode = None
+        self._size = offset
+
+    def _reset(self) -> None:
+        """
+        Forget the index and the open log before replaying a replaced log
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._index = {}
+        self._names = {}
+        self._indexed_names = {}
+        self._records = 0
+        self._size = 0
+
+    def _refresh(self) -> None:
+        """
+        Catch the index up with records appended by other processes, or
+        replay the whole log if another process compacted or removed it
+        """
+        try:
+            stats = os.stat(self.filename)
+        except FileNotFoundError:
+            stats = None
+
+        if stats is None or stats.st_ino != self._inode or stats.st_size < self._size:
+            if stats is not None or self._inode is not None:
+                self._reset()
+                self._replay()
+        elif stats.st_size > self._size:
+            self._replay(self._size)
+
+    def _write(self, lines: List[str]) -> None:
+        """
+        Append records to the log and schedule a compaction if needed
+
+        Args:
+            lines (List[str]): The encoded records
+        """
+        if self._file is None:
+            self._file = open(self.filename, 'a', encoding='UTF8')
+            self.io.opens += 1
+        data = ''.join(lines)
+        if os.fstat(self._file.fileno()).st_size != self._size:
+            data = '\n' + data
+            self._records += 1
+        self._file.write(data)
+        self._file.flush()
+        self.fsync.written(self._file)
+        stats = os.fstat(self._file.fileno())
+        self.io.bytes_written += stats.st_size - self._size
+        self._inode = stats.st_ino
+        self._size = stats.st_size
+        self._records += len(lines)
+
+        if self.garbage >= self.compaction_threshold and not self.compacting:
+            self._compactor = Thread(target=self.compact, daemon=True)
+            self._compactor.start()
+
+    def add(self, entity: Entity) -> None:
+        self.add_many([entity])
+
+    def _additions(self, entities: Iterable[Entity]) -> List[str]:
+        """
+        Index entities and encode the records that add or update them
+
+        Args:
+            entities (Iterable[Entity]): The entities to add
+
+        Returns:
+            List[str]: The encoded records
+        """
+        lines = []
+        for entity in entities:
+            key = str(entity.id)
+            op = self.UPDATE if key in self._index else self.ADD
+            self._put(key, entity)
+            lines.append(self._encode(op, self._serialize(entity)))
+        return lines
+
+    def _removals(self, entities: Iterable[Entity]) -> List[str]:
+        """
+        Drop entities from the index and encode the tombstones of the stored ones
+
+        Args:
+            entities (Iterable[Entity]): The entities to remove
+
+        Returns:
+            List[str]: The encoded records
+        """
+        return [
+            self._encode(self.REMOVE, str(entity.id))
+            for entity in entities
+            if self._drop(str(entity.id)) is not None
+        ]
+
+    def add_many(self, entities: Iterable[Entity]) -> None:
+        with self._lock, self.file_lock.exclusive():
+            self._refresh()
+            lines = self._additions(entities)
+            if lines:
+                self._write(lines)
+
+    def apply_changes(
+        self,
+        added: Iterable[Entity],
+        changed: Iterable[Entity],
+        removed: Iterable[Entity],
+    ) -> None:
+        """
+        Write a batch of changes as a single append
+
+        Args:
+            added (Iterable[Entity]): The entities to add
+            changed (Iterable[Entity]): The stored entities to replace
+            removed (Iterable[Entity]): The entities to remove
+        """
+        with self._lock, self.file_lock.exclusive():
+            self._refresh()
+            lines = self._removals(removed) + self._additions([*added, *changed])
+            if lines:
+                self._write(lines)
+
+    def update_many(self, entities: Iterable[Entity]) -> None:
+        self.add_many(entities)
+
+    def get(self, reference) -> Entity:
+        with self._lock, self.file_lock.shared():
+            self._refresh()
+            return self._index.get(str(reference))
+
+    def get_many(self, references: Iterable) -> List[Entity]:
+        with self._lock, self.file_lock.shared():
+            self._refresh()
+            return [self._index.get(str(reference)) for reference in references]
+
+    def remove(self, entity: Entity) -> Entity:
+        with self._lock, self.file_lock.exclusive():
+            self._refresh()
+            removed = self._drop(str(entity.id))
+            if removed is not None:
+                self._write([self._encode(self.REMOVE, str(entity.id))])
+            return removed
+
+    def remove_many(self, entities: Iterable[Entity]) -> None:
+        with self._lock, self.file_lock.exclusive():
+            self._refresh()
+            lines = self._removals(entities)
+            if lines:
+                self._write(lines)
+
+    def list(self) -> List[Entity]:
+        with self._lock, self.file_lock.shared():
+            self._refresh()
+            return list(self._index.values())
+
+    def slice(self, offset: int, limit: int) -> List[Entity]:
+        with self._lock, self.file_lock.shared():
+            self._refresh()
+            return list(islice(self._index.values(), offset, offset + limit))
+
+    def find_by(self, **criteria) -> List[Entity]:
+        if 'name' not in criteria:
+            return super().find_by(**criteria)
+
+        with self._lock, self.file_lock.shared():
+            self._refresh()
+            return [
+                entity for entity in self._names.get(criteria['name'], {}).values()
+                if all(getattr(entity, field, None) == value for field, value in criteria.items())
+            ]
+
+    def compact(self) -> None:
+        """
+        Rewrite the log so it only holds the live entities
+
+        Records appended while the snapshot is written, by this or any other
+        process, are copied over before the new log atomically replaces the
+        old one. The compaction is abandoned if another process replaced the
+        log in the meantime.
+        """
+        with self._compaction_lock:
+            with self._lock, self.file_lock.shared():
+                self._refresh()
+                snapshot = [self._encode(self.ADD, self._serialize(e)) for e in self._index.values()]
+                offset = self._size
+                inode = self._inode
+
+            temporary = temporary_path(self.filename)
+            with open(temporary, 'w', encoding='UTF8') as f:
+                f.writelines(snapshot)
+
+            with self._lock, self.file_lock.exclusive():
+                self._refresh()
+                if inode is None or self._inode != inode:
+                    os.remove(temporary)
+                    return
+
+                tail = b''
+                if offset != self._size:
+                    with open(self.filename, 'rb') as f:
+                        f.seek(offset)
+                        tail = f.read(self._size - offset)
+                    self.io.opens += 1
+                    self.io.bytes_read += len(tail)
+                with open(temporary, 'ab') as f:
+                    f.write(tail)
+                    size = f.tell()
+                    sync_file(f)
+                self.io.opens += 2
+                self.io.bytes_written += size
+
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                replace_durably(temporary, self.filename)
+                self.fsync.flush()
+                self._records = len(snapshot) + tail.count(b'\n')
+                self._size = size
+                self._inode = os.stat(self.filename).st_ino
+
+    def close(self) -> None:
+        """
+        Wait for a running compaction and close the log
+        """
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        with self._lock:
+            self.fsync.close()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
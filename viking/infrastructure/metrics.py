@@ -0,0 +1,288 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from threading import Lock
+from typing import Dict, List, Tuple
+
+Labels = Tuple[Tuple[str, str], ...]
+
+COUNTER = 'counter'
+HISTOGRAM = 'histogram'
+
+# Upper bounds in seconds, from a cached lookup to a full rewrite of a large file.
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+
+def labels(**values: str) -> Labels:
+    """
+    Build the labels of a metric in a canonical order
+
+    Args:
+        **values (str): The value of each label
+
+    Returns:
+        Labels: The labels, sorted by name
+    """
+    return tuple(sorted((name, str(value)) for name, value in values.items()))
+
+
+class Histogram:
+    """
+    Counts observations into cumulative buckets, as Prometheus histograms do.
+    """
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        """
+        Constructor for the Histogram
+
+        Args:
+            buckets (Tuple[float, ...]): The sorted upper bounds of the buckets
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """
+        Record an observation
+
+        Args:
+            value (float): The observed value
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """
+        Get the number of observations at or below each bound
+
+        Returns:
+            List[Tuple[float, int]]: The bound and count of each bucket,
+                ending with infinity
+        """
+        total, cumulative = 0, []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+
+class MetricsSink(ABC):
+    """
+    Receives the measurements of instrumented code.
+    """
+    @abstractmethod
+    def increment(self, name: str, labels: Labels, amount: float = 1) -> None:
+        """
+        Add to a counter
+
+        Args:
+            name (str): The name of the counter
+            labels (Labels): The labels of the series
+            amount (float): The amount to add
+        """
+
+    @abstractmethod
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        """
+        Record an observation in a histogram
+
+        Args:
+            name (str): The name of the histogram
+            labels (Labels): The labels of the series
+            value (float): The observed value
+        """
+
+
+class NullSink(MetricsSink):
+    """
+    Discards every measurement.
+    """
+    def increment(self, name: str, labels: Labels, amount: float = 1) -> None:
+        pass
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        pass
+
+
+class MetricsRegistry(MetricsSink):
+    """
+    Keeps every measurement in process, and forwards them to any further
+    sinks added to it.
+    """
+    def __init__(self):
+        """
+        Constructor for the MetricsRegistry
+        """
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.descriptions: Dict[str, str] = {}
+        self.sinks: List[MetricsSink] = []
+        self._lock = Lock()
+
+    def describe(self, name: str, description: str) -> None:
+        """
+        Set the help text of a metric
+
+        Args:
+            name (str): The name of the metric
+            description (str): What the metric measures
+        """
+        self.descriptions[name] = description
+
+    def add_sink(self, sink: MetricsSink) -> None:
+        """
+        Forward every later measurement to another sink
+
+        Args:
+            sink (MetricsSink): The sink
+        """
+        self.sinks.append(sink)
+
+    def increment(self, name: str, labels: Labels, amount: float = 1) -> None:
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + amount
+        for sink in self.sinks:
+            sink.increment(name, labels, amount)
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(labels)
+            if histogram is None:
+                histogram = series[labels] = Histogram()
+            histogram.observe(value)
+        for sink in self.sinks:
+            sink.observe(name, labels, value)
+
+    def counter(self, name: str, **values: str) -> float:
+        """
+        Get the value of a counter
+
+        Args:
+            name (str): The name of the counter
+            **values (str): The labels of the series
+
+        Returns:
+            float: The value, 0 if it was never incremented
+        """
+        return self.counters.get(name, {}).get(labels(**values), 0)
+
+    def histogram(self, name: str, **values: str) -> Histogram:
+        """
+        Get a histogram
+
+        Args:
+            name (str): The name of the histogram
+            **values (str): The labels of the series
+
+        Returns:
+            Histogram: The histogram, empty if nothing was observed
+        """
+        return self.histograms.get(name, {}).get(labels(**values)) or Histogram()
+
+    def clear(self) -> None:
+        """
+        Forget every measurement
+        """
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+
+
+def _format_labels(labels: Labels) -> str:
+    """
+    Render labels in the Prometheus text format
+
+    Args:
+        labels (Labels): The labels
+
+    Returns:
+        str: The labels in braces, or nothing if there are none
+    """
+    if not labels:
+        return ''
+    escaped = (
+        (name, value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_number(value: float) -> str:
+    """
+    Format a sample value or bucket bound the way Prometheus expects
+
+    Args:
+        value (float): The value
+
+    Returns:
+        str: The value, with infinity written as +Inf
+    """
+    if value == float('inf'):
+        return '+Inf'
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def prometheus_text(registry: MetricsRegistry) -> str:
+    """
+    Render every metric of a registry in the Prometheus text exposition
+    format
+
+    Args:
+        registry (MetricsRegistry): The registry
+
+    Returns:
+        str: The exposition
+    """
+    with registry._lock:
+        counters = {name: dict(series) for name, series in registry.counters.items()}
+        histograms = {
+            name: {key: (h.cumulative(), h.count, h.sum) for key, h in series.items()}
+            for name, series in registry.histograms.items()
+        }
+
+    lines = []
+    metrics = [(name, COUNTER, series) for name, series in counters.items()]
+    metrics += [(name, HISTOGRAM, series) for name, series in histograms.items()]
+    for name, kind, series in sorted(metrics, key=lambda metric: metric[0]):
+        if name in registry.descriptions:
+            lines.append(f'# HELP {name} {registry.descriptions[name]}')
+        lines.append(f'# TYPE {name} {kind}')
+        for key, value in sorted(series.items()):
+            if kind == COUNTER:
+                lines.append(f'{name}{_format_labels(key)} {_format_number(value)}')
+                continue
+            buckets, count, total = value
+            for bound, cumulative in buckets:
+                lines.append(f'{name}_bucket{_format_labels(key + (("le", _format_number(bound)),))} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(key)} {_format_number(total)}')
+            lines.append(f'{name}_count{_format_labels(key)} {count}')
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+registry = MetricsRegistry()
@@ -18,23 +18,180 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
-from viking.domain.seedwork import Entity
+from os import environ
+from os.path import exists
+from typing import TYPE_CHECKING, Dict, Mapping, Optional, Tuple
+
+from viking.domain.seedwork import AbstractRepository, Entity
 from viking.domain.seedwork.abstract_factory import AbstractFactory
-from viking.fakes.fake_repository import FakeRepository
-from viking.infrastructure.alchemy_repository import AlchemyRepository
-from viking.infrastructure.csv_repository import CsvRepository
+from viking.infrastructure.backends import (Backend, Config, Option,
+                                            load_config, registry)
+
+if TYPE_CHECKING:
+    from viking.infrastructure.metrics import MetricsSink
+
+CONFIG_FILE = 'hungry_task.ini'
+
+FSYNC_OPTIONS = (
+    Option('fsync_every', int, None, 'Force appends to disk every N writes.'),
+    Option('fsync_interval', float, None, 'Force appends to disk at most this many milliseconds after a write.'),
+)
+
+
+def _alchemy(entity_type: type, url: Optional[str], **pool: Optional[int]) -> AbstractRepository:
+    from sqlalchemy.exc import ArgumentError
+    from viking.infrastructure.alchemy_repository import (AlchemyRepository,
+                                                         session_factory)
+    url = url or environ.get('HUNGRY_TASK_DATABASE_URL', 'sqlite:///storage.db')
+    options = {name: value for name, value in pool.items() if value is not None}
+    try:
+        return AlchemyRepository(session_factory(url, **options)(), entity_type, autocommit=True)
+    except (ArgumentError, TypeError) as error:
+        raise ValueError(f'Backend alchemy: {error}') from None
+
+
+def _binary(entity_type: type, filename: str) -> AbstractRepository:
+    from viking.infrastructure.binary_repository import BinaryRepository
+    return BinaryRepository(filename, entity_type)
+
+
+def _csv(entity_type: type, filename: str, **options) -> AbstractRepository:
+    from viking.infrastructure.csv_repository import CsvRepository
+    return CsvRepository(filename, entity_type, **options)
+
+
+def _log(entity_type: type, filename: str, **options) -> AbstractRepository:
+    from viking.infrastructure.log_repository import LogRepository
+    return LogRepository(filename, entity_type, **options)
+
+
+def _fake(entity_type: type) -> AbstractRepository:
+    from viking.fakes.fake_repository import FakeRepository
+    return FakeRepository()
+
+
+registry.register(Backend('alchemy', _alchemy, (
+    Option('url', str, None, 'SQLAlchemy database URL, HUNGRY_TASK_DATABASE_URL by default.'),
+    Option('pool_size', int, None, 'Connections kept open by the pool, ignored on SQLite.'),
+    Option('max_overflow', int, None, 'Connections opened beyond the pool size under load, ignored on SQLite.'),
+    Option('pool_recycle', int, None, 'Seconds before a pooled connection is replaced.'),
+)))
+registry.register(Backend('binary', _binary, (
+    Option('filename', str, 'storage.bin', 'The store file.'),
+)))
+registry.register(Backend('csv', _csv, (
+    Option('filename', str, 'storage.csv', 'The CSV file.'),
+    Option('cached', bool, False, 'Keep the parsed file in memory between calls.'),
+) + FSYNC_OPTIONS))
+registry.register(Backend('log', _log, (
+    Option('filename', str, 'storage.log', 'The log file.'),
+    Option('compaction_threshold', int, 1000, 'Stale records that trigger a compaction.'),
+) + FSYNC_OPTIONS))
+registry.register(Backend('fake', _fake, pooled=False), 'debug')
+
+
+def default_config() -> Config:
+    """
+    Read the repositories configured in the file named by HUNGRY_TASK_CONFIG,
+    or in hungry_task.ini in the working directory
+
+    Returns:
+        Config: The settings of each repository, empty without a file
+    """
+    filename = environ.get('HUNGRY_TASK_CONFIG', CONFIG_FILE)
+    if 'HUNGRY_TASK_CONFIG' not in environ and not exists(filename):
+        return {}
+    return load_config(filename)
 
 
 class RepositoryFactory(AbstractFactory):
-    def __init__(self, entity_type: Entity):
+    def __init__(
+        self,
+        entity_type: Entity,
+        metrics: Optional['MetricsSink'] = None,
+        config: Optional[Mapping[str, Mapping[str, str]]] = None,
+    ):
+        """
+        Constructor for the RepositoryFactory
+
+        Args:
+            entity_type (Entity): The type of entity the repositories store
+            metrics (Optional[MetricsSink]): Record the calls of every created
+                repository in this sink, or None to leave them unmeasured
+            config (Optional[Mapping[str, Mapping[str, str]]]): The settings
+                of each named repository, read from the config file by default
+        """
         self.entity_type = entity_type
-        
+        self.metrics = metrics
+        self.config = default_config() if config is None else config
+        self._pool: Dict[str, AbstractRepository] = {}
+
+    def instrument(self, name: str, repository: AbstractRepository) -> AbstractRepository:
+        """
+        Wrap a repository so its calls are recorded, if the factory has a sink
+
+        Args:
+            name (str): The name of the backend, used as a label
+            repository (AbstractRepository): The repository
+
+        Returns:
+            AbstractRepository: The repository, instrumented or as it was
+        """
+        if self.metrics is None:
+            return repository
+        from viking.infrastructure.instrumented_repository import \
+            InstrumentedRepository
+        return InstrumentedRepository(repository, name, self.metrics)
+
+    def resolve(self, name: str) -> Tuple[Backend, Dict[str, str]]:
+        """
+        Find the backend and settings of a named repository
+
+        Args:
+            name (str): A configured repository or a backend
+
+        Raises:
+            ValueError: No backend provides the repository
+
+        Returns:
+            Tuple[Backend, Dict[str, str]]: The backend and the settings
+        """
+        settings = dict(self.config.get(name, {}))
+        backend_name = settings.pop('backend', name)
+        backend = registry.get(backend_name)
+        if backend is None:
+            raise ValueError('RepositoryFactory: Unknown repository type: {}'.format(backend_name))
+        return backend, settings
+
     def create(self, name: str) -> object:
-        if name == 'alchemy':
-            return AlchemyRepository(None)
-        elif name == 'csv':
-            return CsvRepository('storage.csv', self.entity_type)
-        elif name == 'fake' or name == 'debug':
-            return FakeRepository([])
-        else:
-            raise Exception('RepositoryFactory: Unknown repository type: {}'.format(name))
+        """
+        Create a repository, reusing the one already built for the name when
+        its backend is pooled
+
+        Args:
+            name (str): A configured repository or a backend
+
+        Raises:
+            ValueError: No backend provides the repository, or its settings
+                are invalid
+
+        Returns:
+            object: The repository
+        """
+        if name in self._pool:
+            return self._pool[name]
+        backend, settings = self.resolve(name)
+        repository = self.instrument(backend.name, backend.create(self.entity_type, settings))
+        if backend.pooled:
+            self._pool[name] = repository
+        return repository
+
+    def close(self) -> None:
+        """
+        Close every pooled repository
+        """
+        for repository in self._pool.values():
+            close = getattr(repository, 'close', None)
+            if close is not None:
+                close()
+        self._pool = {}
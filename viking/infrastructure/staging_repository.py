@@ -0,0 +1,148 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from typing import Dict, Iterable, List, Set
+
+from viking.domain.seedwork.abstract_repository import AbstractRepository
+from viking.domain.seedwork.entity import Entity
+
+
+class StagingRepository(AbstractRepository):
+    """
+    Holds writes in memory and applies them to a wrapped repository in a
+    single batch on flush().
+
+    Reads see the staged writes. Entities read from the wrapped repository
+    are remembered as stored, so writing them back is flushed as a change
+    and any other write as an addition, letting backends that append take
+    their fast path.
+    """
+    def __init__(self, repository: AbstractRepository):
+        """
+        Constructor for the StagingRepository
+
+        Args:
+            repository (AbstractRepository): The repository changes are
+                flushed to
+        """
+        self.repository = repository
+        self._written: Dict[str, Entity] = {}
+        self._removed: Dict[str, Entity] = {}
+        self._stored: Set[str] = set()
+
+    @property
+    def pending(self) -> int:
+        """
+        Get the number of staged writes
+
+        Returns:
+            int: The entities waiting to be added, changed or removed
+        """
+        return len(self._written) + len(self._removed)
+
+    def _seen(self, entities: Iterable[Entity]) -> List[Entity]:
+        """
+        Remember entities read from the wrapped repository as stored, and
+        replace them by their staged version
+
+        Args:
+            entities (Iterable[Entity]): The entities read
+
+        Returns:
+            List[Entity]: The entities as the batch sees them, without the
+                staged removals
+        """
+        found = []
+        for entity in entities:
+            if entity is None:
+                found.append(None)
+                continue
+            key = str(entity.id)
+            self._stored.add(key)
+            if key not in self._removed:
+                found.append(self._written.get(key, entity))
+        return found
+
+    def add(self, entity: Entity) -> None:
+        self.add_many([entity])
+
+    def add_many(self, entities: Iterable[Entity]) -> None:
+        for entity in entities:
+            key = str(entity.id)
+            self._removed.pop(key, None)
+            self._written[key] = entity
+
+    def update_many(self, entities: Iterable[Entity]) -> None:
+        self.add_many(entities)
+
+    def remove(self, entity: Entity) -> Entity:
+        self.remove_many([entity])
+        return entity
+
+    def remove_many(self, entities: Iterable[Entity]) -> None:
+        for entity in entities:
+            key = str(entity.id)
+            self._written.pop(key, None)
+            self._removed[key] = entity
+
+    def get(self, reference) -> Entity:
+        return self.get_many([reference])[0]
+
+    def get_many(self, references: Iterable) -> List[Entity]:
+        keys = [str(reference) for reference in references]
+        missing = [key for key in keys if key not in self._written and key not in self._removed]
+        loaded = {}
+        if missing:
+            for entity in self._seen(self.repository.get_many(missing)):
+                if entity is not None:
+                    loaded[str(entity.id)] = entity
+        return [self._written.get(key, loaded.get(key)) for key in keys]
+
+    def list(self) -> List[Entity]:
+        stored = self._seen(self.repository.list())
+        return stored + [entity for key, entity in self._written.items() if key not in self._stored]
+
+    def find_by(self, **criteria) -> List[Entity]:
+        def matches(entity: Entity) -> bool:
+            return all(getattr(entity, field, None) == value for field, value in criteria.items())
+
+        found = [entity for entity in self._seen(self.repository.find_by(**criteria)) if matches(entity)]
+        keys = {str(entity.id) for entity in found}
+        return found + [entity for key, entity in self._written.items() if key not in keys and matches(entity)]
+
+    def flush(self) -> None:
+        """
+        Apply every staged write to the wrapped repository in one batch
+        """
+        if not self.pending:
+            return
+        added = [entity for key, entity in self._written.items() if key not in self._stored]
+        changed = [entity for key, entity in self._written.items() if key in self._stored]
+        self.repository.apply_changes(added, changed, self._removed.values())
+        self._stored.update(self._written)
+        self._stored.difference_update(self._removed)
+        self.discard()
+
+    def discard(self) -> None:
+        """
+        Forget every staged write
+        """
+        self._written = {}
+        self._removed = {}
@@ -0,0 +1,386 @@
+# Copyright (c) 2021 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import csv
+import json
+from abc import ABC, abstractmethod
+from collections import deque
+from functools import partial
+from io import StringIO
+from itertools import islice
+from typing import (Callable, Dict, Iterable, Iterator, List, Optional,
+                    Sequence, Tuple, TypeVar)
+
+from viking.domain.seedwork.abstract_repository import AbstractRepository
+from viking.domain.seedwork.entity import Entity
+from viking.infrastructure.codec import Codec, codec_for
+
+CHUNK_SIZE = 10_000
+
+Item = TypeVar('Item')
+Row = Tuple
+
+
+def chunks(items: Iterable[Item], size: int = CHUNK_SIZE) -> Iterator[List[Item]]:
+    """
+    Split items into lists of at most size items, reading them lazily
+
+    Args:
+        items (Iterable[Item]): The items
+        size (int): The largest chunk
+
+    Returns:
+        Iterator[List[Item]]: The chunks in order
+    """
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Format(ABC):
+    """
+    A text interchange format: an optional header, then chunks of rows
+    encoded independently of each other so they can be encoded in parallel.
+    """
+    media_type = 'text/plain'
+
+    def header(self, codec: Codec) -> str:
+        """
+        Get the text written before the first chunk
+
+        Args:
+            codec (Codec): The codec of the exported entities
+
+        Returns:
+            str: The header, empty if the format has none
+        """
+        return ''
+
+    @abstractmethod
+    def encode(self, columns: Sequence[str], rows: List[Row]) -> str:
+        """
+        Encode a chunk of rows
+
+        Args:
+            columns (Sequence[str]): The column of each value in a row
+            rows (List[Row]): The rows
+
+        Returns:
+            str: The chunk, ending in a newline
+        """
+
+    @abstractmethod
+    def decode(self, lines: Iterable[str], codec: Codec) -> Iterator[Entity]:
+        """
+        Decode the lines written by encode, header included
+
+        Args:
+            lines (Iterable[str]): The lines
+            codec (Codec): The codec of the imported entities
+
+        Raises:
+            ValueError: The lines are not in this format
+
+        Returns:
+            Iterator[Entity]: The entities in order
+        """
+
+
+class NdjsonFormat(Format):
+    """
+    A JSON object per entity and line.
+    """
+    media_type = 'application/x-ndjson'
+
+    def encode(self, columns: Sequence[str], rows: List[Row]) -> str:
+        dumps = json.JSONEncoder(default=str).encode
+        return ''.join([dumps(dict(zip(columns, row))) + '\n' for row in rows])
+
+    def decode(self, lines: Iterable[str], codec: Codec) -> Iterator[Entity]:
+        for line in lines:
+            if line.strip():
+                data = json.loads(line)
+                if not isinstance(data, dict):
+                    raise ValueError(f'Expected a JSON object per line, not {line.strip()[:40]!r}')
+                names = _known(data, codec)
+                yield codec.decoder(names, text=False)(tuple(data[name] for name in names))
+
+
+class CsvFormat(Format):
+    """
+    A header row of column names, then a row per entity, readable by the
+    csv repository and its files readable in turn.
+    """
+    media_type = 'text/csv'
+
+    def header(self, codec: Codec) -> str:
+        return self.encode(codec.public, [codec.public])
+
+    def encode(self, columns: Sequence[str], rows: List[Row]) -> str:
+        text = StringIO()
+        csv.writer(text).writerows(rows)
+        return text.getvalue()
+
+    def decode(self, lines: Iterable[str], codec: Codec) -> Iterator[Entity]:
+        rows = csv.reader(lines)
+        header = next(rows, None)
+        if header is None:
+            return
+        if len(_known(header, codec)) != len(header):
+            raise ValueError('CSV columns must not repeat')
+        yield from map(codec.decoder(header), filter(None, rows))
+
+
+class ColumnarFormat(Format):
+    """
+    Modeled on the Arrow IPC stream: a schema line naming each column and its
+    type, then a record batch per chunk holding a JSON array per column.
+    """
+    media_type = 'application/x-ndjson'
+
+    def header(self, codec: Codec) -> str:
+        types = codec.public_types
+        return json.dumps({'schema': [{'name': name, 'type': types[name]} for name in codec.public]}) + '\n'
+
+    def encode(self, columns: Sequence[str], rows: List[Row]) -> str:
+        values = [list(column) for column in zip(*rows)] if rows else [[] for _ in columns]
+        return json.dumps({'length': len(rows), 'columns': values}, default=str) + '\n'
+
+    def decode(self, lines: Iterable[str], codec: Codec) -> Iterator[Entity]:
+        lines = (line for line in lines if line.strip())
+        first = next(lines, None)
+        if first is None:
+            return
+        schema = _field(json.loads(first), 'schema', 'Columnar data must start with a schema')
+        columns = schema if isinstance(schema, list) else [None]
+        names = [column.get('name') if isinstance(column, dict) else None for column in columns]
+        if not all(isinstance(name, str) for name in names):
+            raise ValueError('A columnar schema must be a list of columns with a name')
+        if len(_known(names, codec)) != len(names):
+            raise ValueError('A columnar schema must not repeat a column')
+        decode = codec.decoder(names, text=False)
+        for line in lines:
+            columns = _field(json.loads(line), 'columns', 'A record batch must hold its columns')
+            if (
+                not isinstance(columns, list) or len(columns) != len(schema)
+                or not all(isinstance(column, list) and len(column) == len(columns[0]) for column in columns)
+            ):
+                raise ValueError(f'A record batch must hold a list of {len(schema)} columns of the same length')
+            yield from map(decode, zip(*columns))
+
+
+def _known(names: Iterable[str], codec: Codec) -> Tuple[str, ...]:
+    """
+    Check that the names given by the input are fields of the entity, so
+    untrusted input only ever selects one of a bounded set of decoders
+
+    Args:
+        names (Iterable[str]): The column names or object keys of the input
+        codec (Codec): The codec of the imported entities
+
+    Raises:
+        ValueError: A name is not a field of the entity
+
+    Returns:
+        Tuple[str, ...]: The distinct names, in the order of the fields
+    """
+    names = set(names)
+    unknown = sorted(str(name) for name in names - set(codec.columns))
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown[:5])}")
+    return tuple(name for name in codec.columns if name in names)
+
+
+def _field(data: object, name: str, message: str) -> object:
+    """
+    Get a field of a decoded JSON object
+
+    Args:
+        data (object): The decoded JSON value
+        name (str): The field
+        message (str): The error raised when it is missing
+
+    Raises:
+        ValueError: The value is not an object or lacks the field
+
+    Returns:
+        object: The value of the field
+    """
+    if not isinstance(data, dict) or name not in data:
+        raise ValueError(message)
+    return data[name]
+
+
+FORMATS: Dict[str, Format] = {
+    'ndjson': NdjsonFormat(),
+    'csv': CsvFormat(),
+    'columnar': ColumnarFormat(),
+}
+
+
+def _encode(format: str, columns: Sequence[str], rows: List[Row]) -> str:
+    """
+    Encode a chunk of rows by the name of its format, so a worker process
+    can be handed the call without the format object
+
+    Args:
+        format (str): One of FORMATS
+        columns (Sequence[str]): The column of each value in a row
+        rows (List[Row]): The rows
+
+    Returns:
+        str: The chunk
+    """
+    return FORMATS[format].encode(columns, rows)
+
+
+def _ordered(function: Callable[[Item], str], items: Iterable[Item], workers: int) -> Iterator[str]:
+    """
+    Map a function over items in worker processes, yielding the results in
+    order with at most two items per worker in flight
+
+    Args:
+        function (Callable[[Item], str]): A picklable function
+        items (Iterable[Item]): The items
+        workers (int): The worker processes, or 1 to map in this process
+
+    Returns:
+        Iterator[str]: The results in order
+    """
+    if workers <= 1:
+        yield from map(function, items)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(function, item))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def encode(
+    entities: Iterable[Entity],
+    codec: Codec,
+    format: str = 'ndjson',
+    chunk_size: int = CHUNK_SIZE,
+    workers: int = 1,
+) -> Iterator[str]:
+    """
+    Stream entities out in an interchange format, a chunk at a time
+
+    Args:
+        entities (Iterable[Entity]): The entities, read lazily
+        codec (Codec): The codec of the entities
+        format (str): One of FORMATS
+        chunk_size (int): The entities encoded together
+        workers (int): The processes encoding chunks in parallel
+
+    Returns:
+        Iterator[str]: The header, then the text of each chunk
+    """
+    encoder = FORMATS[format]
+    yield encoder.header(codec)
+    rows = chunks(map(codec.public_row, entities), chunk_size)
+    yield from _ordered(partial(_encode, format, codec.public), rows, workers)
+
+
+def decode(lines: Iterable[str], codec: Codec, format: str = 'ndjson') -> Iterator[Entity]:
+    """
+    Stream entities in from an interchange format
+
+    Args:
+        lines (Iterable[str]): The lines, read lazily
+        codec (Codec): The codec of the entities
+        format (str): One of FORMATS
+
+    Raises:
+        ValueError: The lines are not in the format
+
+    Returns:
+        Iterator[Entity]: The entities in order
+    """
+    return FORMATS[format].decode(lines, codec)
+
+
+def split(entities: Iterable[Entity], stored: Iterable[Optional[Entity]]) -> Tuple[List[Entity], List[Entity]]:
+    """
+    Split a chunk of entities into the ones to add and the ones replacing a
+    different stored entity, dropping the ones already stored as they are so
+    repeating an import writes nothing
+
+    Args:
+        entities (Iterable[Entity]): The entities, with unique ids
+        stored (Iterable[Optional[Entity]]): The stored entity with the id of
+            each entity, or None, as returned by get_many
+
+    Returns:
+        Tuple[List[Entity], List[Entity]]: The added and changed entities
+    """
+    added, changed = [], []
+    for entity, existing in zip(entities, stored):
+        if existing is None:
+            added.append(entity)
+        elif codec_for(type(entity)).row(entity) != codec_for(type(existing)).row(existing):
+            changed.append(entity)
+    return added, changed
+
+
+def unique(entities: Iterable[Entity]) -> List[Entity]:
+    """
+    Drop all but the last of the entities sharing an id
+
+    Args:
+        entities (Iterable[Entity]): The entities
+
+    Returns:
+        List[Entity]: The entities, in the order their ids first appeared
+    """
+    return list({str(entity.id): entity for entity in entities}.values())
+
+
+def load(repository: AbstractRepository, entities: Iterable[Entity], chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Upsert entities into a repository with one apply_changes per chunk, so
+    only one chunk is held in memory however many entities there are and an
+    import can be repeated without duplicating entities
+
+    Args:
+        repository (AbstractRepository): The repository
+        entities (Iterable[Entity]): The entities, read lazily
+        chunk_size (int): The entities written together
+
+    Returns:
+        int: The number of entities added or replaced
+    """
+    count = 0
+    for chunk in chunks(entities, chunk_size):
+        chunk = unique(chunk)
+        added, changed = split(chunk, repository.get_many([entity.id for entity in chunk]))
+        repository.apply_changes(added, changed, [])
+        count += len(added) + len(changed)
+    return count